@@ -120,10 +120,10 @@ EXAMPLES = '''
 RETURN = ''' # '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpNamedObject
 from ansible.module_utils.six.moves import range
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
 
 
 class ModuleParams(object):
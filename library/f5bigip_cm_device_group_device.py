@@ -71,9 +71,10 @@ EXAMPLES = '''
 RETURN = ''' # '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import attach_resource
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpNamedObject
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
 
 
 class ModuleParams(object):
@@ -93,7 +94,9 @@ class ModuleParams(object):
 
 class F5BigIpCmDeviceGroupDevice(F5BigIpNamedObject):
     def _set_crud_methods(self):
-        device_group = self._api.tm.cm.device_groups.device_group.load(
+        # Address the devices subcollection directly, without loading the device group
+        device_group = attach_resource(
+            self._api.tm.cm.device_groups.device_group,
             name=self._params['deviceGroup'],
             partition=self._params['partition']
         )
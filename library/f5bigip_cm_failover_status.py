@@ -75,9 +75,9 @@ summary:
 '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpUnnamedObject
 from ansible_common_f5.base import AnsibleF5Error
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpUnnamedObject
 
 
 class ModuleParams(object):
@@ -0,0 +1,223 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: f5bigip_cm_ha_status
+short_description: BIG-IP cm high availability status module
+description:
+    - Displays the failover status, the sync status and the failover state of a list of devices in a single task.
+    - The devices are queried concurrently (see I(concurrency)); each of them is read with 3 requests over a single
+      session (/mgmt/tm/cm/failover-status, /mgmt/tm/cm/sync-status and /mgmt/shared/bigip-failover-state).
+    - A device that cannot be queried does not make the task fail, its error is reported in its row instead.
+version_added: "2.4"
+author:
+    - "Eric Jacob (@erjac77)"
+options:
+    concurrency:
+        description:
+            - Specifies the maximum number of devices queried at the same time.
+        default: 16
+    hosts:
+        description:
+            - Specifies the list of devices to query, instead of I(f5_hostname).
+            - Each device is a dict with the I(f5_hostname) key, and optionally the I(f5_port), I(f5_username) and
+              I(f5_password) keys; the provider options of the task are used for the missing keys.
+            - A device may also be given as a C(f5_hostname=<hostname>) string.
+            - Requires Ansible >= 2.8, which validates the elements and options of list arguments.
+    timeout:
+        description:
+            - Specifies the number of seconds a device may take to answer all the requests.
+        default: 10
+requirements:
+    - BIG-IP >= 12.0
+    - ansible >= 2.8
+    - ansible-common-f5
+'''
+
+EXAMPLES = '''
+- name: Gets the HA status of all the devices
+  f5bigip_cm_ha_status:
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    hosts: "{{ groups['bigips'] | map('regex_replace', '^', 'f5_hostname=') | list }}"
+    concurrency: 32
+  delegate_to: localhost
+  run_once: true
+  register: result
+
+- name: Displays the devices that are not in sync
+  debug:
+    msg: "{{ item.host }}: {{ item.sync_status }}"
+  with_items: "{{ result.devices }}"
+  when: item.sync_status not in ['In Sync', 'Standalone']
+'''
+
+RETURN = '''
+devices:
+    description:
+        - The HA status of each device, in the order of the hosts.
+        - A device that could not be queried only has the host and error keys.
+    returned: success
+    type: list
+    sample:
+        - host: 172.16.227.35
+          failover_color: green
+          failover_state: active
+          failover_status: ACTIVE
+          failover_summary: 1/1 active
+          mode: high-availability
+          sync_color: green
+          sync_status: In Sync
+          sync_summary: All devices in the device group are in sync
+        - host: 172.16.227.36
+          error: "HTTPSConnectionPool(host='172.16.227.36', port=443): Read timed out. (read timeout=10)"
+failed_hosts:
+    description: The hosts that could not be queried.
+    returned: success
+    type: list
+    sample:
+        - 172.16.227.36
+'''
+
+import time
+from multiprocessing.pool import ThreadPool
+
+from requests.exceptions import RequestException
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import get_base_url
+from ansible.module_utils.f5bigip import get_session
+from ansible.module_utils.six import itervalues
+from ansible_common_f5.base import AnsibleF5Error
+
+# Connection options that can be given for each device
+HOST_ARGS = dict(
+    f5_hostname=dict(type='str', required=True),
+    f5_password=dict(type='str', no_log=True),
+    f5_port=dict(type='int'),
+    f5_username=dict(type='str')
+)
+
+
+def get_host_params(params, host):
+    """Return the connection params of a device, completed with those of the task."""
+    host_params = dict(params)
+    host_params.update((k, v) for k, v in host.items() if k in HOST_ARGS and v is not None)
+    return host_params
+
+
+def get_stats(session, url, timeout):
+    """GET a stats resource and return the descriptions of its entries."""
+    resp = session.get(url, timeout=timeout)
+    if resp.status_code >= 400:
+        raise AnsibleF5Error("Unable to retrieve {0}: {1} {2}".format(url, resp.status_code, resp.reason))
+    # A single entry, whose URL depends on the version
+    for entry in itervalues(resp.json()['entries']):
+        return dict((k, v.get('description')) for k, v in entry['nestedStats']['entries'].items())
+    return dict()
+
+
+def get_ha_status(params, timeout):
+    """Query the HA status of a device, return its row."""
+    row = dict(host=params['f5_hostname'])
+    deadline = time.time() + timeout
+    # The login for a token is bound by the timeout as well
+    session = get_session(params, timeout=timeout)
+    try:
+        base_url = get_base_url(params)
+        failover = get_stats(session, base_url + '/mgmt/tm/cm/failover-status', max(deadline - time.time(), 0.1))
+        sync = get_stats(session, base_url + '/mgmt/tm/cm/sync-status', max(deadline - time.time(), 0.1))
+        resp = session.get(base_url + '/mgmt/shared/bigip-failover-state', timeout=max(deadline - time.time(), 0.1))
+        if resp.status_code >= 400:
+            raise AnsibleF5Error("Unable to retrieve the failover state: {0} {1}".format(resp.status_code, resp.reason))
+        row.update(
+            failover_color=failover.get('color'),
+            failover_state=resp.json().get('failoverState'),
+            failover_status=failover.get('status'),
+            failover_summary=failover.get('summary'),
+            mode=sync.get('mode'),
+            sync_color=sync.get('color'),
+            sync_status=sync.get('status'),
+            sync_summary=sync.get('summary')
+        )
+    # The token logins raise IOError or OSError
+    except (AnsibleF5Error, IOError, OSError, RequestException, KeyError, ValueError) as exc:
+        row = dict(host=params['f5_hostname'], error=str(exc))
+    finally:
+        session.close()
+    return row
+
+
+class ModuleParams(object):
+    @property
+    def argument_spec(self):
+        argument_spec = dict(
+            concurrency=dict(type='int', default=16),
+            hosts=dict(type='list', elements='dict', options=HOST_ARGS),
+            timeout=dict(type='int', default=10)
+        )
+        argument_spec.update(F5_PROVIDER_ARGS)
+        # The hostname is given in the hosts list instead
+        argument_spec['f5_hostname'] = dict(argument_spec['f5_hostname'], required=False)
+        return argument_spec
+
+    @property
+    def supports_check_mode(self):
+        return True
+
+    @property
+    def required_one_of(self):
+        return [
+            ['f5_hostname', 'hosts']
+        ]
+
+
+def main():
+    params = ModuleParams()
+    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode,
+                           required_one_of=params.required_one_of)
+
+    try:
+        hosts = module.params['hosts'] or [dict(f5_hostname=module.params['f5_hostname'])]
+        host_params = [get_host_params(module.params, host) for host in hosts]
+        concurrency = max(1, min(module.params['concurrency'], len(host_params)))
+        timeout = module.params['timeout']
+
+        pool = ThreadPool(concurrency)
+        try:
+            devices = pool.map(lambda p: get_ha_status(p, timeout), host_params)
+        finally:
+            pool.close()
+            pool.join()
+
+        module.exit_json(changed=False, devices=devices,
+                         failed_hosts=[device['host'] for device in devices if 'error' in device])
+    except Exception as exc:
+        module.fail_json(msg=str(exc))
+
+
+if __name__ == '__main__':
+    main()
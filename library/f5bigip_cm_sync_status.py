@@ -27,10 +27,25 @@ module: f5bigip_cm_sync_status
 short_description: BIG-IP cm sync status module
 description:
     - Displays the configuration synchronization status of the local device.
+    - Can wait for the device to reach a given sync status, polling it less and less often over a single session.
 version_added: "2.4"
 author:
     - "Eric Jacob (@erjac77)"
 options:
+    max_interval:
+        description:
+            - Specifies the maximum number of seconds between two polls, with I(wait_for).
+            - The first poll follows the previous one by 1 second, then each wait is twice as long as the previous
+              one, up to I(max_interval).
+        default: 30
+    timeout:
+        description:
+            - Specifies the number of seconds to wait for one of the I(wait_for) statuses before failing.
+        default: 300
+    wait_for:
+        description:
+            - Specifies the list of statuses to wait for, for example C(In Sync) or C(Standalone).
+            - The errors occurring while the status is read are ignored until the timeout expires.
 requirements:
     - BIG-IP >= 12.0
     - ansible-common-f5
@@ -50,6 +65,17 @@ EXAMPLES = '''
 - name: Displays the sync status of the device
   debug:
     msg: "Sync Status: {{ result.status }}"
+
+- name: Waits for the device to be in sync
+  f5bigip_cm_sync_status:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    wait_for:
+      - In Sync
+    timeout: 600
+  delegate_to: localhost
 '''
 
 RETURN = '''
@@ -74,6 +100,11 @@ status:
     sample:
         - In Sync
         - Standalone
+polls:
+    description: The number of times the sync status was read
+    returned: wait_for
+    type: int
+    sample: 6
 summary:
     description: A summary message explaining the sync status of the device
     returned: success
@@ -81,18 +112,32 @@ summary:
     sample:
         - All devices in the device group are in sync
         - Changes Pending
+waited:
+    description: The number of seconds spent waiting for the sync status
+    returned: wait_for
+    type: float
+    sample: 31.2
 '''
 
+import time
+
+from requests.exceptions import RequestException
+
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpUnnamedObject
+from ansible.module_utils.f5bigip_task import poll
 from ansible_common_f5.base import AnsibleF5Error
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpUnnamedObject
 
 
 class ModuleParams(object):
     @property
     def argument_spec(self):
-        argument_spec = dict()
+        argument_spec = dict(
+            max_interval=dict(type='int', default=30),
+            timeout=dict(type='int', default=300),
+            wait_for=dict(type='list')
+        )
         argument_spec.update(F5_PROVIDER_ARGS)
         return argument_spec
 
@@ -102,30 +147,77 @@ class ModuleParams(object):
 
 
 class F5BigIpCmSyncStatus(F5BigIpUnnamedObject):
+    def __init__(self, **kwargs):
+        # Options of the module, not of the sync status
+        self._max_interval = kwargs.pop('max_interval', None) or 30
+        self._timeout = kwargs.pop('timeout', None) or 300
+        self._wait_for = kwargs.pop('wait_for', None)
+        super(F5BigIpCmSyncStatus, self).__init__(**kwargs)
+
     def _set_crud_methods(self):
         self._methods = {
             'read': self._api.tm.cm.sync_status
         }
 
-    def flush(self):
-        result = dict(changed=False)
-
-        try:
-            sync_status = self._methods['read']
-            sync_status.refresh()
-            sync_status_stats = \
-                sync_status.entries['https://localhost/mgmt/tm/cm/sync-status/0']['nestedStats']['entries']
-
-        except Exception:
-            raise AnsibleF5Error("Unable to retrieve the sync status of the device.")
-
-        result.update(
+    def _read_status(self):
+        sync_status = self._methods['read']
+        sync_status.refresh()
+        sync_status_stats = \
+            sync_status.entries['https://localhost/mgmt/tm/cm/sync-status/0']['nestedStats']['entries']
+        return dict(
             color=sync_status_stats['color']['description'],
             mode=sync_status_stats['mode']['description'],
             status=sync_status_stats['status']['description'],
             summary=sync_status_stats['summary']['description']
         )
 
+    def _read(self):
+        try:
+            return self._read_status()
+        except Exception as exc:
+            raise AnsibleF5Error("Unable to retrieve the sync status of the device: {0}".format(exc))
+
+    def _wait(self, result):
+        """Read the sync status until it is one of the wait_for statuses."""
+        start = time.time()
+        result['polls'] = 0
+        errors = list()
+
+        def check():
+            result['polls'] += 1
+            try:
+                result.update(self._read_status())
+            except RequestException as exc:
+                status_code = getattr(getattr(exc, 'response', None), 'status_code', None)
+                if status_code is not None and status_code < 500:
+                    raise
+                # The device may not answer while it syncs or fails over
+                errors[:] = [exc]
+                return None
+            del errors[:]
+            return True if result['status'] in self._wait_for else None
+
+        try:
+            poll(check, self._timeout, max_interval=self._max_interval)
+        except (RequestException, KeyError) as exc:
+            raise AnsibleF5Error("Unable to retrieve the sync status of the device: {0}".format(exc))
+        except AnsibleF5Error:
+            message = "The sync status of the device is still '{0}' after {1} seconds.".format(
+                result.get('status', 'unknown'), self._timeout)
+            if errors:
+                message += " The last error was: {0}".format(errors[0])
+            raise AnsibleF5Error(message)
+        finally:
+            result['waited'] = round(time.time() - start, 1)
+
+    def flush(self):
+        result = dict(changed=False)
+
+        if self._wait_for:
+            self._wait(result)
+        else:
+            result.update(self._read())
+
         return result
 
 
@@ -27,32 +27,70 @@ module: f5bigip_facts
 short_description: Gather facts from BIG-IP system
 description:
     - Collect facts from BIG-IP system.
+    - The hyphens are removed from the names of the properties, at any depth, so that they can be used as Jinja2
+      attributes (for example, C(load-balancing-mode) becomes C(loadbalancingmode)).
 version_added: "2.4"
 author:
     - "Eric Jacob (@erjac77)"
 options:
+    cache:
+        description:
+            - Specifies whether the collected facts are cached on the controller (in ~/.ansible/f5bigip/facts).
+            - A cached response is reused as long as the configuration generation of the BIG-IP
+              (/mgmt/tm/sys/config) has not changed, or when the BIG-IP confirms with its ETag that the resource is
+              unchanged; otherwise it is collected again.
+        default: false
+        type: bool
     component:
         description:
             - Specifies the component to collect.
-        required: true
+            - Required unless I(components) is specified.
+    components:
+        description:
+            - Specifies a list of components to collect in a single task.
+            - Each component is either a dict with the I(namespace), I(module), I(sub_module) and I(component) keys,
+              or a string in the form C(module/component) or C(module/sub_module/component) relative to I(namespace).
+            - The components are fetched concurrently (see I(concurrency)) with the same query options, and their
+              facts are merged in the result set.
+    concurrency:
+        description:
+            - Specifies the maximum number of components fetched at the same time.
+        default: 4
     expand_subcollections:
         description:
             - Specifies that iControl REST expand any references to sub collections when set to true/yes.
     filter:
         description:
             - Specifies an administrative partition to query for a result set.
+    max_bytes:
+        description:
+            - Specifies the maximum size, in bytes, of the items kept in memory.
+            - When the limit is reached, the remaining items are dropped and C(truncated) is set in the result set.
+    max_items:
+        description:
+            - Specifies the maximum number of items to collect.
+            - When the limit is reached, the remaining items are dropped and C(truncated) is set in the result set.
     module:
         description:
             - Specifies the module.
-        required: true
+            - Required unless I(components) is specified.
     namespaces:
         description:
             - Specifies the namespace of the request.
             - The default value is 'tm' (for traffic management).
         default: tm
+    page_size:
+        description:
+            - Specifies the number of items requested per page when collecting a 'tm' collection.
+            - The pages are fetched with $top/$skip until the BIG-IP stops returning a nextLink, and their items are
+              parsed as they are received.
+            - Only set it for collections, since $top and $skip are sent with the first request as well.
+            - Paging is disabled when I(skip) or I(top) is specified, or when set to 0.
+        default: 0
     select:
         description:
             - Specifies a subset of the properties that will appear in the result set.
+            - Accepts a list or a comma-separated string; the C(name) property is always included.
     sub_module:
         description:
             - Specifies the sub-module.
@@ -84,6 +122,21 @@ EXAMPLES = '''
 
 - debug:
     msg: "{{ tm_ltm_pool['items']|map(attribute='name')|list }}"
+
+- name: Collect BIG-IP facts of several components
+  f5bigip_facts:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    components:
+      - ltm/pool
+      - ltm/virtual
+      - net/self
+      - sys/software/image
+      - { namespace: tm, module: gtm, sub_module: wideip, component: a }
+    concurrency: 4
+  delegate_to: localhost
 '''
 
 RETURN = '''
@@ -91,19 +144,81 @@ ansible_facts.({namespace})_({module})(_{sub_module})?_({component}):
     description: Facts about BIG-IP components
     returned: On success
     type: complex
+cached:
+    description: The components served from the facts cache.
+    returned: When cache is enabled
+    type: list
 '''
 
-from ansible.module_utils.basic import AnsibleModule, json
-from ansible.module_utils.six import iteritems, iterkeys
-from ansible.module_utils.urls import open_url
-from ansible_common_f5.base import F5_PROVIDER_ARGS
+from multiprocessing.pool import ThreadPool
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import get_base_url
+from ansible.module_utils.f5bigip import get_session
+from ansible.module_utils.f5bigip_cache import F5FactsCache
+from ansible.module_utils.f5bigip_cache import get_config_stamp
+from ansible.module_utils.f5bigip_json import F5CollectionParser
+from ansible.module_utils.f5bigip_json import F5KeyNormalizer
+from ansible.module_utils.six import iteritems, string_types
+from ansible_common_f5.base import AnsibleF5Error
+
+COMPONENT_KEYS = ['namespace', 'module', 'sub_module', 'component']
+
+
+# Keys describing a single page of a collection, meaningless once the pages are merged
+PAGING_KEYS = ['currentItemCount', 'itemsPerPage', 'nextLink', 'pageIndex', 'previousLink', 'startIndex', 'totalPages']
+
+
+def build_query(rparams, expand_subcollections=False):
+    req_params = ""
+    if expand_subcollections:
+        req_params += "?expandSubcollections=true"
+    if rparams:
+        if not req_params:
+            req_params = "?"
+        for k, v in iteritems(rparams):
+            if len(req_params) > 1:
+                req_params += "&"
+            req_params += "$" + k + "=" + str(v)
+    return req_params
+
+
+def get_resources(params):
+    """Return the resource path of every component to collect."""
+    if not params['components']:
+        components = [dict((k, params[k]) for k in COMPONENT_KEYS)]
+    else:
+        components = list()
+        for component in params['components']:
+            if isinstance(component, string_types):
+                parts = component.strip('/').split('/')
+                if len(parts) not in [2, 3]:
+                    raise AnsibleF5Error("Invalid component '{0}', expecting 'module/component' or "
+                                         "'module/sub_module/component'.".format(component))
+                component = dict(module=parts[0], sub_module=parts[1] if len(parts) == 3 else None,
+                                 component=parts[-1])
+            elif not isinstance(component, dict) or not component.get('module') or not component.get('component'):
+                raise AnsibleF5Error("Each component must be a string or a dict with at least the 'module' and "
+                                     "'component' keys.")
+            components.append(component)
 
+    resources = list()
+    for component in components:
+        resource = (component.get('namespace') or params['namespace']) + "/" + component['module']
+        if component.get('sub_module'):
+            resource += "/" + component['sub_module']
+        resource += "/" + component['component']
+        if resource not in resources:
+            resources.append(resource)
+    return resources
 
-def get_facts(uri, **params):
+
+def get_facts(session, uri, facts_cache=None, **params):
     rparams = dict()
     rq_subcol = params['expand_subcollections']
     rq_filter = params['filter']
-    rq_select = params['select']
+    rq_select = list(params['select'] or [])
     rq_skip = params['skip']
     rq_top = params['top']
     if rq_filter:
@@ -111,54 +226,112 @@ def get_facts(uri, **params):
     if rq_select:
         if 'name' not in rq_select:
             rq_select.append('name')
-        rparams['select'] = rq_select
+        rparams['select'] = ",".join(rq_select)
     if rq_skip:
         rparams['skip'] = rq_skip
     if rq_top:
         rparams['top'] = rq_top
 
-    req_params = ""
-    if rq_subcol:
-        req_params += "?expandSubcollections=true"
-    if rparams:
-        if not req_params:
-            req_params = "?"
-        for k, v in iteritems(rparams):
-            if len(req_params) > 1:
-                req_params += "&"
-            req_params += "$" + k + "=" + str(v)
+    # Cache key of the request, before paging adds its own query parameters
+    cache_key = [uri, build_query(rparams, rq_subcol), params['max_items'], params['max_bytes']]
+    entry = facts_cache.get(cache_key) if facts_cache else None
+    if entry is not None and facts_cache.is_fresh(entry):
+        facts_cache.hit(uri)
+        return entry['document']
+
+    # Only page through the collection when the caller did not ask for a specific window
+    page_size = params['page_size']
+    paging = bool(page_size) and not rq_skip and not rq_top and uri.startswith('/mgmt/tm/')
+    if paging:
+        rparams['top'] = page_size
+        rparams['skip'] = 0
+
+    # The keys are normalized while the response is parsed, the selected properties are also filtered locally for
+    # the endpoints that do not support $select
+    normalizer = F5KeyNormalizer()
+    fields = set(normalizer.key(f) for f in rq_select)
+
+    max_items = params['max_items']
+    max_bytes = params['max_bytes']
+    items = list()
+    size = 0
+    document = None
+    truncated = False
+
+    etag = None
+    while True:
+        headers = dict()
+        if document is None and entry is not None and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        resp = open_facts_url(session, get_base_url(params) + uri + build_query(rparams, rq_subcol), headers)
+        if resp.status_code == 304:
+            # Unchanged since it was cached, only record the current configuration generation
+            resp.close()
+            facts_cache.set(cache_key, entry['document'], etag=entry['etag'])
+            facts_cache.hit(uri)
+            return entry['document']
+        if document is None:
+            etag = resp.headers.get('ETag')
+
+        parser = F5CollectionParser(resp.raw, object_pairs_hook=normalizer)
+        for item, item_size in parser:
+            if (max_items and len(items) >= max_items) or (max_bytes and size + item_size > max_bytes):
+                truncated = True
+                break
+            if fields:
+                item = dict((k, v) for k, v in iteritems(item) if k in fields)
+            items.append(item)
+            size += item_size
+        resp.close()
+
+        if document is None:
+            document = normalizer(iteritems(parser.document))
+        if truncated or not paging or 'nextLink' not in parser.document:
+            break
+        # The ETag of the first page does not cover the next ones
+        etag = None
+        rparams['skip'] += page_size
 
-    resp = open_url(
-        "https://" + params['f5_hostname'] + ':' + str(
-            params['f5_port']) + uri + req_params,
-        method="GET",
-        url_username=params['f5_username'],
-        url_password=params['f5_password'],
-        validate_certs=params['f5_verify']
-    )
+    if 'items' in document:
+        document['items'] = items
+    if paging:
+        for key in PAGING_KEYS:
+            document.pop(key, None)
+    if truncated:
+        document['truncated'] = True
 
-    return json.loads(resp.read())
+    if facts_cache:
+        facts_cache.set(cache_key, document, etag=etag)
+    return document
 
 
-def convert_keys(data):
-    for key in iterkeys(data):
-        new_key = key.replace("-", "")
-        if new_key != key:
-            data[new_key] = data[key]
-            del data[key]
-    return data
+def open_facts_url(session, url, headers=None):
+    """GET a URL with the session and return the response, whose body is left unread in its 'raw' attribute."""
+    resp = session.get(url, headers=headers, stream=True)
+    if resp.status_code >= 400:
+        resp.close()
+        raise AnsibleF5Error("Unable to retrieve {0}: {1} {2}".format(url, resp.status_code, resp.reason))
+    # Let urllib3 decompress the body while it is read
+    resp.raw.decode_content = True
+    return resp
 
 
 class ModuleParams(object):
     @property
     def argument_spec(self):
         argument_spec = dict(
-            component=dict(type='str', required=True),
+            cache=dict(type='bool', default=False),
+            component=dict(type='str'),
+            components=dict(type='list'),
+            concurrency=dict(type='int', default=4),
             expand_subcollections=dict(type='bool'),
             filter=dict(type='str'),
-            module=dict(type='str', required=True),
+            max_bytes=dict(type='int'),
+            max_items=dict(type='int'),
+            module=dict(type='str'),
             namespace=dict(type='str', default='tm'),
-            select=dict(type='str'),
+            page_size=dict(type='int', default=0),
+            select=dict(type='list'),
             skip=dict(type='int'),
             sub_module=dict(type='str'),
             top=dict(type='int')
@@ -170,21 +343,57 @@ class ModuleParams(object):
     def supports_check_mode(self):
         return True
 
+    @property
+    def mutually_exclusive(self):
+        return [
+            ['component', 'components'],
+            ['module', 'components']
+        ]
+
+    @property
+    def required_one_of(self):
+        return [
+            ['component', 'components']
+        ]
+
+    @property
+    def required_together(self):
+        return [
+            ['component', 'module']
+        ]
+
 
 def main():
     params = ModuleParams()
-    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode)
+    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode,
+                           mutually_exclusive=params.mutually_exclusive, required_one_of=params.required_one_of,
+                           required_together=params.required_together)
 
     try:
-        facts = {}
+        resources = get_resources(module.params)
+        concurrency = max(1, min(module.params['concurrency'], len(resources)))
 
-        resource = module.params['namespace'] + "/" + module.params['module']
-        if module.params['sub_module'] is not None:
-            resource += "/" + module.params['sub_module']
-        resource += "/" + module.params['component']
+        # One session for all the components, keeping up to 'concurrency' connections alive
+        session = get_session(module.params, pool_size=concurrency)
+        pool = ThreadPool(concurrency)
+        try:
+            cache = None
+            if module.params['cache']:
+                base_url = get_base_url(module.params)
+                cache = F5FactsCache(base_url, module.params['f5_username'], get_config_stamp(session, base_url))
+            documents = pool.map(
+                lambda resource: get_facts(session, "/mgmt/" + resource + "/", facts_cache=cache, **module.params),
+                resources)
+        finally:
+            pool.close()
+            pool.join()
+            session.close()
 
-        facts[resource.replace("/", "_")] = get_facts(uri="/mgmt/" + resource + "/", **module.params)
-        result = {'ansible_facts': convert_keys(facts)}
+        facts = dict((resource.replace("/", "_").replace("-", ""), document)
+                     for resource, document in zip(resources, documents))
+        result = {'ansible_facts': facts}
+        if cache:
+            result['cached'] = [r for r in resources if "/mgmt/" + r + "/" in cache.hits]
         module.exit_json(**result)
     except Exception as exc:
         module.fail_json(msg=str(exc))
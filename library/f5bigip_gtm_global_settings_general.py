@@ -172,11 +172,11 @@ EXAMPLES = '''
 RETURN = ''' # '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpUnnamedObject
 from ansible.module_utils.six.moves import range
 from ansible_common_f5.base import F5_ACTIVATION_CHOICES
 from ansible_common_f5.base import F5_POLAR_CHOICES
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpUnnamedObject
 
 
 class ModuleParams(object):
@@ -121,10 +121,11 @@ EXAMPLES = '''
 RETURN = ''' # '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import attach_resource
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpNamedObject
 from ansible_common_f5.base import F5_ACTIVATION_CHOICES
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
 from f5.bigip.resource import OrganizingCollection
 
 
@@ -165,10 +166,12 @@ class ModuleParams(object):
 
 class F5BigIpGtmPoolMember(F5BigIpNamedObject):
     def _set_crud_methods(self):
+        # Address the members subcollection directly, without loading the pool
         if isinstance(self._api.tm.gtm.pools, OrganizingCollection):
-            pool = self._api.tm.gtm.pools.a_s.a.load(**self._get_resource_id_from_path(self._params['pool']))
+            pool = self._api.tm.gtm.pools.a_s.a
         else:
-            pool = self._api.tm.gtm.pools.pool.load(**self._get_resource_id_from_path(self._params['pool']))
+            pool = self._api.tm.gtm.pools.pool
+        pool = attach_resource(pool, **self._get_resource_id_from_path(self._params['pool']))
         self._methods = {
             'create': pool.members_s.member.create,
             'read': pool.members_s.member.load,
@@ -132,10 +132,11 @@ EXAMPLES = '''
 RETURN = ''' # '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import attach_resource
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpNamedObject
 from ansible_common_f5.base import F5_ACTIVATION_CHOICES
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
 
 
 class ModuleParams(object):
@@ -179,8 +180,9 @@ class ModuleParams(object):
 
 class F5BigIpGtmServerVirtualServer(F5BigIpNamedObject):
     def _set_crud_methods(self):
-        server = self._api.tm.gtm.servers.server.load(
-            **self._get_resource_id_from_path(self._params['server']))
+        # Address the virtual servers subcollection directly, without loading the server
+        server = attach_resource(self._api.tm.gtm.servers.server,
+                                 **self._get_resource_id_from_path(self._params['server']))
         self._methods = {
             'create': server.virtual_servers_s.virtual_server.create,
             'read': server.virtual_servers_s.virtual_server.load,
@@ -31,6 +31,14 @@ version_added: "2.4"
 author:
     - "Eric Jacob (@erjac77)"
 options:
+    aggregate:
+        description:
+            - When C(yes), the address records are collapsed into the smallest set of networks before being applied.
+            - Duplicates and the networks enclosed in a network with the same data are removed, and the adjacent
+              networks with the same data are merged; the networks with different data are kept apart.
+            - Only used with the C(ip) type.
+        default: false
+        type: bool
     app_service:
         description:
             - Specifies the application service that the object belongs to.
@@ -48,6 +56,17 @@ options:
     records:
         description:
             - Configures the data in the group.
+            - Each record is a dict with the C(name) and C(data) keys, or the name of the record only.
+    records_action:
+        description:
+            - Specifies how the records are applied to the records of an existing data group.
+            - When C(add), the records are added, or modified when their data differ.
+            - When C(remove), the records with these names are removed.
+            - When C(replace), the data group ends up with these records only.
+            - Only the records that differ are sent to the BIG-IP, in a single tmsh transaction, unless most of the
+              records change.
+        default: replace
+        choices: ['add', 'remove', 'replace']
     state:
         description:
             - Specifies the state of the component on the BIG-IP system.
@@ -78,23 +97,56 @@ EXAMPLES = '''
     type: string
     state: present
   delegate_to: localhost
+
+- name: Add records to LTM Internal Data-Group
+  f5bigip_ltm_data_group_internal:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    name: my_int_dg
+    partition: Common
+    records: [{'name': 'n3', 'data': 'd3'}]
+    records_action: add
+    state: present
+  delegate_to: localhost
 '''
 
 RETURN = ''' # '''
 
+import re
+
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpNamedObject
+from ansible.module_utils.f5bigip_records import RECORDS_ACTIONS
+from ansible.module_utils.f5bigip_records import aggregate_records
+from ansible.module_utils.f5bigip_records import diff_records
+from ansible.module_utils.f5bigip_records import index_records
+from ansible.module_utils.f5bigip_records import merge_records
+from ansible.module_utils.f5bigip_records import to_records
+from ansible.module_utils.six import iteritems
+from ansible.module_utils.six.moves import shlex_quote
+from ansible_common_f5.base import AnsibleF5Error
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
+
+# Maximum length of the tmsh commands changing the records, run as a single command line
+TMSH_COMMAND_SIZE = 65536
+
+
+def tmsh_quote(value):
+    return '"{0}"'.format(value.replace('\\', '\\\\').replace('"', '\\"'))
 
 
 class ModuleParams(object):
     @property
     def argument_spec(self):
         argument_spec = dict(
+            aggregate=dict(type='bool', default=False),
             app_service=dict(type='str'),
             description=dict(type='str'),
             records=dict(type='list'),
+            records_action=dict(type='str', choices=RECORDS_ACTIONS, default='replace'),
             type=dict(type='str', choices=['integer', 'ip', 'string'])
         )
         argument_spec.update(F5_PROVIDER_ARGS)
@@ -113,8 +165,86 @@ class F5BigIpLtmDataGroupInternal(F5BigIpNamedObject):
             'read': self._api.tm.ltm.data_group.internals.internal.load,
             'update': self._api.tm.ltm.data_group.internals.internal.update,
             'delete': self._api.tm.ltm.data_group.internals.internal.delete,
-            'exists': self._api.tm.ltm.data_group.internals.internal.exists
+            'exists': self._api.tm.ltm.data_group.internals.internal.exists,
+            'run': self._api.tm.util.bash.exec_cmd
         }
+        self._records_action = self._params.pop('recordsAction', None) or 'replace'
+        self._aggregate = self._params.pop('aggregate', None)
+
+    def _index_records(self, records, dg_type):
+        # The records to remove are left as given
+        if self._aggregate and dg_type == 'ip' and self._records_action != 'remove':
+            return aggregate_records(records)
+        return index_records(records, dg_type)
+
+    def _create(self):
+        if self._records_action == 'remove' or not self._params['records']:
+            self._params['records'] = None
+        elif self._params['records'] is not None and self._aggregate and self._params['type'] == 'ip':
+            self._params['records'] = to_records(aggregate_records(self._params['records']))
+        return super(F5BigIpLtmDataGroupInternal, self)._create()
+
+    def _records_commands(self, path, added, modified, deleted, desired):
+        """Return the tmsh commands applying the changed records only."""
+        commands = list()
+        for operation, names in [('delete', deleted), ('modify', modified), ('add', added)]:
+            if not names:
+                continue
+            if operation == 'delete':
+                records = ' '.join(tmsh_quote(name) for name in names)
+            else:
+                records = ' '.join('{0} {{ data {1} }}'.format(tmsh_quote(name), tmsh_quote(desired[name]))
+                                   for name in names)
+            commands.append('modify ltm data-group internal {0} records {1} {{ {2} }}'.format(path, operation, records))
+        return commands
+
+    def _run_transaction(self, path, diff, commands):
+        """Run the tmsh commands, and the change of the attributes, in a single tmsh transaction."""
+        if diff:
+            attributes = ' '.join('{0} {1}'.format(re.sub('([A-Z])', r'-\1', key).lower(), tmsh_quote(str(value)))
+                                  for key, value in iteritems(diff))
+            commands = ['modify ltm data-group internal {0} {1}'.format(path, attributes)] + commands
+        script = '; '.join(['create cli transaction'] + commands + ['submit cli transaction'])
+        output = self._methods['run']('run', utilCmdArgs='-c ' + shlex_quote('tmsh -q -c ' + shlex_quote(script)))
+        if getattr(output, 'commandResult', None):
+            raise AnsibleF5Error("Unable to update '{0}', none of the changes was applied: {1}".format(
+                path, output.commandResult.strip()))
+
+    def _update(self):
+        """Send the attributes that differ and the records that changed only."""
+        obj = self._read()
+        records = self._params.pop('records', None)
+        diff = self._diff(obj)
+
+        changes = ([], [], [])
+        if records is not None:
+            dg_type = self._params.get('type') or getattr(obj, 'type', None)
+            current = index_records(getattr(obj, 'records', None), dg_type)
+            desired = self._index_records(records, dg_type)
+            changes = diff_records(current, desired, self._records_action)
+        count = sum(len(names) for names in changes)
+        if not diff and not count:
+            return False
+        if self._check_mode:
+            return True
+
+        path = '/{0}/{1}'.format(self._params['partition'], self._params['name'])
+        commands = list()
+        if count:
+            merged = merge_records(current, desired, self._records_action)
+            commands = self._records_commands(path, changes[0], changes[1], changes[2], desired)
+            if not merged:
+                # The API rejects an empty list of records
+                commands = ['modify ltm data-group internal {0} records none'.format(path)]
+            elif count * 2 > len(merged) or len('; '.join(commands)) > TMSH_COMMAND_SIZE:
+                # Replace all the records at once when most of them change, or the changes do not fit in a command
+                diff['records'] = to_records(merged)
+                commands = list()
+        if commands:
+            self._run_transaction(path, diff, commands)
+        else:
+            obj.modify(**diff)
+        return True
 
 
 def main():
@@ -430,9 +430,10 @@ EXAMPLES = '''
 RETURN = ''' # '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import attach_resource
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpNamedObject
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
 
 
 class ModuleParams(object):
@@ -578,9 +579,10 @@ class ModuleParams(object):
 
 class F5BigIpLtmPolicyRuleAction(F5BigIpNamedObject):
     def _set_crud_methods(self):
-        policy = self._api.tm.ltm.policys.policy.load(
-            **self._get_resource_id_from_path(self._params['policy']))
-        rule = policy.rules_s.rules.load(name=self._params['rule'])
+        # Address the rule directly, without loading the policy and the rule
+        policy = attach_resource(self._api.tm.ltm.policys.policy,
+                                 **self._get_resource_id_from_path(self._params['policy']))
+        rule = attach_resource(policy.rules_s.rules, name=self._params['rule'])
         self._methods = {
             'create': rule.actions_s.actions.create,
             'read': rule.actions_s.actions.load,
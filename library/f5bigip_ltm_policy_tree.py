@@ -0,0 +1,320 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: f5bigip_ltm_policy_tree
+short_description: BIG-IP ltm policy declarative module
+description:
+    - Configures a policy for Centralized Policy Manager with all its rules, actions and conditions at once.
+    - The policy is read with a single expanded GET and compared with the desired rule tree. When they differ, the
+      whole tree is written to the draft of the policy in a single request, then the draft is published.
+version_added: "2.4"
+author:
+    - "Eric Jacob (@erjac77)"
+options:
+    controls:
+        description:
+            - Specifies the set of features the policy controls.
+    description:
+        description:
+            - Specifies descriptive text that identifies the component.
+    name:
+        description:
+            - Specifies unique name for the component.
+        required: true
+    partition:
+        description:
+            - Specifies the administrative partition in which the component object resides.
+        default: Common
+    publish:
+        description:
+            - Specifies whether the draft is published once written.
+            - When C(no), the rule tree is compared with the draft of the policy, if there is one.
+        default: true
+        type: bool
+    requires:
+        description:
+            - Specifies the required profile types.
+    rules:
+        description:
+            - Specifies the complete list of rules of the policy; the rules that are not in the list are removed.
+            - Each rule is a dict with the C(name), C(ordinal), C(description), C(actions) and C(conditions) keys.
+            - The actions and conditions accept the same options as the f5bigip_ltm_policy_rule_action and
+              f5bigip_ltm_policy_rule_condition modules, with their C(name) (for example C(0), C(1)).
+        default: []
+    strategy:
+        description:
+            - Specifies the match strategy to use for this policy.
+    state:
+        description:
+            - Specifies the state of the component on the BIG-IP system.
+        default: present
+        choices: ['absent', 'present']
+requirements:
+    - BIG-IP >= 12.1
+    - ansible-common-f5
+    - f5-sdk
+'''
+
+EXAMPLES = '''
+- name: Configure LTM Policy with its rules
+  f5bigip_ltm_policy_tree:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    name: my_policy
+    partition: Common
+    description: My ltm policy
+    strategy: /Common/first-match
+    requires:
+      - http
+    controls:
+      - forwarding
+    rules:
+      - name: block-cmd
+        ordinal: 1
+        conditions:
+          - { name: 0, http_uri: yes, contains: yes, values: [cmd.exe, root.exe] }
+        actions:
+          - { name: 0, forward: yes, reset: yes }
+      - name: default
+        ordinal: 2
+        actions:
+          - { name: 0, forward: yes, pool: /Common/my_pool }
+    state: present
+  delegate_to: localhost
+'''
+
+RETURN = '''
+created:
+    description: The names of the rules that were created.
+    returned: always
+    type: list
+modified:
+    description: The names of the rules that were modified.
+    returned: always
+    type: list
+deleted:
+    description: The names of the rules that were deleted.
+    returned: always
+    type: list
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpRestObject
+from ansible.module_utils.f5bigip import is_equal
+from ansible.module_utils.six import iteritems
+from ansible_common_f5.base import AnsibleF5Error
+
+# Policy attributes compared with the BIG-IP
+POLICY_KEYS = ['controls', 'description', 'requires', 'strategy']
+
+# Translation dict for conflictual params
+ITEM_TR = {'tm_not': 'not'}
+
+
+def to_attribute(key):
+    """Translate an action or condition option from snake_case into an iControl REST attribute."""
+    if key in ITEM_TR:
+        return ITEM_TR[key]
+    words = key.split('_')
+    result = words[0]
+    for word in words[1:]:
+        # Keep the underscore of attributes such as last_1min
+        result += '_' + word if word[:1].isdigit() else word[:1].upper() + word[1:]
+    return result
+
+
+def to_items(items, kind):
+    """Translate a list of actions or conditions, indexed by name."""
+    result = dict()
+    for item in items or []:
+        if not isinstance(item, dict) or item.get('name') is None:
+            raise AnsibleF5Error("Each {0} must be a dict with at least a 'name' key.".format(kind))
+        result[str(item['name'])] = dict((to_attribute(k), v) for k, v in iteritems(item) if v is not None)
+        result[str(item['name'])]['name'] = str(item['name'])
+    return result
+
+
+def get_subcollection(obj, key):
+    """Return the items of an expanded subcollection, indexed by name."""
+    return dict((item['name'], item) for item in obj.get(key + 'Reference', dict()).get('items', []))
+
+
+class ModuleParams(object):
+    @property
+    def argument_spec(self):
+        argument_spec = dict(
+            controls=dict(type='list'),
+            description=dict(type='str'),
+            name=dict(type='str', required=True),
+            partition=dict(type='str', default='Common'),
+            publish=dict(type='bool', default=True),
+            requires=dict(type='list'),
+            rules=dict(type='list', default=[]),
+            strategy=dict(type='str'),
+            state=dict(type='str', choices=['absent', 'present'], default='present')
+        )
+        argument_spec.update(F5_PROVIDER_ARGS)
+        return argument_spec
+
+    @property
+    def supports_check_mode(self):
+        return True
+
+
+class F5BigIpLtmPolicyTree(F5BigIpRestObject):
+    def _path(self, draft=False):
+        sub_path = '~Drafts' if draft else ''
+        return 'ltm/policy/~{0}{1}~{2}'.format(self._params['partition'], sub_path, self._params['name'])
+
+    def _read(self, draft=False):
+        """Read the policy with its rules, actions and conditions in a single GET."""
+        return self._get(self._path(draft), params=dict(expandSubcollections='true'))
+
+    def _desired_rules(self):
+        result = list()
+        for index, rule in enumerate(self._params['rules']):
+            if not isinstance(rule, dict) or not rule.get('name'):
+                raise AnsibleF5Error("Each rule must be a dict with at least a 'name' key.")
+            desired = dict(
+                name=rule['name'],
+                ordinal=rule.get('ordinal', index),
+                actions=to_items(rule.get('actions'), 'action'),
+                conditions=to_items(rule.get('conditions'), 'condition')
+            )
+            if rule.get('description') is not None:
+                desired['description'] = rule['description']
+            result.append(desired)
+        return result
+
+    def _diff_rule(self, current, desired):
+        """Return True when the rule, its actions or its conditions differ from the current ones."""
+        partition = self._params['partition']
+        for key in ['description', 'ordinal']:
+            if key in desired and not is_equal(current.get(key), desired[key], partition, key):
+                return True
+        for key in ['actions', 'conditions']:
+            items = get_subcollection(current, key)
+            if set(items) != set(desired[key]):
+                return True
+            for name, item in iteritems(desired[key]):
+                if not is_equal(items[name], item, partition):
+                    return True
+        return False
+
+    def _diff(self, current, rules):
+        """Compare the policy with the desired one, return whether its attributes differ and the rule changes."""
+        partition = self._params['partition']
+        changed = any(self._params[k] is not None and not is_equal(current.get(k), self._params[k], partition, k)
+                      for k in POLICY_KEYS)
+
+        current_rules = get_subcollection(current, 'rules')
+        created = [r['name'] for r in rules if r['name'] not in current_rules]
+        modified = [r['name'] for r in rules
+                    if r['name'] in current_rules and self._diff_rule(current_rules[r['name']], r)]
+        desired_names = set(r['name'] for r in rules)
+        deleted = [name for name in current_rules if name not in desired_names]
+        return changed, created, modified, deleted
+
+    def _payload(self, rules):
+        payload = dict(name=self._params['name'], partition=self._params['partition'], subPath='Drafts')
+        payload.update((k, self._params[k]) for k in POLICY_KEYS if self._params[k] is not None)
+        payload['rules'] = list()
+        for rule in rules:
+            rule = dict(rule)
+            rule['actions'] = [rule['actions'][k] for k in sorted(rule['actions'])]
+            rule['conditions'] = [rule['conditions'][k] for k in sorted(rule['conditions'])]
+            payload['rules'].append(rule)
+        return payload
+
+    def _present(self, result):
+        published = self._read()
+        draft = None
+        if published is None or not self._params['publish']:
+            draft = self._read(draft=True)
+        current = published if self._params['publish'] else draft or published
+
+        rules = self._desired_rules()
+        if current is None:
+            result['created'] = [r['name'] for r in rules]
+            changed = True
+        else:
+            changed, result['created'], result['modified'], result['deleted'] = self._diff(current, rules)
+        result['changed'] = bool(changed or result['created'] or result['modified'] or result['deleted'])
+
+        if self._check_mode or not result['changed']:
+            return
+
+        payload = self._payload(rules)
+        if published is None and draft is None:
+            # New policy, create its draft with the whole rule tree
+            self._request('POST', 'ltm/policy', json=payload)
+        else:
+            if published is not None:
+                try:
+                    self._request('PATCH', self._path(), json=dict(createDraft=True))
+                except AnsibleF5Error:
+                    # The draft already exists
+                    pass
+            self._request('PUT', self._path(draft=True), json=payload)
+
+        if self._params['publish']:
+            self._request('POST', 'ltm/policy', json=dict(
+                command='publish',
+                name='/{0}/Drafts/{1}'.format(self._params['partition'], self._params['name'])
+            ))
+
+    def _absent(self, result):
+        paths = [path for path in [self._path(), self._path(draft=True)] if self._get(path) is not None]
+        result['changed'] = bool(paths)
+        if not self._check_mode:
+            for path in paths:
+                self._request('DELETE', path)
+
+    def flush(self):
+        result = dict(changed=False, created=list(), modified=list(), deleted=list())
+        if self._params['state'] == 'present':
+            self._present(result)
+        else:
+            self._absent(result)
+        return result
+
+
+def main():
+    params = ModuleParams()
+    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode)
+
+    try:
+        obj = F5BigIpLtmPolicyTree(check_mode=module.check_mode, **module.params)
+        result = obj.flush()
+        module.exit_json(**result)
+    except Exception as exc:
+        module.fail_json(msg=str(exc))
+
+
+if __name__ == '__main__':
+    main()
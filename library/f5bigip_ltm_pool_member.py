@@ -146,10 +146,11 @@ EXAMPLES = '''
 RETURN = ''' # '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import attach_resource
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpNamedObject
 from ansible_common_f5.base import F5_ACTIVATION_CHOICES
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
 
 
 class ModuleParams(object):
@@ -189,7 +190,8 @@ class ModuleParams(object):
 
 class F5BigIpLtmPoolMember(F5BigIpNamedObject):
     def _set_crud_methods(self):
-        pool = self._api.tm.ltm.pools.pool.load(**self._get_resource_id_from_path(self._params['pool']))
+        # Address the members subcollection directly, without loading the pool
+        pool = attach_resource(self._api.tm.ltm.pools.pool, **self._get_resource_id_from_path(self._params['pool']))
         self._methods = {
             'create': pool.members_s.members.create,
             'read': pool.members_s.members.load,
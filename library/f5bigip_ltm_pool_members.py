@@ -0,0 +1,256 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: f5bigip_ltm_pool_members
+short_description: BIG-IP ltm pool members bulk module
+description:
+    - Reconciles a list of pool members of a single pool.
+    - The members subcollection is read once, compared locally and only the members that differ are created, modified
+      or deleted.
+version_added: "2.4"
+author:
+    - "Eric Jacob (@erjac77)"
+options:
+    members:
+        description:
+            - Specifies the list of pool members to reconcile.
+            - Each member accepts the same options as the f5bigip_ltm_pool_member module (C(name), C(address),
+              C(connection_limit), C(description), C(dynamic_ratio), C(fqdn), C(inherit_profile), C(logging),
+              C(monitor), C(priority_group), C(rate_limit), C(ratio), C(session) and C(state_user)).
+            - The C(address) and C(fqdn) options are only used when the member is created.
+        required: true
+    partition:
+        description:
+            - Specifies the administrative partition in which the pool and its members reside.
+        default: Common
+    pool:
+        description:
+            - Specifies the pool in which the members belong.
+        required: true
+    purge:
+        description:
+            - Specifies whether the members of the pool that are not in the list should be deleted.
+            - Only used when C(state) is C(present).
+        default: false
+        type: bool
+    state:
+        description:
+            - Specifies the state of the members on the BIG-IP system.
+        default: present
+        choices: ['absent', 'present']
+requirements:
+    - BIG-IP >= 12.0
+    - ansible-common-f5
+    - f5-sdk
+'''
+
+EXAMPLES = '''
+- name: Reconcile LTM Pool Members
+  f5bigip_ltm_pool_members:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    pool: my_pool
+    partition: Common
+    members:
+      - { name: "my_member1:80", address: 10.10.10.101, ratio: 2 }
+      - { name: "my_member2:80", address: 10.10.10.102, description: My member 2 }
+    purge: yes
+    state: present
+  delegate_to: localhost
+
+- name: Remove LTM Pool Members
+  f5bigip_ltm_pool_members:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    pool: my_pool
+    partition: Common
+    members:
+      - { name: "my_member1:80" }
+      - { name: "my_member2:80" }
+    state: absent
+  delegate_to: localhost
+'''
+
+RETURN = '''
+created:
+    description: The names of the members that were created.
+    returned: always
+    type: list
+modified:
+    description: The names of the members that were modified.
+    returned: always
+    type: list
+deleted:
+    description: The names of the members that were deleted.
+    returned: always
+    type: list
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpUnnamedObject
+from ansible.module_utils.f5bigip import is_equal
+from ansible.module_utils.f5bigip import normalize_user_status
+from ansible.module_utils.six import iteritems
+from ansible_common_f5.base import AnsibleF5Error
+
+# Member options only used on creation; the device does not allow them to be modified
+CREATE_ONLY_KEYS = ['address', 'fqdn']
+
+# Translation dict for conflictual member params
+MEMBER_TR = {'state_user': 'state'}
+
+
+def to_member_params(member):
+    """Translate a member dict from the module's snake_case options into iControl REST attributes."""
+    result = dict()
+    for key, value in iteritems(member):
+        if value is None:
+            continue
+        if key in MEMBER_TR:
+            key = MEMBER_TR[key]
+        else:
+            words = key.split('_')
+            key = words[0] + ''.join(w.capitalize() for w in words[1:])
+        result[key] = value
+    return result
+
+
+class ModuleParams(object):
+    @property
+    def argument_spec(self):
+        argument_spec = dict(
+            members=dict(type='list', required=True),
+            partition=dict(type='str', default='Common'),
+            pool=dict(type='str', required=True),
+            purge=dict(type='bool', default=False),
+            state=dict(type='str', choices=['absent', 'present'], default='present')
+        )
+        argument_spec.update(F5_PROVIDER_ARGS)
+        return argument_spec
+
+    @property
+    def supports_check_mode(self):
+        return True
+
+
+class F5BigIpLtmPoolMembers(F5BigIpUnnamedObject):
+    def _set_crud_methods(self):
+        self._methods = {
+            'read': self._api.tm.ltm.pools.pool.load
+        }
+
+    def _read_members(self, pool):
+        """Read the members subcollection once and index it by partition and name."""
+        return dict(((m.partition, m.name), m) for m in pool.members_s.get_collection())
+
+    def _desired_members(self):
+        result = dict()
+        for member in self._params['members']:
+            if not isinstance(member, dict) or not member.get('name'):
+                raise AnsibleF5Error("Each member must be a dict with at least a 'name' key.")
+            params = to_member_params(member)
+            params.setdefault('partition', self._params['partition'])
+            result[(params['partition'], params['name'])] = params
+        return result
+
+    def _diff(self, current, desired):
+        """Return the attributes of the desired member that differ from the current one."""
+        partition = self._params['partition']
+        changes = dict()
+        for key, value in iteritems(desired):
+            if key in ['name', 'partition'] or key in CREATE_ONLY_KEYS:
+                continue
+            current_value = normalize_user_status(key, getattr(current, key, None))
+            if not is_equal(current_value, value, partition, key):
+                changes[key] = value
+        return changes
+
+    def flush(self):
+        result = dict(changed=False, created=list(), modified=list(), deleted=list())
+
+        try:
+            pool = self._methods['read'](name=self._params['pool'], partition=self._params['partition'])
+            current = self._read_members(pool)
+        except Exception as exc:
+            raise AnsibleF5Error("Unable to read the members of pool '{0}': {1}".format(self._params['pool'], exc))
+
+        desired = self._desired_members()
+
+        to_create = list()
+        to_modify = list()
+        to_delete = list()
+        if self._params['state'] == 'present':
+            for key, params in iteritems(desired):
+                if key not in current:
+                    to_create.append(params)
+                else:
+                    changes = self._diff(current[key], params)
+                    if changes:
+                        to_modify.append((current[key], changes))
+            if self._params['purge']:
+                to_delete = [m for key, m in iteritems(current) if key not in desired]
+        else:
+            to_delete = [m for key, m in iteritems(current) if key in desired]
+
+        result['created'] = [p['name'] for p in to_create]
+        result['modified'] = [m.name for m, _ in to_modify]
+        result['deleted'] = [m.name for m in to_delete]
+        result['changed'] = bool(to_create or to_modify or to_delete)
+
+        if self._check_mode or not result['changed']:
+            return result
+
+        try:
+            for member in to_delete:
+                member.delete()
+            for member, changes in to_modify:
+                member.modify(**changes)
+            for params in to_create:
+                pool.members_s.members.create(**params)
+        except Exception as exc:
+            raise AnsibleF5Error("Unable to reconcile the members of pool '{0}': {1}".format(self._params['pool'], exc))
+
+        return result
+
+
+def main():
+    params = ModuleParams()
+    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode)
+
+    try:
+        obj = F5BigIpLtmPoolMembers(check_mode=module.check_mode, **module.params)
+        result = obj.flush()
+        module.exit_json(**result)
+    except Exception as exc:
+        module.fail_json(msg=str(exc))
+
+
+if __name__ == '__main__':
+    main()
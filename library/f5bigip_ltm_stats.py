@@ -0,0 +1,282 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: f5bigip_ltm_stats
+short_description: BIG-IP ltm stats module
+description:
+    - Computes the connection, bit and packet rates of the virtual servers, pools and pool members of a partition.
+    - The stats of all the objects of a kind are read with a single request (/mgmt/tm/ltm/virtual/stats,
+      /mgmt/tm/ltm/pool/stats and /mgmt/tm/ltm/pool/members/stats), twice, I(interval) seconds apart. The rates are
+      the differences between the two samples, divided by the time elapsed between them.
+    - The responses are parsed while they are read, and only the counters used by the rates are kept.
+version_added: "2.4"
+author:
+    - "Eric Jacob (@erjac77)"
+options:
+    components:
+        description:
+            - Specifies the kinds of objects whose rates are computed.
+        default: ['virtual', 'pool', 'pool_member']
+        choices: ['virtual', 'pool', 'pool_member']
+    interval:
+        description:
+            - Specifies the number of seconds between the two samples.
+        default: 10
+    partition:
+        description:
+            - Specifies the administrative partition of the objects.
+            - When C(all), the objects of all the partitions are returned.
+        default: Common
+requirements:
+    - BIG-IP >= 12.0
+    - ansible-common-f5
+'''
+
+EXAMPLES = '''
+- name: Get the rates of the virtual servers and pools
+  f5bigip_ltm_stats:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    components:
+      - virtual
+      - pool
+    interval: 30
+  delegate_to: localhost
+  register: result
+
+- name: Display the busiest virtual servers
+  debug:
+    msg: "{{ item.name }}: {{ item.conns }} conns/s"
+  with_items: "{{ result.stats.virtual|sort(attribute='conns', reverse=true) }}"
+'''
+
+RETURN = '''
+stats:
+    description:
+        - The rates of each object, by kind of object.
+        - C(conns) is in connections per second, C(bits_in) and C(bits_out) in bits per second, C(pkts_in) and
+          C(pkts_out) in packets per second, and C(cur_conns) is the number of connections at the second sample.
+        - The rates are null when an object was not found in both samples, or when its counters were reset.
+        - The pool members also have the C(pool) key.
+    returned: success
+    type: dict
+    sample:
+        virtual:
+            - { name: /Common/my_virtual, cur_conns: 120, conns: 35.2, bits_in: 1843200.0, bits_out: 9830400.0,
+                pkts_in: 950.4, pkts_out: 1210.7 }
+        pool:
+            - { name: /Common/my_pool, cur_conns: 118, conns: 35.1, bits_in: 1802240.0, bits_out: 9789440.0,
+                pkts_in: 948.0, pkts_out: 1207.2 }
+        pool_member:
+            - { name: /Common/10.0.0.1:80, pool: /Common/my_pool, cur_conns: 59, conns: 17.6, bits_in: 901120.0,
+                bits_out: 4894720.0, pkts_in: 474.0, pkts_out: 603.6 }
+interval:
+    description: The number of seconds elapsed between the two samples of each kind of object.
+    returned: success
+    type: dict
+    sample: { virtual: 10.02, pool: 10.01, pool_member: 10.03 }
+'''
+
+import time
+from array import array
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpRestObject
+from ansible.module_utils.f5bigip_json import F5CollectionParser
+from ansible_common_f5.base import AnsibleF5Error
+
+STATS_PATHS = {
+    'virtual': 'ltm/virtual/stats',
+    'pool': 'ltm/pool/stats',
+    'pool_member': 'ltm/pool/members/stats'
+}
+
+# Prefix of the counters, by kind of object
+STATS_SIDES = {
+    'virtual': 'clientside.',
+    'pool': 'serverside.',
+    'pool_member': 'serverside.'
+}
+
+# Rates, by counter
+RATES = [
+    ('conns', 'totConns'),
+    ('bits_in', 'bitsIn'),
+    ('bits_out', 'bitsOut'),
+    ('pkts_in', 'pktsIn'),
+    ('pkts_out', 'pktsOut')
+]
+
+
+class F5StatsSample(object):
+    """Counters of all the objects of a kind, kept in a column per counter.
+
+    The columns are arrays of 64-bit unsigned integers, indexed like the names of the objects; the objects missing
+    from the sample are flagged in the 'found' column. A sample created with the names of a previous one ignores the
+    other objects.
+    """
+
+    def __init__(self, names=None):
+        self._fixed = names is not None
+        self.names = list(names or [])
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+        self.found = array('B', [0]) * len(self.names)
+        self.columns = dict((counter, array('Q', [0]) * len(self.names))
+                            for counter in [counter for _, counter in RATES] + ['curConns'])
+        self.time = None
+
+    def slot(self, name):
+        """Return the index of an object in the columns, or None when the object is ignored."""
+        i = self.index.get(name)
+        if i is None:
+            if self._fixed:
+                return None
+            i = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.found.append(0)
+            for column in self.columns.values():
+                column.append(0)
+        self.found[i] = 1
+        return i
+
+
+def get_value(stats, key):
+    stat = stats.get(key) or dict()
+    return stat.get('value', stat.get('description'))
+
+
+class ModuleParams(object):
+    @property
+    def argument_spec(self):
+        argument_spec = dict(
+            components=dict(type='list', default=['virtual', 'pool', 'pool_member']),
+            interval=dict(type='int', default=10),
+            partition=dict(type='str', default='Common')
+        )
+        argument_spec.update(F5_PROVIDER_ARGS)
+        return argument_spec
+
+    @property
+    def supports_check_mode(self):
+        return True
+
+
+class F5BigIpLtmStats(F5BigIpRestObject):
+    def _object_name(self, component, stats):
+        """Return the name of an object, and the name of its pool for a pool member."""
+        if component != 'pool_member':
+            return get_value(stats, 'tmName'), None
+        node = get_value(stats, 'nodeName') or get_value(stats, 'addr')
+        return '{0}:{1}'.format(node, get_value(stats, 'port')), get_value(stats, 'poolName')
+
+    def _sample(self, component, sample):
+        """Read the stats of all the objects of a kind into the sample."""
+        prefix = '/{0}/'.format(self._params['partition'])
+        side = STATS_SIDES[component]
+        url = self._url(STATS_PATHS[component])
+        sample_time = time.time()
+        resp = self._session.get(url, stream=True)
+        if resp.status_code >= 400:
+            resp.close()
+            raise AnsibleF5Error("Unable to retrieve {0}: {1} {2}".format(url, resp.status_code, resp.reason))
+        resp.raw.decode_content = True
+        try:
+            for entry, _ in F5CollectionParser(resp.raw, items_key='entries'):
+                stats = entry.get('nestedStats', dict()).get('entries', dict())
+                name, pool = self._object_name(component, stats)
+                if name is None:
+                    continue
+                if self._params['partition'] != 'all' and not (pool or name).startswith(prefix):
+                    continue
+                i = sample.slot((pool, name))
+                if i is None:
+                    # Created between the samples, the object has no rate
+                    continue
+                for counter, column in sample.columns.items():
+                    column[i] = int(get_value(stats, side + counter) or 0)
+        finally:
+            resp.close()
+        sample.time = sample_time
+
+    def _rates(self, first, second):
+        """Return the rates of each object, computed column by column."""
+        elapsed = second.time - first.time
+        found = array('B', (a & b for a, b in zip(first.found, second.found)))
+        rates = dict()
+        for rate, counter in RATES:
+            rates[rate] = [round((b - a) / elapsed, 3) if ok and b >= a else None
+                           for a, b, ok in zip(first.columns[counter], second.columns[counter], found)]
+
+        rows = list()
+        for i, (pool, name) in enumerate(first.names):
+            row = dict(name=name, cur_conns=second.columns['curConns'][i] if found[i] else None)
+            if pool is not None:
+                row['pool'] = pool
+            row.update((rate, values[i]) for rate, values in rates.items())
+            rows.append(row)
+        return rows
+
+    def flush(self):
+        result = dict(changed=False, stats=dict(), interval=dict())
+
+        components = self._params['components']
+        invalid = [c for c in components if c not in STATS_PATHS]
+        if invalid:
+            raise AnsibleF5Error("Invalid components: {0}.".format(', '.join(invalid)))
+        if self._params['interval'] < 1:
+            raise AnsibleF5Error("The interval must be at least 1 second.")
+
+        first = dict((component, F5StatsSample()) for component in components)
+        for component in components:
+            self._sample(component, first[component])
+
+        # The second samples follow the first ones in the same order, so that each kind of object gets the interval
+        time.sleep(max(first[components[0]].time + self._params['interval'] - time.time(), 0))
+        for component in components:
+            second = F5StatsSample(first[component].names)
+            self._sample(component, second)
+            result['stats'][component] = self._rates(first[component], second)
+            result['interval'][component] = round(second.time - first[component].time, 2)
+
+        return result
+
+
+def main():
+    params = ModuleParams()
+    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode)
+
+    try:
+        obj = F5BigIpLtmStats(check_mode=module.check_mode, **module.params)
+        result = obj.flush()
+        module.exit_json(**result)
+    except Exception as exc:
+        module.fail_json(msg=str(exc))
+
+
+if __name__ == '__main__':
+    main()
@@ -88,9 +88,9 @@ EXAMPLES = '''
 RETURN = ''' # '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpNamedObject
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
 
 
 class ModuleParams(object):
@@ -127,10 +127,7 @@ class F5BigIpNetSelfip(F5BigIpNamedObject):
         }
 
     def _read(self):
-        selfip = self._methods['read'](
-            name=self._params['name'],
-            partition=self._params['partition']
-        )
+        selfip = self._load()
         selfip.vlan = self._strip_partition(selfip.vlan)
         return selfip
 
@@ -27,10 +27,25 @@ module: f5bigip_shared_file_transfer_madm
 short_description: BIG-IP shared file transfer madm module
 description:
     - Downloads files.
+    - The file is streamed to a temporary file next to the download path, one chunk at a time, then renamed once its
+      checksum is verified. An interrupted download resumes from the end of the temporary file on the next run.
 version_added: "2.4"
 author:
     - "Gabriel Fortin (@GabrielFortin)"
 options:
+    bandwidth_limit:
+        description:
+            - Specifies the maximum rate of the downloads, in bytes per second.
+            - The limit is shared by all the downloads running on the controller at the same time, whatever the
+              BIG-IP they are downloaded from.
+    checksum:
+        description:
+            - Specifies the expected SHA-256 checksum of the file.
+            - When not set, the checksum of the file is computed on the BIG-IP.
+    chunk_size:
+        description:
+            - Specifies the size, in bytes, of each chunk requested from the BIG-IP.
+        default: 1048576
     file_name:
         description:
             - Specifies the name of the file to download.
@@ -39,6 +54,10 @@ options:
         description:
             - Specifies the path where the file will be downloaded.
         required: true
+    retries:
+        description:
+            - Specifies the number of times a chunk is requested again after a failure.
+        default: 3
 requirements:
     - BIG-IP >= 12.0
     - ansible-common-f5
@@ -55,22 +74,53 @@ EXAMPLES = '''
     file_name: test.txt
     download_path: /var/test.txt
   delegate_to: localhost
+
+- name: Download the UCS archives of all the BIG-IPs, 10 MB/s in total
+  f5bigip_shared_file_transfer_madm:
+    f5_hostname: "{{ inventory_hostname }}"
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    file_name: "{{ inventory_hostname }}.ucs"
+    download_path: "/backup/{{ inventory_hostname }}.ucs"
+    bandwidth_limit: 10485760
+  delegate_to: localhost
 '''
 
-RETURN = ''' # '''
+RETURN = '''
+checksum:
+    description: The SHA-256 checksum of the file.
+    returned: changed
+    type: str
+resumed_from:
+    description: The number of bytes that were already downloaded when the download resumed.
+    returned: changed
+    type: int
+size:
+    description: The size of the file, in bytes.
+    returned: changed
+    type: int
+'''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible_common_f5.base import AnsibleF5Error
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpUnnamedObject
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpRestObject
+from ansible.module_utils.f5bigip_transfer import F5BigIpDownloadMixin
+
+MADM_URI = '/mgmt/shared/file-transfer/madm/'
+MADM_PATH = '/var/config/rest/madm/'
 
 
 class ModuleParams(object):
     @property
     def argument_spec(self):
         argument_spec = dict(
+            bandwidth_limit=dict(type='int'),
+            checksum=dict(type='str'),
+            chunk_size=dict(type='int', default=1048576),
             file_name=dict(type='str', required=True),
-            download_path=dict(type='str', required=True)
+            download_path=dict(type='str', required=True),
+            retries=dict(type='int', default=3)
         )
         argument_spec.update(F5_PROVIDER_ARGS)
         return argument_spec
@@ -80,26 +130,10 @@ class ModuleParams(object):
         return True
 
 
-class F5BigIpSharedFileTransferMadm(F5BigIpUnnamedObject):
-    def _set_crud_methods(self):
-        self._methods = {
-            'download_file': self._api.shared.file_transfer.madm.download_file
-        }
-
+class F5BigIpSharedFileTransferMadm(F5BigIpDownloadMixin, F5BigIpRestObject):
     def flush(self):
-        result = dict(changed=False)
-
-        if self._check_mode:
-            result['changed'] = True
-            return result
-
-        try:
-            self._methods['download_file'](self._params['fileName'], self._params['downloadPath'])
-            result['changed'] = True
-        except Exception:
-            raise AnsibleF5Error("Cannot download the file.")
-
-        return result
+        return self._download(MADM_URI + self._params['file_name'], MADM_PATH + self._params['file_name'],
+                              self._params['download_path'], checksum=self._params['checksum'])
 
 
 def main():
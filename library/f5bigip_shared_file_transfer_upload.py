@@ -27,6 +27,9 @@ module: f5bigip_shared_file_transfer_upload
 short_description: BIG-IP shared file transfer upload module
 description:
     - Manages uploads.
+    - The file is sent in chunks, each chunk being retried on failure. An interrupted upload resumes from the last
+      chunk received by the BIG-IP on the next run.
+    - The upload is skipped when the file on the BIG-IP has the same SHA-256 checksum.
 version_added: "2.4"
 author:
     - "Eric Jacob (@erjac77)"
@@ -34,9 +37,22 @@ options:
     bytestring:
         description:
             - Specifies the byte string.
+    chunk_size:
+        description:
+            - Specifies the size, in bytes, of each chunk sent to the BIG-IP.
+        default: 1048576
     filepathname:
         description:
             - Specifies the file path name.
+    force:
+        description:
+            - Specifies whether the file is uploaded even when the BIG-IP already has the same file.
+        default: false
+        type: bool
+    retries:
+        description:
+            - Specifies the number of times a chunk is sent again after a failure.
+        default: 3
     stringio:
         description:
             - Specifies the string io.
@@ -47,7 +63,8 @@ options:
         choices: ['absent', 'present']
     target:
         description:
-            - Specifies the target.
+            - Specifies the name of the file on the BIG-IP, in /var/config/rest/downloads.
+            - Defaults to the name of the uploaded file; required with C(bytestring) and C(stringio).
 requirements:
     - BIG-IP >= 12.0
     - ansible-common-f5
@@ -63,14 +80,66 @@ EXAMPLES = '''
     f5_port: 443
     filepathname: "{{ playbook_dir }}/files/test.txt"
   delegate_to: localhost
+
+- name: Upload an ISO image over a slow link
+  f5bigip_shared_file_transfer_upload:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    filepathname: /tmp/BIGIP-13.1.0.7-0.0.1.iso
+    chunk_size: 524288
+    retries: 10
+  delegate_to: localhost
 '''
 
-RETURN = ''' # '''
+RETURN = '''
+checksum:
+    description: The SHA-256 checksum of the file.
+    returned: always
+    type: str
+resumed_from:
+    description: The number of bytes that were already on the BIG-IP when the upload resumed.
+    returned: changed
+    type: int
+size:
+    description: The size of the file, in bytes.
+    returned: always
+    type: int
+target:
+    description: The path of the file on the BIG-IP.
+    returned: always
+    type: str
+    sample: /var/config/rest/downloads/test.txt
+'''
+
+import hashlib
+import mmap
+import os
+import time
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpRestObject
 from ansible_common_f5.base import AnsibleF5Error
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpUnnamedObject
+from requests.exceptions import RequestException
+
+UPLOAD_URI = '/mgmt/shared/file-transfer/uploads/'
+UPLOAD_PATH = '/var/config/rest/downloads/'
+
+# Size of the blocks read to compute the checksums
+HASH_BLOCK_SIZE = 1048576
+
+
+def get_checksums(data, offset=0):
+    """Return the SHA-256 checksum of the data, and the checksum of its first offset bytes, in a single pass."""
+    digest = hashlib.sha256()
+    for start in range(0, offset, HASH_BLOCK_SIZE):
+        digest.update(data[start:min(start + HASH_BLOCK_SIZE, offset)])
+    prefix = digest.hexdigest()
+    for start in range(offset, len(data), HASH_BLOCK_SIZE):
+        digest.update(data[start:start + HASH_BLOCK_SIZE])
+    return digest.hexdigest(), prefix
 
 
 class ModuleParams(object):
@@ -78,7 +147,10 @@ class ModuleParams(object):
     def argument_spec(self):
         argument_spec = dict(
             bytestring=dict(type='str'),
+            chunk_size=dict(type='int', default=1048576),
             filepathname=dict(type='str'),
+            force=dict(type='bool', default=False),
+            retries=dict(type='int', default=3),
             stringio=dict(type='str'),
             target=dict(type='str')
         )
@@ -95,32 +167,92 @@ class ModuleParams(object):
             ['bytestring', 'filepathname', 'stringio']
         ]
 
+    @property
+    def required_one_of(self):
+        return [
+            ['bytestring', 'filepathname', 'stringio']
+        ]
+
 
-class F5BigIpSharedFileTransferUpload(F5BigIpUnnamedObject):
-    def _set_crud_methods(self):
-        self._methods = {
-            'upload_file': self._api.shared.file_transfer.uploads.upload_file,
-            'upload_stringio': self._api.shared.file_transfer.uploads.upload_stringio,
-            'upload_bytes': self._api.shared.file_transfer.uploads.upload_bytes
+class F5BigIpSharedFileTransferUpload(F5BigIpRestObject):
+    def _target(self):
+        if self._params['target']:
+            return os.path.basename(self._params['target'])
+        if self._params['filepathname']:
+            return os.path.basename(self._params['filepathname'])
+        raise AnsibleF5Error("The target is required to upload a byte string or a string io.")
+
+    def _send(self, url, data, start, end):
+        """Send the bytes from start to end, retrying on connection errors and server errors."""
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Range': '{0}-{1}/{2}'.format(start, max(end - 1, 0), len(data))
         }
+        retries = max(self._params['retries'], 0)
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(min(2 ** attempt, 30))
+            try:
+                resp = self._session.post(url, data=data[start:end], headers=headers, timeout=300)
+                if resp.status_code < 400:
+                    return
+                error = '{0} {1}'.format(resp.status_code, resp.reason)
+                if resp.status_code < 500:
+                    break
+            except RequestException as exc:
+                error = str(exc)
+        raise AnsibleF5Error("Unable to upload bytes {0} to {1} of {2}: {3}. The upload resumes from byte {0} on the "
+                             "next run.".format(start, end, len(data), error))
 
-    def flush(self):
-        result = dict(changed=False)
+    def _upload(self, data, result):
+        path = result['target']
+        remote_size, remote_checksum = self._stat_file(path)
 
+        # Resume from the end of the file on the BIG-IP when it is the beginning of this one
+        offset = remote_size if remote_size and remote_size < len(data) else 0
+        result['checksum'], prefix = get_checksums(data, offset)
+        if remote_checksum == result['checksum'] and not self._params['force']:
+            return
+        if prefix != remote_checksum:
+            offset = 0
+
+        result['changed'] = True
         if self._check_mode:
-            result['changed'] = True
-            return result
+            return
+
+        url = self._url(UPLOAD_URI + self._target())
+        chunk_size = max(self._params['chunk_size'], 1)
+        # An empty file is still sent once
+        for start in range(offset, len(data), chunk_size) or [0]:
+            self._send(url, data, start, min(start + chunk_size, len(data)))
+        result['resumed_from'] = offset
+
+        if self._stat_file(path)[1] != result['checksum']:
+            raise AnsibleF5Error("The checksum of the uploaded file '{0}' does not match.".format(path))
+
+    def flush(self):
+        result = dict(changed=False, target=UPLOAD_PATH + self._target())
 
         try:
             if self._params['filepathname']:
-                self._methods['upload_file'](self._params['filepathname'])
-            elif self._params['stringio']:
-                self._methods['upload_stringio'](self._params['stringio'])
-            elif self._params['bytestring']:
-                self._methods['upload_bytes'](self._params['bytestring'])
-            result['changed'] = True
-        except Exception:
-            AnsibleF5Error("Cannot upload the file.")
+                with open(self._params['filepathname'], 'rb') as f:
+                    size = os.fstat(f.fileno()).st_size
+                    # The file is read chunk by chunk from the page cache, never loaded in memory at once
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+                    try:
+                        result['size'] = size
+                        self._upload(data, result)
+                    finally:
+                        if size:
+                            data.close()
+            else:
+                data = (self._params['stringio'] or self._params['bytestring']).encode('utf-8')
+                result['size'] = len(data)
+                self._upload(data, result)
+        except AnsibleF5Error:
+            raise
+        except Exception as exc:
+            raise AnsibleF5Error("Cannot upload the file: {0}".format(exc))
 
         return result
 
@@ -128,7 +260,7 @@ class F5BigIpSharedFileTransferUpload(F5BigIpUnnamedObject):
 def main():
     params = ModuleParams()
     module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode,
-                           mutually_exclusive=params.mutually_exclusive)
+                           mutually_exclusive=params.mutually_exclusive, required_one_of=params.required_one_of)
 
     try:
         obj = F5BigIpSharedFileTransferUpload(check_mode=module.check_mode, **module.params)
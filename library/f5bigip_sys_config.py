@@ -81,6 +81,18 @@ options:
         description:
             - Inserts a time-stamp in a file name.
         choices: ['yes', 'no']
+    timeout:
+        description:
+            - Specifies the number of seconds to wait for the task to complete, with I(use_task_api).
+        default: 3600
+    use_task_api:
+        description:
+            - Runs the command as a task of the iControl REST task API (/mgmt/tm/task/sys/config), then polls the
+              task, less and less often, until it completes or I(timeout) expires.
+            - No request stays open while the configuration is saved or loaded, so large configurations do not make
+              the request time out.
+        default: false
+        type: bool
     verify:
         description:
             - Validates the specified configuration from file(s) without changing the running configuration.
@@ -128,15 +140,46 @@ EXAMPLES = '''
     merge: yes
     file: my_file
   delegate_to: localhost
+
+- name: Save a large configuration with the task API
+  f5bigip_sys_config:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    command: save
+    use_task_api: yes
+    timeout: 1800
+  delegate_to: localhost
+'''
+
+RETURN = '''
+duration:
+    description: The number of seconds the command took to complete.
+    returned: changed
+    type: float
+    sample: 42.7
+task_id:
+    description: The ID of the task that ran the command.
+    returned: changed and use_task_api
+    type: str
+    sample: 1506978447395418
+task_states:
+    description: The states the task went through, as seen while polling it.
+    returned: changed and use_task_api
+    type: list
+    sample: ['VALIDATING', 'STARTED', 'COMPLETED']
 '''
 
-RETURN = ''' # '''
+import time
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpRestObject
+from ansible.module_utils.f5bigip import F5BigIpUnnamedObject
+from ansible.module_utils.f5bigip_task import F5BigIpTask
 from ansible.module_utils.six import iteritems
 from ansible_common_f5.base import AnsibleF5Error
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpUnnamedObject
 
 
 class ModuleParams(object):
@@ -164,7 +207,10 @@ class ModuleParams(object):
             default=dict(type='bool'),
             files_folder=dict(type='str'),
             merge=dict(type='bool'),
-            verify=dict(type='bool')
+            verify=dict(type='bool'),
+            # Module options
+            timeout=dict(type='int', default=3600),
+            use_task_api=dict(type='bool', default=False)
         )
         argument_spec.update(F5_PROVIDER_ARGS)
         return argument_spec
@@ -181,6 +227,23 @@ class ModuleParams(object):
 
 
 class F5BigIpSysConfig(F5BigIpUnnamedObject):
+    def __init__(self, **kwargs):
+        # Options of the module, not of the command
+        self._timeout = kwargs.pop('timeout', None) or 3600
+        self._use_task_api = kwargs.pop('use_task_api', False)
+        super(F5BigIpSysConfig, self).__init__(**kwargs)
+
+    def _run_task(self, command, params, result):
+        """Run the command through the task API, polling it until it completes."""
+        task = F5BigIpTask(F5BigIpRestObject(session=self._api.icrs.session, **self._connection), 'sys/config')
+        payload = dict(params)
+        payload['command'] = command
+        result['task_id'] = task.start(**payload)
+        try:
+            task.run(self._timeout)
+        finally:
+            result['task_states'] = task.states
+
     def _set_crud_methods(self):
         self._methods = {
             'exec_cmd': self._api.tm.sys.config.exec_cmd
@@ -197,11 +260,19 @@ class F5BigIpSysConfig(F5BigIpUnnamedObject):
             result['changed'] = True
             return result
 
-        try:
-            self._methods['exec_cmd'](command, **params)
-            result['changed'] = True
-        except Exception as exc:
-            raise AnsibleF5Error("Could not execute '" + command + "' command: " + exc.message)
+        start = time.time()
+        if self._use_task_api:
+            try:
+                self._run_task(command, params, result)
+            except Exception as exc:
+                raise AnsibleF5Error("Could not execute '{0}' command: {1}".format(command, exc))
+        else:
+            try:
+                self._methods['exec_cmd'](command, **params)
+            except Exception as exc:
+                raise AnsibleF5Error("Could not execute '" + command + "' command: " + exc.message)
+        result['changed'] = True
+        result['duration'] = round(time.time() - start, 1)
 
         return result
 
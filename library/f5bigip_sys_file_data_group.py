@@ -31,6 +31,14 @@ version_added: "2.4"
 author:
     - "Eric Jacob (@erjac77)"
 options:
+    aggregate:
+        description:
+            - When C(yes), the address records are collapsed into the smallest set of networks before being uploaded.
+            - Duplicates and the networks enclosed in a network with the same data are removed, and the adjacent
+              networks with the same data are merged; the networks with different data are kept apart.
+            - Only used with the C(records) option and the C(ip) type.
+        default: false
+        type: bool
     app_service:
         description:
             - Specifies the application service that the object belongs to.
@@ -49,6 +57,12 @@ options:
         description:
             - Specifies the administrative partition in which the component object resides.
         default: Common
+    records:
+        description:
+            - Specifies the records of the data group, each one a dict with the C(name) and C(data) keys, or the name
+              of the record only.
+            - The data-group file is generated from the records and uploaded, instead of being read from
+              C(source_path). It is only uploaded again when its checksum differs from the one on the BIG-IP.
     separator:
         description:
             - Specifies a separator to use when defining the data group.
@@ -85,23 +99,49 @@ EXAMPLES = '''
     type: string
     state: present
   delegate_to: localhost
+
+- name: Create LTM External Data-Group file from aggregated address records
+  f5bigip_sys_file_data_group:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    name: my_ext_dg_ip_file
+    partition: Common
+    records:
+      - { name: 10.0.0.0/25, data: blocked }
+      - { name: 10.0.0.128/25, data: blocked }
+      - { name: 10.0.1.1, data: allowed }
+    aggregate: yes
+    type: ip
+    state: present
+  delegate_to: localhost
 '''
 
 RETURN = ''' # '''
 
+import hashlib
+
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpNamedObject
+from ansible.module_utils.f5bigip_records import aggregate_records
+from ansible.module_utils.f5bigip_records import dump_records
+from ansible.module_utils.f5bigip_records import index_records
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
+
+UPLOAD_PATH = '/var/config/rest/downloads/'
 
 
 class ModuleParams(object):
     @property
     def argument_spec(self):
         argument_spec = dict(
+            aggregate=dict(type='bool', default=False),
             app_service=dict(type='str'),
             data_group_description=dict(type='str'),
             data_group_name=dict(type='str'),
+            records=dict(type='list'),
             separator=dict(type='str'),
             source_path=dict(type='str'),
             type=dict(type='str', choices=['integer', 'ip', 'string'])
@@ -114,6 +154,12 @@ class ModuleParams(object):
     def supports_check_mode(self):
         return True
 
+    @property
+    def mutually_exclusive(self):
+        return [
+            ['records', 'source_path']
+        ]
+
 
 class F5BigIpSysFileDataGroup(F5BigIpNamedObject):
     def _set_crud_methods(self):
@@ -122,13 +168,63 @@ class F5BigIpSysFileDataGroup(F5BigIpNamedObject):
             'read': self._api.tm.sys.file.data_groups.data_group.load,
             'update': self._api.tm.sys.file.data_groups.data_group.update,
             'delete': self._api.tm.sys.file.data_groups.data_group.delete,
-            'exists': self._api.tm.sys.file.data_groups.data_group.exists
+            'exists': self._api.tm.sys.file.data_groups.data_group.exists,
+            'upload': self._api.shared.file_transfer.uploads.upload_bytes
         }
+        self._content = None
+        records = self._params.pop('records', None)
+        aggregate = self._params.pop('aggregate', None)
+        if records is not None:
+            if aggregate and self._params['type'] == 'ip':
+                index = aggregate_records(records)
+            else:
+                index = index_records(records, self._params['type'])
+            self._content = dump_records(index, self._params['separator'] or ':=').encode('utf-8')
+
+    def _upload(self):
+        """Upload the data-group file generated from the records, unless in check mode."""
+        if not self._check_mode:
+            self._methods['upload'](self._content, self._params['sourcePath'].rsplit('/', 1)[-1])
+
+    def _set_source_path(self):
+        """Point the source path at the data-group file generated from the records."""
+        self._params['sourcePath'] = 'file:{0}{1}_{2}.dat'.format(
+            UPLOAD_PATH, self._params['partition'], self._params['name'])
+
+    def _create(self):
+        if self._content is not None:
+            self._set_source_path()
+            self._upload()
+        return super(F5BigIpSysFileDataGroup, self)._create()
+
+    def _diff(self, obj):
+        diff = super(F5BigIpSysFileDataGroup, self)._diff(obj)
+        if self._content is not None:
+            # The checksum of the file is read as 'SHA1:<size>:<digest>'
+            checksum = 'SHA1:{0}:{1}'.format(len(self._content), hashlib.sha1(self._content).hexdigest())
+            if getattr(obj, 'checksum', None) != checksum:
+                self._set_source_path()
+                diff['sourcePath'] = self._params['sourcePath']
+        return diff
+
+    def _update(self):
+        """Upload the data-group file only when its checksum differs, right before the PATCH."""
+        obj = self._read()
+        diff = self._diff(obj)
+        if not diff:
+            return False
+
+        if not self._check_mode:
+            if self._content is not None and 'sourcePath' in diff:
+                self._upload()
+            obj.modify(**diff)
+        return True
 
 
 def main():
     params = ModuleParams()
-    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode)
+    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode,
+                           mutually_exclusive=params.mutually_exclusive)
 
     try:
         obj = F5BigIpSysFileDataGroup(check_mode=module.check_mode, **module.params)
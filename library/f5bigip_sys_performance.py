@@ -27,14 +27,18 @@ module: f5bigip_sys_performance
 short_description: BIG-IP sys performance module
 description:
     - You can use the all-stats component to reset or display all system performance statistics.
+    - The other components display the statistics of a single report.
+    - The tables of the reports are parsed into rows of numbers, one per metric, with the values of the metric over
+      each period of the report.
 version_added: "2.4"
 author:
     - "Gabriel Fortin (@GabrielFortin)"
 options:
     name:
         description:
-            - Specifies which module to use. For the moment, only all-stats is available.
-        choices: ['all-stats']
+            - Specifies which module to use.
+        choices: ['all-stats', 'connections', 'gtm', 'ramcache', 'system', 'throughput']
+        default: all-stats
 requirements:
     - BIG-IP >= 12.0
     - ansible-common-f5
@@ -50,9 +54,37 @@ EXAMPLES = '''
     f5_port: 443
     name: all-stats
   delegate_to: localhost
+
+- name: Get the throughput report
+  f5bigip_sys_performance:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    name: throughput
+  delegate_to: localhost
+  register: result
+
+- name: Display the throughput of the last 24 hours
+  debug:
+    msg: "{{ item.metric }}: {{ item['24h'] }}"
+  with_items: "{{ result.rows }}"
 '''
 
 RETURN = '''
+rows:
+    description:
+        - The rows of the tables of the reports, with the report, the table and the metric of each row, and its
+          value in each column of the table (C(current), C(3h), C(24h), C(7d) and C(30d), or C(current), C(average)
+          and C(max)).
+        - The values are numbers, the K, M, G and T suffixes being expanded; missing values are null.
+    returned: success
+    type: list
+    sample:
+        - { report: System, table: System CPU Usage(%), metric: Utilization, current: 3, 3h: 2, 24h: 2, 7d: 2,
+            30d: 2 }
+        - { report: Throughput, table: Throughput(bits)(bits/sec), metric: In, current: 1200000, 3h: 904000,
+            24h: 1100000, 7d: 1300000, 30d: 1300000 }
 stdout:
     description: The output of the command.
     returned: success
@@ -67,18 +99,106 @@ stdout_lines:
         - [['...', '...'], ['...'], ['...']]
 '''
 
+import re
+
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpUnnamedObject
 from ansible_common_f5.base import AnsibleF5Error
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpUnnamedObject
 from ansible_common_f5.utils import to_lines
 
+REPORT_PREFIX = 'Sys::Performance'
+
+# Keys of the columns of the tables, by label
+COLUMN_KEYS = {
+    'current': 'current',
+    '3 hrs': '3h',
+    '24 hrs': '24h',
+    '7 days': '7d',
+    '30 days': '30d',
+    'average': 'average'
+}
+
+UNITS = {'K': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9, 'T': 10 ** 12}
+
+
+def column_key(label):
+    label = label.strip().lower()
+    # Max(since 2018-02-22T12:54:12Z)
+    if label.startswith('max'):
+        return 'max'
+    return COLUMN_KEYS.get(label, label.replace(' ', '_'))
+
+
+def to_number(value):
+    """Convert a value of a report, such as 12, 0.5 or 1.2M, into a number, or None when it is missing."""
+    multiplier = UNITS.get(value[-1:], 1)
+    try:
+        number = float(value[:-1] if multiplier > 1 else value)
+    except ValueError:
+        return None if value == '-' else value
+    # Rounded so that 1.1K gives 1100, not 1100.0000000000002
+    number = round(number * multiplier, 6)
+    return int(number) if number.is_integer() else number
+
+
+def parse_report(text):
+    """Parse the tables of the text output of the reports into rows, in a single pass over its lines.
+
+    Each table is made of a line of dashes, a header line whose first column is the name of the table, another line
+    of dashes, then a line per metric, until a blank line or the next line of dashes.
+    """
+    rows = list()
+    report = table = columns = None
+    # None, 'header' (expecting a header), 'columns' (header read) or 'rows'
+    state = None
+    for line in text.splitlines():
+        if not line.strip():
+            state = None
+        elif line.startswith(REPORT_PREFIX):
+            report = line[len(REPORT_PREFIX):].strip()
+            state = None
+        elif line.startswith('--'):
+            state = 'rows' if state == 'columns' else 'header'
+        elif state == 'header':
+            labels = re.split(r'\s{2,}', line.strip())
+            table = labels[0]
+            columns = [column_key(label) for label in labels[1:]]
+            state = 'columns'
+        elif state == 'rows':
+            values = line.rsplit(None, len(columns))
+            if len(values) <= len(columns):
+                # A metric without name, or a line that is not a row
+                continue
+            row = dict(report=report, table=table, metric=values[0].strip())
+            row.update(zip(columns, (to_number(value) for value in values[1:])))
+            rows.append(row)
+    return rows
+
+
+def parse_entries(entries):
+    """Parse the stats of the reports returned as nested entries, one entry per metric."""
+    rows = list()
+    for entry in entries.values():
+        stats = entry.get('nestedStats', dict()).get('entries', dict())
+        row = dict(report=None, table=None, metric=None)
+        for label, value in stats.items():
+            description = value.get('description')
+            if label.startswith(REPORT_PREFIX):
+                row['report'] = label[len(REPORT_PREFIX):].strip()
+                row['metric'] = description
+            else:
+                row[column_key(label)] = to_number(str(description))
+        rows.append(row)
+    return rows
+
 
 class ModuleParams(object):
     @property
     def argument_spec(self):
         argument_spec = dict(
-            name=dict(type='str', choices=['all-stats'], default='all-stats')
+            name=dict(type='str', choices=['all-stats', 'connections', 'gtm', 'ramcache', 'system', 'throughput'],
+                      default='all-stats')
         )
         argument_spec.update(F5_PROVIDER_ARGS)
         return argument_spec
@@ -91,28 +211,19 @@ class ModuleParams(object):
 class F5BigIpSysPerformance(F5BigIpUnnamedObject):
     def _set_crud_methods(self):
         self._methods = {
-            'all_stats_read': self._api.tm.sys.performances.all_stats.load
-            # 'connections_read':     self._api.tm.sys.performances.connections.load,
-            # 'gtm_read':             self._api.tm.sys.performances.gtm.load,
-            # 'ramcache_read':        self._api.tm.sys.performances.ramcache.load,
-            # 'system_read':          self._api.tm.sys.performances.system.load,
-            # 'throughput_read':      self._api.tm.sys.performances.throughput.load
+            'all_stats_read': self._api.tm.sys.performances.all_stats.load,
+            'connections_read': self._api.tm.sys.performances.connections.load,
+            'gtm_read': self._api.tm.sys.performances.gtm.load,
+            'ramcache_read': self._api.tm.sys.performances.ramcache.load,
+            'system_read': self._api.tm.sys.performances.system.load,
+            'throughput_read': self._api.tm.sys.performances.throughput.load
         }
 
     def _read(self):
-        if self._params['name'] == 'all-stats':
-            return self._methods['all_stats_read']()
-            # elif self._params['name'] == 'connections':
-            #    return self._methods['connections_read']
-            # elif self._params['name'] == 'ramcache':
-            #    return self._methods['ramcache_read']
-            # elif self._params['name'] == 'system' :
-            #    return self._methods['system_read']
-            # elif self._params['name'] == 'throughput':
-            #    return self._methods['throughput_read']
+        return self._methods[self._params['name'].replace('-', '_') + '_read']()
 
     def flush(self):
-        result = dict(changed=False, stdout=list())
+        result = dict(changed=False, rows=list(), stdout=list())
 
         try:
             stats = self._read()
@@ -121,6 +232,9 @@ class F5BigIpSysPerformance(F5BigIpUnnamedObject):
 
         if hasattr(stats, 'apiRawValues'):
             result['stdout'].append(stats.apiRawValues['apiAnonymous'])
+            result['rows'] = parse_report(stats.apiRawValues['apiAnonymous'])
+        elif hasattr(stats, 'entries'):
+            result['rows'] = parse_entries(stats.entries)
 
         result['stdout_lines'] = list(to_lines(result['stdout']))
 
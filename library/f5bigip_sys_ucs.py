@@ -27,14 +27,49 @@ module: f5bigip_sys_ucs
 short_description: BIG-IP sys ucs module
 description:
     - Saves a ucs file.
+    - With C(use_task_api), the UCS is saved in the background on the BIG-IP, then polled until it completes, so that
+      the save of a large configuration does not hit the iControl REST timeout.
+    - The archive can be downloaded to the controller, and the oldest archives on the BIG-IP removed.
 version_added: "2.4"
 author:
     - "Gabriel Fortin (@GabrielFortin)"
 options:
+    bandwidth_limit:
+        description:
+            - Specifies the maximum rate of the downloads, in bytes per second, shared by all the downloads running on
+              the controller.
+    chunk_size:
+        description:
+            - Specifies the size, in bytes, of each chunk of the archive requested from the BIG-IP.
+        default: 1048576
+    download_path:
+        description:
+            - Specifies the path where the archive is downloaded, once saved.
+    keep:
+        description:
+            - Specifies the number of archives matching C(keep_pattern) kept on the BIG-IP, including the one saved.
+            - The oldest archives are removed.
+    keep_pattern:
+        description:
+            - Specifies the shell pattern of the archives considered by C(keep).
+        default: "*.ucs"
     name:
         description:
             - Specifies a unique name for the component.
         required: true
+    retries:
+        description:
+            - Specifies the number of times a chunk of the archive is requested again after a failure.
+        default: 3
+    timeout:
+        description:
+            - Specifies the time, in seconds, given to the BIG-IP to save the UCS, with C(use_task_api).
+        default: 3600
+    use_task_api:
+        description:
+            - Specifies whether the UCS is saved through the iControl REST task API.
+        default: false
+        type: bool
 requirements:
     - BIG-IP >= 12.0
     - ansible-common-f5
@@ -50,21 +85,64 @@ EXAMPLES = '''
     f5_port: 443
     name: my_ucs.ucs
   delegate_to: localhost
+
+- name: Save SYS UCS in the background, download it and keep the last 5 archives
+  f5bigip_sys_ucs:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    name: "backup-{{ ansible_date_time.date }}.ucs"
+    use_task_api: yes
+    download_path: "/backup/{{ inventory_hostname }}-{{ ansible_date_time.date }}.ucs"
+    keep: 5
+    keep_pattern: "backup-*.ucs"
+  delegate_to: localhost
 '''
 
-RETURN = ''' # '''
+RETURN = '''
+download:
+    description: The size, SHA-256 checksum and resume offset of the downloaded archive.
+    returned: When download_path is set
+    type: dict
+pruned:
+    description: The names of the archives removed from the BIG-IP.
+    returned: When keep is set
+    type: list
+task_id:
+    description: The identifier of the task that saved the UCS.
+    returned: When use_task_api is set
+    type: str
+'''
+
+import re
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpRestObject
+from ansible.module_utils.f5bigip_task import F5BigIpTask
+from ansible.module_utils.f5bigip_transfer import F5BigIpDownloadMixin
+from ansible.module_utils.six.moves import shlex_quote
 from ansible_common_f5.base import AnsibleF5Error
 from ansible_common_f5.base import F5_NAMED_OBJ_ARGS
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpNamedObject
+
+UCS_URI = '/mgmt/shared/file-transfer/ucs-downloads/'
+UCS_PATH = '/var/local/ucs/'
 
 
 class ModuleParams(object):
     @property
     def argument_spec(self):
-        argument_spec = dict()
+        argument_spec = dict(
+            bandwidth_limit=dict(type='int'),
+            chunk_size=dict(type='int', default=1048576),
+            download_path=dict(type='str'),
+            keep=dict(type='int'),
+            keep_pattern=dict(type='str', default='*.ucs'),
+            retries=dict(type='int', default=3),
+            timeout=dict(type='int', default=3600),
+            use_task_api=dict(type='bool', default=False)
+        )
         argument_spec.update(F5_PROVIDER_ARGS)
         argument_spec.update(F5_NAMED_OBJ_ARGS)
         return argument_spec
@@ -74,24 +152,48 @@ class ModuleParams(object):
         return True
 
 
-class F5BigIpSysUcs(F5BigIpNamedObject):
-    def _set_crud_methods(self):
-        self._methods = {
-            'save': self._api.tm.sys.ucs.exec_cmd
-        }
+class F5BigIpSysUcs(F5BigIpDownloadMixin, F5BigIpRestObject):
+    def _save(self, result):
+        if self._params['use_task_api']:
+            task = F5BigIpTask(self, 'sys/ucs')
+            result['task_id'] = task.start(command='save', name=self._params['name'])
+            task.run(self._params['timeout'])
+        else:
+            try:
+                self._request('POST', 'sys/ucs', json=dict(command='save', name=self._params['name']))
+            except AnsibleF5Error as exc:
+                raise AnsibleF5Error("Cannot save UCS file: {0}".format(exc))
+
+    def _prune(self, file_name):
+        """Remove the oldest archives matching keep_pattern, return their names."""
+        output = self._bash(
+            'cd {0} && ls -1t -- {1} 2>/dev/null | grep -vxF -- {2} | tail -n +{3} | '
+            'while read -r f; do rm -f -- "$f" && echo "$f"; done'.format(
+                UCS_PATH, self._params['keep_pattern'], shlex_quote(file_name), self._params['keep']))
+        return [line for line in output.splitlines() if line]
 
     def flush(self):
-        result = dict(changed=False)
+        result = dict(changed=True)
+
+        if self._params['keep'] is not None:
+            if self._params['keep'] < 1:
+                raise AnsibleF5Error("At least 1 archive must be kept.")
+            if not re.match(r'^[\w.*?\[\]-]+$', self._params['keep_pattern']):
+                raise AnsibleF5Error("Invalid pattern '{0}'.".format(self._params['keep_pattern']))
 
         if self._check_mode:
-            result['changed'] = True
             return result
 
-        try:
-            self._methods['save']('save', name=self._params['name'])
-            result['changed'] = True
-        except Exception:
-            raise AnsibleF5Error("Cannot save UCS file.")
+        self._save(result)
+
+        file_name = self._params['name']
+        if not file_name.endswith('.ucs'):
+            file_name += '.ucs'
+        if self._params['download_path']:
+            result['download'] = self._download(UCS_URI + file_name, UCS_PATH + file_name,
+                                                self._params['download_path'])
+        if self._params['keep'] is not None:
+            result['pruned'] = self._prune(file_name)
 
         return result
 
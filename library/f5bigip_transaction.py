@@ -0,0 +1,271 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: f5bigip_transaction
+short_description: BIG-IP transaction module
+description:
+    - Applies the desired state of many BIG-IP objects as a single iControl REST transaction.
+    - The objects are read first, then only the objects that differ are created, modified or deleted in one
+      transaction, validated and committed at once by the BIG-IP. If any command fails, none of them is applied.
+version_added: "2.4"
+author:
+    - "Eric Jacob (@erjac77)"
+options:
+    objects:
+        description:
+            - Specifies the list of objects to apply, in order (the deletions are applied after the creations and
+              modifications, in reverse order).
+            - Each object is a dict with the C(resource) (the path of its collection under /mgmt/tm, for example
+              C(ltm/pool) or C(ltm/pool/~Common~my_pool/members)), C(name), C(partition) and C(state) keys.
+            - The other keys are the properties of the object; they may be given in snake_case (C(load_balancing_mode))
+              or as iControl REST attributes (C(loadBalancingMode)). The C(state) attribute of the nodes and pool
+              members is given with the C(state_user) key.
+        required: true
+    partition:
+        description:
+            - Specifies the default administrative partition of the objects.
+        default: Common
+    timeout:
+        description:
+            - Specifies the time, in seconds, given to the BIG-IP to validate and commit the transaction.
+        default: 120
+requirements:
+    - BIG-IP >= 12.0
+    - ansible-common-f5
+    - f5-sdk
+'''
+
+EXAMPLES = '''
+- name: Apply an LTM Virtual Server stack in a single transaction
+  f5bigip_transaction:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    partition: Common
+    objects:
+      - { resource: ltm/node, name: my_node1, address: 10.10.10.101 }
+      - { resource: ltm/node, name: my_node2, address: 10.10.10.102 }
+      - { resource: ltm/pool, name: my_pool, load_balancing_mode: least-connections-member, monitor: /Common/http }
+      - { resource: ltm/pool/~Common~my_pool/members, name: "my_node1:80" }
+      - { resource: ltm/pool/~Common~my_pool/members, name: "my_node2:80" }
+      - { resource: ltm/virtual, name: my_vs, destination: "10.10.20.201:80", ip_protocol: tcp, pool: my_pool }
+  delegate_to: localhost
+
+- name: Remove an LTM Virtual Server stack in a single transaction
+  f5bigip_transaction:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    partition: Common
+    objects:
+      - { resource: ltm/node, name: my_node1, state: absent }
+      - { resource: ltm/node, name: my_node2, state: absent }
+      - { resource: ltm/pool, name: my_pool, state: absent }
+      - { resource: ltm/virtual, name: my_vs, state: absent }
+  delegate_to: localhost
+'''
+
+RETURN = '''
+created:
+    description: The paths of the objects that were created.
+    returned: always
+    type: list
+    sample: ['ltm/pool/~Common~my_pool']
+modified:
+    description: The paths of the objects that were modified.
+    returned: always
+    type: list
+deleted:
+    description: The paths of the objects that were deleted.
+    returned: always
+    type: list
+transaction_id:
+    description: The identifier of the committed transaction.
+    returned: changed
+    type: int
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpRestObject
+from ansible.module_utils.f5bigip import is_equal
+from ansible.module_utils.f5bigip import normalize_user_status
+from ansible.module_utils.six import iteritems
+from ansible.module_utils.six.moves.urllib.parse import quote
+from ansible_common_f5.base import AnsibleF5Error
+
+COORDINATION_HEADER = 'X-F5-REST-Coordination-Id'
+
+# Keys of an object that are not properties
+OBJECT_KEYS = ['name', 'partition', 'resource', 'state']
+
+# Translation dict for the properties conflicting with the object keys, as in the ltm node and pool member modules
+PROPERTIES_TR = {'state_user': 'state'}
+
+# Timeout of the requests other than the commit, in seconds
+REQUEST_TIMEOUT = 60
+
+
+def to_properties(obj):
+    """Translate the properties of an object from snake_case into iControl REST attributes."""
+    result = dict()
+    for key, value in iteritems(obj):
+        if key in OBJECT_KEYS or value is None:
+            continue
+        if key in PROPERTIES_TR:
+            result[PROPERTIES_TR[key]] = value
+            continue
+        words = key.split('_')
+        result[words[0] + ''.join(w[:1].upper() + w[1:] for w in words[1:])] = value
+    return result
+
+
+class ModuleParams(object):
+    @property
+    def argument_spec(self):
+        argument_spec = dict(
+            objects=dict(type='list', required=True),
+            partition=dict(type='str', default='Common'),
+            timeout=dict(type='int', default=120)
+        )
+        argument_spec.update(F5_PROVIDER_ARGS)
+        return argument_spec
+
+    @property
+    def supports_check_mode(self):
+        return True
+
+
+class F5BigIpTransaction(F5BigIpRestObject):
+    def _request(self, method, path, trans_id=None, **kwargs):
+        headers = dict()
+        if trans_id is not None:
+            headers[COORDINATION_HEADER] = str(trans_id)
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        return super(F5BigIpTransaction, self)._request(method, path, headers=headers, **kwargs)
+
+    def _desired_objects(self):
+        result = list()
+        for obj in self._params['objects']:
+            if not isinstance(obj, dict) or not obj.get('resource') or not obj.get('name'):
+                raise AnsibleF5Error("Each object must be a dict with at least the 'resource' and 'name' keys.")
+            state = obj.get('state') or 'present'
+            if state not in ['absent', 'present']:
+                raise AnsibleF5Error("Invalid state '{0}' for object '{1}'.".format(state, obj['name']))
+            partition = obj.get('partition') or self._params['partition']
+            resource = obj['resource'].strip('/')
+            path = '{0}/{1}'.format(resource, quote('~{0}~{1}'.format(partition, obj['name']), safe='~:%'))
+            result.append(dict(resource=resource, path=path, name=obj['name'], partition=partition, state=state,
+                               properties=to_properties(obj)))
+        return result
+
+    @staticmethod
+    def _diff(current, obj):
+        """Return the properties of the desired object that differ from the current one."""
+        user_status = obj['resource'] == 'ltm/node' or obj['resource'].endswith('/members')
+        changes = dict()
+        for key, value in iteritems(obj['properties']):
+            current_value = current.get(key)
+            if current_value is None and isinstance(current.get(key + 'Reference'), dict):
+                # Subcollection, read with its items
+                current_value = current[key + 'Reference'].get('items', list())
+            if user_status and key in ['session', 'state']:
+                current_value = normalize_user_status(key, current_value)
+            if not is_equal(current_value, value, obj['partition'], key):
+                changes[key] = value
+        return changes
+
+    def _plan(self):
+        """Read every object and return the commands of the transaction."""
+        creates_and_updates = list()
+        deletes = list()
+        for obj in self._desired_objects():
+            current = self._get(obj['path'], params=dict(expandSubcollections='true'), timeout=REQUEST_TIMEOUT)
+            if obj['state'] == 'absent':
+                if current is not None:
+                    deletes.append(('DELETE', obj, None))
+            elif current is None:
+                payload = dict(obj['properties'], name=obj['name'], partition=obj['partition'])
+                creates_and_updates.append(('POST', obj, payload))
+            else:
+                changes = self._diff(current, obj)
+                if changes:
+                    creates_and_updates.append(('PATCH', obj, changes))
+        # Delete the objects referencing the others first
+        return creates_and_updates + list(reversed(deletes))
+
+    def flush(self):
+        result = dict(changed=False, created=list(), modified=list(), deleted=list())
+
+        commands = self._plan()
+        for method, obj, _ in commands:
+            key = dict(POST='created', PATCH='modified', DELETE='deleted')[method]
+            result[key].append(obj['path'])
+        result['changed'] = bool(commands)
+
+        if self._check_mode or not commands:
+            return result
+
+        trans_id = self._request('POST', 'transaction', json=dict())['transId']
+        try:
+            for method, obj, payload in commands:
+                path = obj['resource'] if method == 'POST' else obj['path']
+                self._request(method, path, trans_id=trans_id, json=payload)
+
+            # Validate and commit all the commands at once
+            resp = self._request('PATCH', 'transaction/{0}'.format(trans_id),
+                                 json=dict(state='VALIDATING', validateOnly=False),
+                                 timeout=self._params['timeout'])
+        except Exception:
+            try:
+                self._request('DELETE', 'transaction/{0}'.format(trans_id))
+            except Exception:
+                pass
+            raise
+
+        if resp.get('state') not in [None, 'COMPLETED']:
+            raise AnsibleF5Error("Transaction {0} was not committed: {1} {2}".format(
+                trans_id, resp.get('state'), resp.get('failureReason', '')))
+        result['transaction_id'] = trans_id
+
+        return result
+
+
+def main():
+    params = ModuleParams()
+    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode)
+
+    try:
+        obj = F5BigIpTransaction(check_mode=module.check_mode, **module.params)
+        result = obj.flush()
+        module.exit_json(**result)
+    except Exception as exc:
+        module.fail_json(msg=str(exc))
+
+
+if __name__ == '__main__':
+    main()
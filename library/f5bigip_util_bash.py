@@ -27,6 +27,8 @@ module: f5bigip_util_bash
 short_description: BIG-IP util bash module
 description:
     - Runs the bash shell.
+    - With I(commands), runs a batch of commands in a single request and returns the output and the exit code of
+      each of them.
 version_added: "2.4"
 author:
     - "Gabriel Fortin (@GabrielFortin)"
@@ -36,7 +38,23 @@ options:
         description:
             - Specifies the bash command and arguments
             - Required format is '-c "<bash command and arguments>"'
-        required: true
+            - Either I(cmd_args) or I(commands) is required.
+    commands:
+        description:
+            - Specifies a list of bash commands run one after the other in a single request, whatever their exit
+              codes.
+            - Each command runs in its own subshell, with its standard error merged into its standard output.
+    output_path:
+        description:
+            - Specifies a local directory in which the outputs larger than I(output_threshold) are written, instead of
+              being returned in the result.
+            - With I(commands), the large outputs are kept on the BIG-IP, then downloaded in chunks through the
+              file-transfer worker, so that they are never held in memory.
+            - The files are named after the hostname of the BIG-IP, and the index of the command with I(commands).
+    output_threshold:
+        description:
+            - Specifies the size, in bytes, above which an output is written in I(output_path).
+        default: 1048576
 requirements:
     - BIG-IP >= 12.0
     - ansible-common-f5
@@ -52,12 +70,39 @@ EXAMPLES = '''
     f5_port: 443
     cmd_args: '-c "df -k"'
   delegate_to: localhost
+
+- name: Runs a batch of Bash commands
+  f5bigip_util_bash:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    commands:
+      - df -k
+      - tmsh list ltm virtual
+      - cat /var/log/ltm
+    output_path: /tmp/bigip_outputs
+  delegate_to: localhost
 '''
 
 RETURN = '''
+output_file:
+    description: The local file the output was written to, when larger than output_threshold.
+    returned: cmd_args and output_path
+    type: str
+    sample: /tmp/bigip_outputs/172.16.227.35.out
+results:
+    description:
+        - The command, exit code and output of each command of the batch.
+        - The outputs written in output_path are replaced by the output_file and size keys.
+    returned: commands
+    type: list
+    sample:
+        - { cmd: 'echo hello', rc: 0, stdout: 'hello', stdout_lines: ['hello'] }
+        - { cmd: 'cat /var/log/ltm', rc: 0, output_file: /tmp/bigip_outputs/172.16.227.35_1.out, size: 52428800 }
 stdout:
     description: The output of the command.
-    returned: success
+    returned: cmd_args
     type: list
     sample:
         - ['...', '...']
@@ -69,18 +114,30 @@ stdout_lines:
         - [['...', '...'], ['...'], ['...']]
 '''
 
+import os
+import re
+import uuid
+
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpRestObject
+from ansible.module_utils.f5bigip_transfer import F5BigIpDownloadMixin
+from ansible.module_utils.six.moves import shlex_quote
 from ansible_common_f5.base import AnsibleF5Error
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpUnnamedObject
 from ansible_common_f5.utils import to_lines
 
+MADM_URI = '/mgmt/shared/file-transfer/madm/'
+MADM_PATH = '/var/config/rest/madm/'
+
 
 class ModuleParams(object):
     @property
     def argument_spec(self):
         argument_spec = dict(
-            cmd_args=dict(type='str', required=True)
+            cmd_args=dict(type='str'),
+            commands=dict(type='list'),
+            output_path=dict(type='str'),
+            output_threshold=dict(type='int', default=1048576)
         )
         argument_spec.update(F5_PROVIDER_ARGS)
         return argument_spec
@@ -89,30 +146,118 @@ class ModuleParams(object):
     def supports_check_mode(self):
         return True
 
+    @property
+    def mutually_exclusive(self):
+        return [
+            ['cmd_args', 'commands']
+        ]
+
+    @property
+    def required_one_of(self):
+        return [
+            ['cmd_args', 'commands']
+        ]
 
-class F5BigIpUtilBash(F5BigIpUnnamedObject):
-    def _set_crud_methods(self):
-        self._methods = {
-            'run': self._api.tm.util.bash.exec_cmd
-        }
+
+class F5BigIpUtilBash(F5BigIpDownloadMixin, F5BigIpRestObject):
+    def _run(self, cmd_args):
+        try:
+            output = self._request('POST', 'util/bash', json=dict(command='run', utilCmdArgs=cmd_args))
+        except Exception as exc:
+            err_msg = 'Could not execute the Bash command.'
+            err_msg += ' The error message was "{0}".'.format(str(exc))
+            raise AnsibleF5Error(err_msg)
+        return output.get('commandResult')
+
+    def _output_file(self, index=None):
+        name = self._params['f5_hostname'] if index is None else '{0}_{1}'.format(self._params['f5_hostname'], index)
+        return os.path.join(self._params['output_path'], name + '.out')
+
+    def _write_output(self, output):
+        with open(self._output_file(), 'wb') as f:
+            f.write(output.encode('utf-8'))
+
+    def _script(self, marker, prefix):
+        """Return a script running each command in a subshell, followed by a marker with its index and exit code.
+
+        With output_path, the outputs larger than output_threshold are left in files of the madm folder, whose size
+        follows the exit code in the marker, instead of being printed.
+        """
+        lines = list()
+        for index, command in enumerate(self._params['commands']):
+            if self._params['output_path'] is None:
+                lines.append("( eval {0} ) 2>&1 < /dev/null; printf '{1} %d %d\\n' {2} $?".format(
+                    shlex_quote(command), marker, index))
+            else:
+                lines.append(
+                    "f={0}{1}; ( eval {2} ) > \"$f\" 2>&1 < /dev/null; rc=$?; s=$(stat -c %s \"$f\"); "
+                    "if [ \"$s\" -le {3} ]; then cat \"$f\"; rm -f \"$f\"; s=; fi; "
+                    "printf '{4} %d %d %s\\n' {1} $rc \"$s\"".format(
+                        prefix, index, shlex_quote(command), self._params['output_threshold'], marker))
+        return '\n'.join(lines)
+
+    def _run_batch(self):
+        """Run the commands in a single request, return their results."""
+        marker = 'F5BIGIP_' + uuid.uuid4().hex
+        prefix = '{0}f5bigip_bash_{1}_'.format(MADM_PATH, uuid.uuid4().hex)
+        output = self._run('-c ' + shlex_quote(self._script(marker, prefix))) or ''
+
+        matches = list(re.finditer(re.escape(marker) + r' (\d+) (\d+) ?(\d*)\n', output))
+        # Files are left in the madm folder by the outputs larger than the threshold, or by a batch that stopped
+        leftover = self._params['output_path'] is not None and (
+            len(matches) != len(self._params['commands']) or any(match.group(3) for match in matches))
+
+        results = list()
+        start = 0
+        try:
+            for match in matches:
+                index, rc, size = int(match.group(1)), int(match.group(2)), match.group(3)
+                result = dict(cmd=self._params['commands'][index], rc=rc)
+                if size:
+                    name = prefix[len(MADM_PATH):] + str(index)
+                    result['output_file'] = self._output_file(index)
+                    result['size'] = self._download(MADM_URI + name, MADM_PATH + name, result['output_file'])['size']
+                else:
+                    # The newline ending the output belongs to the marker line
+                    stdout = output[start:match.start()]
+                    result['stdout'] = stdout[:-1] if stdout.endswith('\n') else stdout
+                    result['stdout_lines'] = result['stdout'].splitlines()
+                results.append(result)
+                start = match.end()
+        finally:
+            if leftover:
+                self._run('-c ' + shlex_quote('rm -f -- {0}*'.format(prefix)))
+        if len(results) != len(self._params['commands']):
+            raise AnsibleF5Error("The batch stopped after {0} of its {1} commands: {2}".format(
+                len(results), len(self._params['commands']), output[start:][-1024:]))
+        return results
 
     def flush(self):
-        result = dict(changed=False, stdout=list())
+        result = dict(changed=False)
 
         if self._check_mode:
             result['changed'] = True
             return result
 
-        try:
-            output = self._methods['run']('run', utilCmdArgs=self._params['cmdArgs'])
+        if self._params['output_path'] is not None and not os.path.isdir(self._params['output_path']):
+            os.makedirs(self._params['output_path'])
+
+        if self._params['commands'] is not None:
+            result['results'] = self._run_batch()
             result['changed'] = True
-        except Exception as exc:
-            err_msg = 'Could not execute the Bash command.'
-            err_msg += ' The error message was "{0}".'.format(str(exc))
-            raise AnsibleF5Error(err_msg)
+            return result
 
-        if hasattr(output, 'commandResult'):
-            result['stdout'].append(str(output.commandResult))
+        output = self._run(self._params['cmd_args'])
+        result['changed'] = True
+        result['stdout'] = list()
+        if output is not None:
+            # The threshold is in bytes, like the size of the files of the commands
+            if (self._params['output_path'] is not None and
+                    len(output.encode('utf-8')) > self._params['output_threshold']):
+                self._write_output(output)
+                result['output_file'] = self._output_file()
+            else:
+                result['stdout'].append(str(output))
         result['stdout_lines'] = list(to_lines(result['stdout']))
 
         return result
@@ -120,7 +265,8 @@ class F5BigIpUtilBash(F5BigIpUnnamedObject):
 
 def main():
     params = ModuleParams()
-    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode)
+    module = AnsibleModule(argument_spec=params.argument_spec, supports_check_mode=params.supports_check_mode,
+                           mutually_exclusive=params.mutually_exclusive, required_one_of=params.required_one_of)
 
     try:
         obj = F5BigIpUtilBash(check_mode=module.check_mode, **module.params)
@@ -27,11 +27,19 @@ module: f5bigip_util_qkview
 short_description: BIG-IP util qkview module
 description:
     - Gathers diagnostic information from a BIG-IP system.
+    - With C(action=start), qkview is started in the background on the BIG-IP and the module returns at once with a
+      job handle; C(action=status) then reports whether the job is over and the size of the file written so far.
 version_added: "2.4"
 author:
     - "Gabriel Fortin (@GabrielFortin)"
     - "Eric Jacob (@erjac77)"
 options:
+    action:
+        description:
+            - Specifies whether qkview is run until it completes, started in the background, or whether the status
+              of a job started in the background is read.
+        default: run
+        choices: ['run', 'start', 'status']
     complete:
         description:
             - Collects complete system information, possibly including sensitive user information.
@@ -45,6 +53,9 @@ options:
         description:
             - Provides an alternate file name.
         default: <hostname of BIG-IP>.qkview
+    job:
+        description:
+            - Specifies the job handle returned by C(action=start), required with C(action=status).
     max_file_size:
         description:
             - Sets maximum file size to capture, in bytes.
@@ -81,9 +92,47 @@ EXAMPLES = '''
     exclude: [audit, secure]
     verbose: yes
   delegate_to: localhost
+
+- name: Start a Qkview in the background
+  f5bigip_util_qkview:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    action: start
+    filename: "{{ inventory_hostname }}.qkview"
+  register: qkview
+  delegate_to: localhost
+
+- name: Wait for the Qkview to complete
+  f5bigip_util_qkview:
+    f5_hostname: 172.16.227.35
+    f5_username: admin
+    f5_password: admin
+    f5_port: 443
+    action: status
+    job: "{{ qkview.job }}"
+  register: result
+  until: result.finished
+  retries: 60
+  delay: 20
+  delegate_to: localhost
 '''
 
 RETURN = '''
+finished:
+    description: Whether the job is over.
+    returned: When action is status
+    type: bool
+job:
+    description: The handle of the job started in the background, with its C(pid) and C(filename).
+    returned: When action is start or status
+    type: dict
+    sample: {'pid': 12345, 'filename': 'bigip1.qkview'}
+size:
+    description: The size of the Qkview file written so far, in bytes.
+    returned: When action is status
+    type: int
 stdout:
     description: The output of the command.
     returned: success
@@ -99,9 +148,10 @@ stdout_lines:
 '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.f5bigip import F5_PROVIDER_ARGS
+from ansible.module_utils.f5bigip import F5BigIpUnnamedObject
+from ansible.module_utils.six.moves import shlex_quote
 from ansible_common_f5.base import AnsibleF5Error
-from ansible_common_f5.base import F5_PROVIDER_ARGS
-from ansible_common_f5.bigip import F5BigIpUnnamedObject
 from ansible_common_f5.utils import to_lines
 
 
@@ -109,9 +159,11 @@ class ModuleParams(object):
     @property
     def argument_spec(self):
         argument_spec = dict(
+            action=dict(type='str', choices=['run', 'start', 'status'], default='run'),
             complete=dict(type='bool'),
             exclude=dict(type='list'),
             filename=dict(type='str'),
+            job=dict(type='dict'),
             max_file_size=dict(type='int'),
             timeout=dict(type='int'),
             verbose=dict(type='bool')
@@ -125,9 +177,17 @@ class ModuleParams(object):
 
 
 class F5BigIpUtilQkview(F5BigIpUnnamedObject):
+    def __init__(self, **kwargs):
+        # Options of the module, not of qkview
+        self._action = kwargs.pop('action', None) or 'run'
+        self._job = kwargs.pop('job', None)
+        self._file_name = kwargs.get('filename')
+        super(F5BigIpUtilQkview, self).__init__(**kwargs)
+
     def _set_crud_methods(self):
         self._methods = {
-            'run': self._api.tm.util.qkview.exec_cmd
+            'run': self._api.tm.util.qkview.exec_cmd,
+            'bash': self._api.tm.util.bash.exec_cmd
         }
 
     @property
@@ -167,7 +227,67 @@ class F5BigIpUtilQkview(F5BigIpUnnamedObject):
             return '-v'
         return None
 
+    @property
+    def _cmd_args(self):
+        return ' '.join(str(a) for a in self._params.values())
+
+    def _bash(self, command):
+        output = self._methods['bash']('run', utilCmdArgs='-c ' + shlex_quote(command))
+        return str(getattr(output, 'commandResult', ''))
+
+    def _start(self):
+        """Start qkview in the background, return the job handle at once."""
+        result = dict(changed=True)
+        if self._check_mode:
+            return result
+
+        # The exit code is written next to the file once qkview is over. qkview runs in its own session, so that it
+        # survives the end of the util/bash request and its hangup.
+        name = shlex_quote(self._file_name) if self._file_name else '"$(uname -n).qkview"'
+        output = self._bash(
+            'cd /var/tmp || exit 1; name={0}; rm -f -- "$name" "$name.rc"; '
+            'setsid nohup sh -c \'qkview "$@" > "$0.log" 2>&1; echo $? > "$0.rc"\' "$name" {1} '
+            '< /dev/null > /dev/null 2>&1 & '
+            'echo "$!"; echo "$name"'.format(name, self._cmd_args))
+        try:
+            pid, file_name = output.split('\n')[:2]
+            result['job'] = dict(pid=int(pid), filename=file_name.strip())
+        except ValueError:
+            raise AnsibleF5Error("Cannot start the Qkview: {0}".format(output))
+        return result
+
+    def _status(self):
+        """Read whether the job is over and the size of its file with a single command."""
+        if not isinstance(self._job, dict) or self._job.get('pid') is None or not self._job.get('filename'):
+            raise AnsibleF5Error("The job handle returned by action=start is required.")
+        output = self._bash(
+            'cd /var/tmp || exit 1; name={0}; '
+            'rc() {{ [ -f "$name.rc" ] && echo "done $(cat "$name.rc")"; }}; '
+            # The job may write its .rc between the first check and kill -0
+            'rc || {{ kill -0 {1} 2>/dev/null && echo running; }} || rc || echo lost; '
+            'stat -c %s -- "$name" 2>/dev/null || echo 0; tail -n 5 -- "$name.log" 2>/dev/null'.format(
+                shlex_quote(self._job['filename']), int(self._job['pid'])))
+        lines = output.split('\n')
+        state = lines[0].split()
+        result = dict(changed=False, job=self._job, finished=state[:1] != ['running'])
+        try:
+            result['size'] = int(lines[1])
+        except (IndexError, ValueError):
+            result['size'] = 0
+
+        if state[:1] == ['lost']:
+            raise AnsibleF5Error("The Qkview job {0} is no longer running and did not complete.".format(
+                self._job['pid']))
+        if state[:1] == ['done'] and state[1:] != ['0']:
+            raise AnsibleF5Error("The Qkview failed: {0}".format(' '.join(lines[2:]).strip()))
+        return result
+
     def flush(self):
+        if self._action == 'start':
+            return self._start()
+        if self._action == 'status':
+            return self._status()
+
         result = dict(changed=False, stdout=list())
 
         if self._check_mode:
@@ -175,8 +295,7 @@ class F5BigIpUtilQkview(F5BigIpUnnamedObject):
             return result
 
         try:
-            output = self._methods['run']('run',
-                                          utilCmdArgs='{0}'.format(' '.join(str(a) for a in self._params.values())))
+            output = self._methods['run']('run', utilCmdArgs=self._cmd_args)
             result['changed'] = True
         except Exception as exc:
             err_msg = 'Cannot generate the Qkview file.'
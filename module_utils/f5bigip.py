@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""BIG-IP objects shared by the f5bigip_* modules.
+
+Thin layer on top of ansible-common-f5 adding the connection options specific to this role.
+"""
+
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ansible.module_utils.basic import env_fallback
+from ansible.module_utils.f5bigip_broker import mount_broker
+from ansible.module_utils.f5bigip_task import poll
+from ansible.module_utils.f5bigip_token import F5TokenAuth
+from ansible.module_utils.f5bigip_token import F5TokenCache
+from ansible.module_utils.six import integer_types, iteritems, string_types
+from ansible.module_utils.six.moves import shlex_quote
+from ansible_common_f5.base import AnsibleF5Error
+from ansible_common_f5.base import F5_PROVIDER_ARGS as F5_COMMON_PROVIDER_ARGS
+from ansible_common_f5.bigip import F5BigIpNamedObject as F5CommonBigIpNamedObject
+from ansible_common_f5.bigip import F5BigIpUnnamedObject as F5CommonBigIpUnnamedObject
+from f5.bigip import ManagementRoot
+from f5.sdk_exception import UnsupportedMethod
+
+F5_PROVIDER_ARGS = dict(F5_COMMON_PROVIDER_ARGS)
+F5_PROVIDER_ARGS.update(
+    f5_auth_provider=dict(type='str', fallback=(env_fallback, ['F5_AUTH_PROVIDER'])),
+    f5_broker=dict(type='bool', fallback=(env_fallback, ['F5_BROKER'])),
+    f5_token=dict(type='bool', fallback=(env_fallback, ['F5_TOKEN']))
+)
+
+# Time to compute the checksum of a file on the BIG-IP, in seconds
+CHECKSUM_TIMEOUT = 1800
+
+
+def get_base_url(params):
+    return 'https://{0}:{1}'.format(params['f5_hostname'], params['f5_port'])
+
+
+def get_token_cache(params, timeout=None):
+    return F5TokenCache(
+        get_base_url(params),
+        params['f5_username'],
+        params['f5_password'],
+        provider=params.get('f5_auth_provider'),
+        verify=bool(params.get('f5_verify')),
+        timeout=timeout
+    )
+
+
+# Attributes holding references to other objects, which the BIG-IP reads with their full path
+REFERENCE_KEYS = ['defaultsFrom', 'destination', 'fallbackPersistence', 'lastHopPool', 'monitor', 'name', 'persist',
+                  'policies', 'pool', 'profiles', 'rules', 'strategy', 'vlans']
+
+# Attributes whose lists are sets, which the BIG-IP may read in another order than given
+UNORDERED_KEYS = ['controls', 'members', 'partitionAccess', 'policies', 'profiles', 'requires', 'values', 'vlans']
+
+
+def normalize_value(value, partition=None):
+    """Return a comparable form of a scalar value, as given in the module params or as read from the BIG-IP.
+
+    With a partition, the value is a reference, and the partition is left out of the full path of the object.
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, integer_types):
+        return str(value)
+    if isinstance(value, string_types):
+        value = value.strip()
+        # References to objects of the same partition are read with their full path
+        if partition and value.startswith('/{0}/'.format(partition)):
+            value = value[len(partition) + 2:]
+        return value
+    return value
+
+
+def is_equal(current, desired, partition=None, key=None, reference=False):
+    """Return True when the desired value of an attribute, named key, matches its current value.
+
+    Lists keep their order, unless they are those of UNORDERED_KEYS. Only the keys given in a desired dict are
+    compared, and the items of a subcollection (such as the profiles of a virtual server) may be given by their name
+    only. The references, those of REFERENCE_KEYS, are compared without the partition of the object.
+    """
+    reference = reference or key in REFERENCE_KEYS
+    if isinstance(desired, list):
+        if not isinstance(current, list) or len(current) != len(desired):
+            return False
+        if key not in UNORDERED_KEYS:
+            return all(is_equal(c, d, partition, reference=reference) for c, d in zip(current, desired))
+        remaining = list(current)
+        for item in desired:
+            for i, candidate in enumerate(remaining):
+                if is_equal(candidate, item, partition, reference=reference):
+                    del remaining[i]
+                    break
+            else:
+                return False
+        return True
+    if isinstance(desired, dict):
+        if not isinstance(current, dict):
+            return False
+        return all(is_equal(current.get(k), v, partition, k, reference) for k, v in iteritems(desired) if v is not None)
+    if isinstance(current, dict):
+        current = current.get('fullPath') or current.get('name')
+    if reference:
+        return normalize_monitor(current, partition) == normalize_monitor(desired, partition)
+    return normalize_value(current) == normalize_value(desired)
+
+
+def normalize_monitor(value, partition=None):
+    """Return a comparable form of a monitor rule, such as 'http and tcp' or 'min 1 of { http tcp }'.
+
+    The BIG-IP reads the monitors of a rule with their full path; those given without one are looked up in the
+    partition of the object, then in Common.
+    """
+    if not isinstance(value, string_types):
+        return normalize_value(value, partition)
+    return ' '.join(normalize_value(normalize_value(token, partition), 'Common') for token in value.split())
+
+
+def normalize_user_status(key, value):
+    """Return the state or session of a node or pool member as set by the user, such as user-up or user-enabled.
+
+    The BIG-IP reads them along with the status of the monitors instead, such as up, unchecked or monitor-enabled.
+    """
+    if key == 'state' and isinstance(value, string_types) and value.strip() != 'user-down':
+        return 'user-up'
+    if key == 'session' and isinstance(value, string_types) and value.strip() == 'monitor-enabled':
+        return 'user-enabled'
+    return value
+
+
+def attach_resource(resource, name, partition=None, subPath=None):
+    """Address an existing BIG-IP object through an unloaded f5-sdk resource, without loading it.
+
+    The returned resource only knows its URI, which is enough to reach its subcollections. When the resource cannot
+    be addressed directly, it is loaded from the BIG-IP instead.
+    """
+    try:
+        uri = resource._meta_data['container']._meta_data['uri']
+        if partition:
+            uri += '~{0}~'.format(partition) + ('{0}~'.format(subPath) if subPath else '')
+        resource._activate_URI(uri + name)
+    except (AttributeError, KeyError):
+        kwargs = dict(name=name)
+        if partition:
+            kwargs['partition'] = partition
+        if subPath:
+            kwargs['subPath'] = subPath
+        return resource.load(**kwargs)
+    return resource
+
+
+def get_session(params, pool_size=1, timeout=None):
+    """Return a requests session authenticated on the BIG-IP, able to keep pool_size connections alive.
+
+    The timeout applies to the login requests for a token, which the requests of the session may trigger.
+    """
+    session = requests.Session()
+    session.verify = bool(params.get('f5_verify'))
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    if params.get('f5_token'):
+        session.auth = F5TokenAuth(get_token_cache(params, timeout))
+    else:
+        session.auth = (params['f5_username'], params['f5_password'])
+    if params.get('f5_broker'):
+        mount_broker(session, params.get('f5_auth_provider'))
+    return session
+
+
+class F5ManagementRoot(ManagementRoot):
+    """ManagementRoot letting the role prepare the iControl REST session before its first request."""
+
+    def __init__(self, hostname, username, password, session_hook=None, **kwargs):
+        self._session_hook = session_hook
+        super(F5ManagementRoot, self).__init__(hostname, username, password, **kwargs)
+
+    def _get_icr_session(self, *args, **kwargs):
+        icr_session = super(F5ManagementRoot, self)._get_icr_session(*args, **kwargs)
+        if self._session_hook is not None:
+            self._session_hook(icr_session.session)
+        return icr_session
+
+
+class F5BigIpObjectMixin(object):
+    """Connection handling common to the named and unnamed BIG-IP objects."""
+
+    def __init__(self, **kwargs):
+        # Connection options of this role, unknown to ansible-common-f5
+        self._connection = dict(
+            (k, kwargs.pop(k, None)) for k in F5_PROVIDER_ARGS if k not in F5_COMMON_PROVIDER_ARGS)
+        self._connection.update((k, kwargs.get(k)) for k in F5_COMMON_PROVIDER_ARGS)
+        super(F5BigIpObjectMixin, self).__init__(**kwargs)
+        # In case the API was not built by _get_api
+        self._prepare_session(self._api.icrs.session)
+
+    def _prepare_session(self, session):
+        if self._connection['f5_token'] and not isinstance(session.auth, F5TokenAuth):
+            session.auth = F5TokenAuth(get_token_cache(self._connection))
+        if self._connection['f5_broker']:
+            mount_broker(session, self._connection['f5_auth_provider'])
+
+    def _get_api(self):
+        if not self._connection['f5_broker'] and not self._connection['f5_token']:
+            return super(F5BigIpObjectMixin, self)._get_api()
+
+        try:
+            api = F5ManagementRoot(
+                self._connection['f5_hostname'],
+                self._connection['f5_username'],
+                self._connection['f5_password'],
+                session_hook=self._prepare_session,
+                port=self._connection['f5_port'],
+                verify=bool(self._connection.get('f5_verify'))
+            )
+        except Exception as exc:
+            raise AnsibleF5Error("Unable to connect to {0} on port {1}: {2}".format(
+                self._connection['f5_hostname'], self._connection['f5_port'], exc))
+        self._prepare_session(api.icrs.session)
+        return api
+
+
+def is_not_found(exc):
+    """Return True when an iControl REST error means that the object does not exist."""
+    return getattr(getattr(exc, 'response', None), 'status_code', None) == 404
+
+
+class F5BigIpNamedObject(F5BigIpObjectMixin, F5CommonBigIpNamedObject):
+    _loaded = None
+
+    def __init__(self, **kwargs):
+        # Options of the module translated into another param, such as state_user into state
+        self._translated = dict((v, k) for k, v in iteritems(kwargs.get('tr') or dict()))
+        super(F5BigIpNamedObject, self).__init__(**kwargs)
+
+    def _load(self):
+        """Load the object from the BIG-IP, reusing the object loaded by _exists when there is one."""
+        if self._loaded is not None:
+            obj, self._loaded = self._loaded, None
+            return obj
+
+        params = dict(name=self._params['name'])
+        for key in ['partition', 'subPath']:
+            if self._params.get(key) is not None:
+                params[key] = self._params[key]
+        return self._methods['read'](**params)
+
+    def _exists(self):
+        """Check whether the object exists with a single GET, kept for the next _read."""
+        if 'read' not in self._methods:
+            return super(F5BigIpNamedObject, self)._exists()
+
+        self._loaded = None
+        try:
+            self._loaded = self._load()
+        except Exception as exc:
+            if is_not_found(exc):
+                return False
+            raise
+        return True
+
+    def _read(self):
+        return self._load()
+
+    def _diff(self, obj):
+        """Return the params that differ from the attributes of the object read from the BIG-IP."""
+        partition = self._params.get('partition')
+        diff = dict()
+        for key, value in iteritems(self._params):
+            # The present/absent state of the module is not an attribute, unlike an option translated into state
+            option = self._translated.get(key, key)
+            if value is None or option in ['name', 'partition', 'state', 'subPath']:
+                continue
+            current = getattr(obj, key, None)
+            if option in ['session', 'state_user']:
+                current = normalize_user_status(key, current)
+            if not is_equal(current, value, partition, key):
+                diff[key] = value
+        return diff
+
+    def _update(self):
+        """Send a PATCH with the changed attributes only, or nothing when the object is up to date."""
+        obj = self._read()
+        diff = self._diff(obj)
+        if not diff:
+            return False
+
+        if not self._check_mode:
+            try:
+                obj.modify(**diff)
+            except UnsupportedMethod:
+                # Some resources can only be replaced as a whole
+                obj.update(**diff)
+        return True
+
+
+class F5BigIpUnnamedObject(F5BigIpObjectMixin, F5CommonBigIpUnnamedObject):
+    pass
+
+
+class F5BigIpRestObject(object):
+    """BIG-IP object managed with plain iControl REST requests, for the operations not covered by the f5-sdk."""
+
+    def __init__(self, check_mode=False, session=None, **params):
+        self._check_mode = check_mode
+        self._params = params
+        self._host_url = get_base_url(params)
+        self._base_url = self._host_url + '/mgmt/tm/'
+        # The session of an existing f5-sdk API may be reused, with its connections and its login
+        self._session = session or get_session(params)
+
+    def _url(self, path):
+        """Return the URL of a path under /mgmt/tm, or of an absolute path such as /mgmt/shared/..."""
+        return self._host_url + path if path.startswith('/') else self._base_url + path
+
+    def _request(self, method, path, headers=None, **kwargs):
+        """Send a request to a path under /mgmt/tm and return the decoded response."""
+        resp = self._session.request(method, self._url(path), headers=headers, **kwargs)
+        if resp.status_code >= 400:
+            try:
+                message = resp.json().get('message', resp.reason)
+            except ValueError:
+                message = resp.reason
+            raise AnsibleF5Error("{0} {1}: {2} {3}".format(method, path, resp.status_code, message))
+        return resp.json() if resp.content else dict()
+
+    def _get(self, path, **kwargs):
+        """GET a path under /mgmt/tm, return None when it does not exist."""
+        resp = self._session.get(self._url(path), **kwargs)
+        if resp.status_code == 404:
+            return None
+        if resp.status_code >= 400:
+            raise AnsibleF5Error("Unable to read '{0}': {1} {2}".format(path, resp.status_code, resp.reason))
+        return resp.json()
+
+    def _bash(self, command, **kwargs):
+        """Run a Bash command on the BIG-IP and return its output."""
+        resp = self._request('POST', 'util/bash', json=dict(command='run', utilCmdArgs='-c ' + shlex_quote(command)),
+                             **kwargs)
+        return resp.get('commandResult', '')
+
+    def _stat_file(self, path):
+        """Return the size and the SHA-256 checksum of a file on the BIG-IP, or None and None when it does not exist.
+
+        The checksum is computed in the background and polled, since it outlasts a request on files of several GB.
+        """
+        output_path = '/var/tmp/f5bigip_sha256_{0}'.format(uuid.uuid4().hex)
+        output = self._bash(
+            "stat -c %s {0} 2>/dev/null && {{ setsid nohup sh -c 'sha256sum \"$0\" > \"$1.part\"; "
+            "mv \"$1.part\" \"$1\"' {0} {1} > /dev/null 2>&1 < /dev/null & }}".format(shlex_quote(path), output_path))
+        try:
+            size = int(output.split()[0])
+        except (IndexError, ValueError):
+            return None, None
+
+        def check():
+            # The output file appears once the checksum is over, and is left empty when it failed
+            output = self._bash('cat {0} 2>/dev/null && echo .'.format(output_path))
+            return output.split() or None
+
+        try:
+            checksum = poll(check, CHECKSUM_TIMEOUT, message="Timed out computing the checksum of '{0}'.".format(path))
+        finally:
+            self._bash('rm -f {0} {0}.part'.format(output_path))
+        return size, checksum[0] if len(checksum) > 1 else None
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local iControl REST session broker.
+
+The broker is a small daemon listening on a Unix socket on the Ansible controller. It keeps one authenticated,
+keep-alive connection pool per BIG-IP (hostname and port) and relays the HTTP requests of every module invocation
+through it, so that the TLS handshake and the login are only paid once per playbook instead of once per task.
+
+The first module that needs the broker starts it; it exits by itself after BROKER_IDLE_TIMEOUT seconds without any
+client.
+"""
+
+import base64
+import errno
+import fcntl
+import json
+import os
+import socket
+import struct
+import threading
+import time
+
+from io import BytesIO
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from ansible.module_utils.f5bigip_token import login
+from ansible.module_utils.f5bigip_token import LOGIN_TIMEOUT
+from ansible.module_utils.f5bigip_token import TOKEN_HEADER
+from ansible.module_utils.f5bigip_token import TOKEN_REFRESH_MARGIN
+from ansible.module_utils.six import binary_type, text_type
+from ansible.module_utils.six.moves import socketserver
+from ansible.module_utils.six.moves.urllib.parse import urlsplit
+
+BROKER_DIR = os.path.join(os.path.expanduser('~'), '.ansible', 'f5bigip')
+BROKER_IDLE_TIMEOUT = 300
+BROKER_POOL_SIZE = 10
+BROKER_START_TIMEOUT = 10
+
+# Headers that no longer describe the body once it has been decoded by the broker
+HOP_BY_HOP_HEADERS = ['connection', 'content-encoding', 'content-length', 'keep-alive', 'transfer-encoding']
+
+FRAME_HEADER = struct.Struct('!II')
+
+
+def broker_socket_path():
+    return os.path.join(BROKER_DIR, 'broker.sock')
+
+
+def basic_auth_header(username, password):
+    credentials = '{0}:{1}'.format(username, password).encode('utf-8')
+    return 'Basic ' + base64.b64encode(credentials).decode('ascii')
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise EOFError('Connection closed by peer.')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _send_frame(sock, header, body=b''):
+    header = json.dumps(header).encode('utf-8')
+    sock.sendall(FRAME_HEADER.pack(len(header), len(body)) + header + body)
+
+
+def _recv_frame(sock):
+    header_len, body_len = FRAME_HEADER.unpack(_recv_exactly(sock, FRAME_HEADER.size))
+    header = json.loads(_recv_exactly(sock, header_len).decode('utf-8'))
+    return header, _recv_exactly(sock, body_len)
+
+
+class _BrokerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.server.connection_opened()
+        try:
+            while True:
+                try:
+                    header, body = _recv_frame(self.request)
+                except (EOFError, socket.error):
+                    break
+                try:
+                    response = self.server.relay(header, body)
+                    _send_frame(
+                        self.request,
+                        dict(
+                            status=response.status_code,
+                            reason=response.reason,
+                            headers=dict((k, v) for k, v in response.headers.items()
+                                         if k.lower() not in HOP_BY_HOP_HEADERS)
+                        ),
+                        response.content
+                    )
+                except Exception as exc:
+                    _send_frame(self.request, dict(error=str(exc)))
+        finally:
+            self.server.connection_closed()
+
+
+class _BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, idle_timeout=BROKER_IDLE_TIMEOUT):
+        socketserver.UnixStreamServer.__init__(self, path, _BrokerHandler)
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sessions = dict()
+        self._tokens = dict()
+        self._connections = 0
+        self._last_activity = time.time()
+
+    def connection_opened(self):
+        with self._lock:
+            self._connections += 1
+            self._last_activity = time.time()
+
+    def connection_closed(self):
+        with self._lock:
+            self._connections -= 1
+            self._last_activity = time.time()
+
+    def idle(self):
+        with self._lock:
+            return not self._connections and time.time() - self._last_activity > self._idle_timeout
+
+    def _session(self, base_url, verify):
+        """Return the keep-alive session of a BIG-IP, creating it on first use."""
+        with self._lock:
+            key = (base_url, verify)
+            if key not in self._sessions:
+                session = requests.Session()
+                session.verify = verify
+                session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=BROKER_POOL_SIZE))
+                self._sessions[key] = session
+            return self._sessions[key]
+
+    def _login(self, session, base_url, authorization, provider=None, timeout=None):
+        username, password = base64.b64decode(authorization.split(' ', 1)[1]).decode('utf-8').split(':', 1)
+        return login(base_url, username, password, provider=provider, session=session,
+                     request_timeout=timeout or LOGIN_TIMEOUT)
+
+    def _token(self, session, base_url, authorization, provider=None, renew=False, timeout=None):
+        """Return a valid authentication token for the credentials and login provider, logging in when needed."""
+        key = (base_url, authorization, provider)
+        with self._lock:
+            cached = self._tokens.get(key)
+        if cached and not renew and cached[1] - TOKEN_REFRESH_MARGIN > time.time():
+            return cached[0]
+        try:
+            token = self._login(session, base_url, authorization, provider, timeout)
+        except Exception:
+            token = None
+        with self._lock:
+            if token:
+                self._tokens[key] = token
+            else:
+                self._tokens.pop(key, None)
+        return token[0] if token else None
+
+    def relay(self, header, body):
+        with self._lock:
+            self._last_activity = time.time()
+
+        url = urlsplit(header['url'])
+        base_url = '{0}://{1}'.format(url.scheme, url.netloc)
+        verify = header.get('verify', False)
+        session = self._session(base_url, verify)
+
+        headers = CaseInsensitiveDict(header.get('headers') or {})
+        authorization = headers.pop('Authorization', None)
+        provider = header.get('provider')
+        token = None
+        if authorization and authorization.startswith('Basic ') and not headers.get(TOKEN_HEADER):
+            token = self._token(session, base_url, authorization, provider, timeout=header.get('timeout'))
+
+        for attempt in range(2):
+            if token:
+                headers[TOKEN_HEADER] = token
+            elif authorization:
+                headers['Authorization'] = authorization
+            response = session.request(
+                header['method'], header['url'],
+                headers=headers,
+                data=body or None,
+                timeout=header.get('timeout'),
+                allow_redirects=False
+            )
+            if response.status_code != 401 or not token or attempt:
+                return response
+            # The token was revoked or has expired on the BIG-IP, log in again and retry once
+            token = self._token(session, base_url, authorization, provider, renew=True, timeout=header.get('timeout'))
+        return response
+
+
+def _watch_idle(server):
+    while not server.idle():
+        time.sleep(1)
+    server.shutdown()
+
+
+def serve(path=None, idle_timeout=BROKER_IDLE_TIMEOUT):
+    """Run the broker in the current process until it has been idle for idle_timeout seconds."""
+    path = path or broker_socket_path()
+    lock = open(path + '.lock', 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except IOError:
+        # Another broker already serves this socket
+        lock.close()
+        return
+
+    try:
+        if os.path.exists(path):
+            os.unlink(path)
+        server = _BrokerServer(path, idle_timeout=idle_timeout)
+        os.chmod(path, 0o600)
+        watcher = threading.Thread(target=_watch_idle, args=(server,))
+        watcher.daemon = True
+        watcher.start()
+        try:
+            server.serve_forever(poll_interval=1)
+        finally:
+            server.server_close()
+            os.unlink(path)
+    finally:
+        lock.close()
+
+
+def spawn(path=None):
+    """Start the broker as a detached daemon process."""
+    path = path or broker_socket_path()
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path), 0o700)
+
+    pid = os.fork()
+    if pid:
+        os.waitpid(pid, 0)
+        return
+
+    # Detach from the module process so that Ansible does not wait for the broker to exit
+    try:
+        os.setsid()
+        if os.fork():
+            os._exit(0)
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in range(3):
+            os.dup2(devnull, fd)
+        os.closerange(3, 1024)
+        os.umask(0o077)
+        serve(path)
+    finally:
+        os._exit(0)
+
+
+class F5BrokerClient(object):
+    """Client side of the broker, one persistent Unix socket connection per module invocation."""
+
+    def __init__(self, path=None):
+        self._path = path or broker_socket_path()
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _try_connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._path)
+        except socket.error as exc:
+            sock.close()
+            if exc.errno in (errno.ENOENT, errno.ECONNREFUSED):
+                return None
+            raise
+        return sock
+
+    def _connect(self):
+        sock = self._try_connect()
+        if sock is None:
+            spawn(self._path)
+            deadline = time.time() + BROKER_START_TIMEOUT
+            while sock is None and time.time() < deadline:
+                time.sleep(0.05)
+                sock = self._try_connect()
+            if sock is None:
+                raise socket.error(errno.ETIMEDOUT, 'Unable to start the F5 session broker.')
+        return sock
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def request(self, method, url, headers=None, body=None, verify=False, timeout=None, provider=None):
+        """Relay a request through the broker and return its status, reason, headers and body."""
+        if body is None:
+            body = b''
+        elif isinstance(body, text_type):
+            body = body.encode('utf-8')
+        header = dict(method=method, url=url, headers=dict(headers or {}), verify=verify, timeout=timeout,
+                      provider=provider)
+
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self._sock = self._connect()
+                try:
+                    _send_frame(self._sock, header, body)
+                    response, content = _recv_frame(self._sock)
+                    break
+                except (EOFError, socket.error):
+                    # The broker went away (idle shutdown), reconnect once
+                    self._sock.close()
+                    self._sock = None
+                    if attempt:
+                        raise
+
+        if 'error' in response:
+            raise requests.exceptions.ConnectionError(response['error'])
+        return response['status'], response['reason'], response['headers'], content
+
+
+class F5BrokerAdapter(BaseAdapter):
+    """Transport adapter that sends the requests of a requests.Session through the broker."""
+
+    def __init__(self, client=None, provider=None):
+        super(F5BrokerAdapter, self).__init__()
+        self._client = client
+        # Login provider of the tokens obtained by the broker for the basic credentials
+        self._provider = provider
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._clients = list()
+
+    def _get_client(self):
+        """Return the broker client of the calling thread, so that concurrent requests do not wait for each other."""
+        if self._client is not None:
+            return self._client
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = F5BrokerClient()
+            with self._lock:
+                self._clients.append(client)
+        return client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body
+        if hasattr(body, 'read'):
+            body = body.read()
+        elif body is not None and not isinstance(body, (binary_type, text_type)):
+            body = b''.join(body)
+        if isinstance(timeout, tuple):
+            timeout = max(t for t in timeout if t is not None) if any(timeout) else None
+
+        status, reason, headers, content = self._get_client().request(
+            request.method, request.url, headers=request.headers, body=body, verify=verify, timeout=timeout,
+            provider=self._provider)
+
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = BytesIO(content)
+        response._content = content
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+
+
+def mount_broker(session, provider=None):
+    """Route every HTTPS request of a requests.Session through the broker, logging in with the given provider."""
+    if not isinstance(session.get_adapter('https://'), F5BrokerAdapter):
+        session.mount('https://', F5BrokerAdapter(provider=provider))
+    return session
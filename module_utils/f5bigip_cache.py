@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On-disk cache of the iControl REST responses collected by f5bigip_facts.
+
+Each response is stored on the controller, one file per BIG-IP, user, URI and query, along with the configuration
+generation of the BIG-IP at the time it was collected (and its ETag, when the BIG-IP sent one). A cached response is
+reused as long as the configuration generation has not changed, or when the BIG-IP answers 304 to a conditional GET.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.ansible', 'f5bigip', 'facts')
+
+# Attributes of /mgmt/tm/sys/config that change with every configuration change
+STAMP_KEYS = ['generation', 'lastUpdateMicros']
+
+
+def get_config_stamp(session, base_url):
+    """Return the configuration generation of the BIG-IP, or None when it is not available."""
+    try:
+        resp = session.get(base_url + '/mgmt/tm/sys/config', timeout=30)
+        if resp.status_code != 200:
+            return None
+        config = resp.json()
+    except Exception:
+        return None
+    stamp = [config.get(k) for k in STAMP_KEYS]
+    return stamp if any(v is not None for v in stamp) else None
+
+
+class F5FactsCache(object):
+    """Facts cache of a BIG-IP and user, validated against the configuration stamp taken when it was created."""
+
+    def __init__(self, base_url, username, stamp=None, cache_dir=CACHE_DIR):
+        self._base_url = base_url
+        self._username = username
+        self._stamp = stamp
+        self._cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self.hits = list()
+
+    def _path(self, key):
+        key = json.dumps([self._base_url, self._username or '', key], sort_keys=True)
+        return os.path.join(self._cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        """Return the cached entry of a request, with its 'document', 'etag' and 'stamp', or None."""
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        """Return True when the entry was collected at the current configuration generation."""
+        return self._stamp is not None and entry.get('stamp') == self._stamp
+
+    def set(self, key, document, etag=None):
+        if not os.path.isdir(self._cache_dir):
+            os.makedirs(self._cache_dir, 0o700)
+        path = self._path(key)
+        tmp_path = '{0}.{1}.{2}'.format(path, os.getpid(), threading.current_thread().ident)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(dict(document=document, etag=etag, stamp=self._stamp), f)
+        os.rename(tmp_path, path)
+
+    def hit(self, name):
+        with self._lock:
+            self.hits.append(name)
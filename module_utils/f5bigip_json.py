@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Incremental parsing of iControl REST collections.
+
+The items of a collection are decoded one by one while the response is being read, so that only the current chunk of
+the response and the items kept by the caller are held in memory.
+"""
+
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 65536
+WHITESPACE = ' \t\n\r'
+DELIMITERS = WHITESPACE + ',:]}'
+
+# Characters ending a number, true, false or null
+SCALAR_END = re.compile(r'[ \t\n\r,:\]}]')
+# Characters changing the nesting of an object or array, outside of the strings
+STRUCTURE_CHARS = re.compile(r'["\[\]{}]')
+
+
+class F5KeyNormalizer(object):
+    """JSON object hook removing the hyphens from the keys, so that they can be used as Jinja2 attributes.
+
+    Used as the object_pairs_hook of a JSON decoder, every object of the document is built once, already normalized,
+    at any depth. Each distinct key is only translated once.
+    """
+
+    def __init__(self):
+        self._keys = dict()
+
+    def key(self, key):
+        try:
+            return self._keys[key]
+        except KeyError:
+            return self._keys.setdefault(key, key.replace('-', ''))
+
+    def __call__(self, pairs):
+        keys = self._keys
+        result = dict()
+        for key, value in pairs:
+            new_key = keys.get(key)
+            if new_key is None:
+                new_key = keys[key] = key.replace('-', '')
+            result[new_key] = value
+        return result
+
+
+class F5CollectionParser(object):
+    """Stream the 'items' of a JSON document read from a file-like object.
+
+    Iterating over the parser yields each item with the size of its JSON text. Once the iteration is over, the other
+    top-level keys of the document are available in the 'document' attribute (the items key is left empty).
+
+    When the items key holds an object, such as the 'entries' of a stats resource, the values of its members are
+    yielded instead, and their keys are dropped.
+    """
+
+    def __init__(self, fileobj, items_key='items', chunk_size=CHUNK_SIZE, object_pairs_hook=None):
+        self._fileobj = fileobj
+        self._items_key = items_key
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder(object_pairs_hook=object_pairs_hook)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self.document = dict()
+
+    def _fill(self):
+        """Read the next chunk of the response, return False at the end of the document."""
+        if self._eof:
+            return False
+        chunk = self._fileobj.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            self._buf = self._buf[self._pos:] + self._text_decoder.decode(b'', final=True)
+        else:
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode('utf-8')
+            self._buf = self._buf[self._pos:] + self._text_decoder.decode(chunk)
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Return the next non-whitespace character, reading more of the response when needed."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError('Unexpected end of JSON document.')
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError("Expecting '{0}' at position {1} of the JSON document.".format(char, self._pos))
+        self._pos += 1
+
+    def _scan(self):
+        """Return the end of the JSON value at the current position, reading more of the response when needed.
+
+        The scan resumes where it stopped after each read, so that the text of a large value is only gone through once
+        before being decoded.
+        """
+        self._peek()
+        if self._buf[self._pos] not in '{["':
+            while True:
+                match = SCALAR_END.search(self._buf, self._pos)
+                if match is not None:
+                    return match.start()
+                if not self._fill():
+                    return len(self._buf)
+
+        # Offset of the scan from the current position, which stays valid when the buffer is refilled
+        offset = 0
+        depth = 0
+        in_string = False
+        while True:
+            buf = self._buf
+            i = self._pos + offset
+            while True:
+                if in_string:
+                    i = buf.find('"', i)
+                    if i < 0:
+                        i = len(buf)
+                        break
+                    # The quote is escaped when preceded by an odd number of backslashes
+                    start = i
+                    while buf[start - 1] == '\\':
+                        start -= 1
+                    i += 1
+                    if (i - 1 - start) % 2:
+                        continue
+                    in_string = False
+                    if not depth:
+                        return i
+                    continue
+                match = STRUCTURE_CHARS.search(buf, i)
+                if match is None:
+                    i = len(buf)
+                    break
+                char = match.group()
+                i = match.end()
+                if char == '"':
+                    in_string = True
+                elif char in '{[':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if not depth:
+                        return i
+            offset = i - self._pos
+            if not self._fill():
+                raise ValueError('Unexpected end of JSON document.')
+
+    def _value(self):
+        """Decode the next JSON value, return it with the size of its text.
+
+        The value is decoded from the text already read when it is complete. Otherwise its end is found first, and it
+        is decoded once: decoding it again after each read would take quadratic time on large values.
+        """
+        self._peek()
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+            # A number is only complete once followed by a delimiter
+            if self._eof or (end < len(self._buf) and self._buf[end] in DELIMITERS):
+                size = end - self._pos
+                self._pos = end
+                return value, size
+        except ValueError:
+            if self._eof:
+                raise
+        self._scan()
+        value, end = self._decoder.raw_decode(self._buf, self._pos)
+        size = end - self._pos
+        self._pos = end
+        return value, size
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._value()[0]
+            self._expect(':')
+            if key == self._items_key and self._peek() in '[{':
+                end = ']' if self._peek() == '[' else '}'
+                self._pos += 1
+                self.document[key] = list() if end == ']' else dict()
+                if self._peek() == end:
+                    self._pos += 1
+                else:
+                    while True:
+                        if end == '}':
+                            self._value()
+                            self._expect(':')
+                        yield self._value()
+                        if self._peek() == end:
+                            self._pos += 1
+                            break
+                        self._expect(',')
+            else:
+                self.document[key] = self._value()[0]
+            if self._peek() == '}':
+                self._pos += 1
+                return
+            self._expect(',')
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Data-group records handling shared by the data-group modules.
+
+The records are indexed by name in a dict, so that comparing two lists of records takes a single pass over each of
+them, whatever their size. The addresses of the records of type ip are handled as (integer, prefix length) pairs.
+"""
+
+import socket
+import struct
+
+from ansible.module_utils.six import iteritems, string_types
+from ansible_common_f5.base import AnsibleF5Error
+
+RECORDS_ACTIONS = ['add', 'remove', 'replace']
+
+IPV4_BITS = 32
+IPV6_BITS = 128
+
+
+def record_name(name, type=None):
+    """Return the name of a record as the BIG-IP stores it."""
+    name = str(name).strip()
+    # Addresses are stored as networks, with their prefix length, and IPv6 addresses in compressed lower case
+    if type == 'ip':
+        name = format_network(*parse_network(name))
+    return name
+
+
+def iter_records(records):
+    """Yield the name and data of each record of a list of records, given as dicts or as names only."""
+    for record in records or []:
+        if isinstance(record, dict):
+            if record.get('name') is None:
+                raise AnsibleF5Error("Each record must have a 'name' key.")
+            name, data = record['name'], record.get('data')
+        elif isinstance(record, string_types):
+            name, data = record, None
+        else:
+            raise AnsibleF5Error("Invalid record '{0}'.".format(record))
+        yield name, '' if data is None else str(data)
+
+
+def index_records(records, type=None):
+    """Index a list of records by name."""
+    return dict((record_name(name, type), data) for name, data in iter_records(records))
+
+
+def diff_records(current, desired, action='replace'):
+    """Compare two indexes of records, return the names of the records to add, modify and delete.
+
+    With the 'add' action, the desired records are added or modified; with 'remove', the desired records are deleted;
+    with 'replace', the records end up being the desired ones.
+    """
+    added = list()
+    modified = list()
+    deleted = list()
+    if action == 'remove':
+        deleted = [name for name in desired if name in current]
+        return added, modified, deleted
+
+    for name, data in iteritems(desired):
+        current_data = current.get(name)
+        if current_data is None:
+            added.append(name)
+        elif current_data != data:
+            modified.append(name)
+    if action == 'replace':
+        deleted = [name for name in current if name not in desired]
+    return added, modified, deleted
+
+
+def merge_records(current, desired, action='replace'):
+    """Return the index of the records once the desired records are applied with the given action."""
+    if action == 'replace':
+        return dict(desired)
+    result = dict(current)
+    if action == 'add':
+        result.update(desired)
+    else:
+        for name in desired:
+            result.pop(name, None)
+    return result
+
+
+def to_records(index):
+    """Return an index of records as the list of records expected by the BIG-IP."""
+    return [dict(name=name, data=data) if data else dict(name=name) for name, data in sorted(iteritems(index))]
+
+
+def parse_network(name):
+    """Parse an address record name, return its family, route domain, network as an integer and prefix length."""
+    address, _, prefix = name.partition('/')
+    address, _, route_domain = address.partition('%')
+    try:
+        if ':' in address:
+            high, low = struct.unpack('!QQ', socket.inet_pton(socket.AF_INET6, address))
+            bits, value = IPV6_BITS, (high << 64) | low
+        else:
+            bits, value = IPV4_BITS, struct.unpack('!I', socket.inet_aton(address))[0]
+            if address.count('.') != 3:
+                raise ValueError()
+        length = int(prefix) if prefix else bits
+        if not 0 <= length <= bits:
+            raise ValueError()
+    except (socket.error, struct.error, ValueError):
+        raise AnsibleF5Error("Invalid address record '{0}'.".format(name))
+    # Clear the host bits
+    value &= ~((1 << (bits - length)) - 1)
+    return bits, route_domain, value, length
+
+
+def format_network(bits, route_domain, value, length):
+    if bits == IPV4_BITS:
+        address = socket.inet_ntoa(struct.pack('!I', value))
+    else:
+        address = socket.inet_ntop(socket.AF_INET6, struct.pack('!QQ', value >> 64, value & 0xFFFFFFFFFFFFFFFF))
+    if route_domain:
+        address += '%' + route_domain
+    return '{0}/{1}'.format(address, length)
+
+
+def _merge_siblings(networks, bits):
+    """Replace the pairs of sibling networks with the same data by their parent, unless the parent already exists."""
+    changed = False
+    by_length = dict()
+    for (value, length), data in iteritems(networks):
+        by_length.setdefault(length, dict())[value] = data
+    for length in range(bits, 0, -1):
+        level = by_length.get(length)
+        if not level:
+            continue
+        parents = by_length.setdefault(length - 1, dict())
+        step = 1 << (bits - length)
+        for value in list(level):
+            if value & step or value not in level:
+                continue
+            sibling = value | step
+            if sibling in level and level[sibling] == level[value] and value not in parents:
+                parents[value] = level.pop(value)
+                del level[sibling]
+                changed = True
+    result = dict()
+    for length, level in iteritems(by_length):
+        result.update(((value, length), data) for value, data in iteritems(level))
+    return result, changed
+
+
+def _remove_covered(networks, bits):
+    """Remove the networks whose closest enclosing network has the same data."""
+    changed = False
+    result = dict()
+    stack = list()
+    for value, length in sorted(networks):
+        # The networks are sorted so that every network comes after the networks enclosing it
+        while stack and (value >> (bits - stack[-1][1])) != (stack[-1][0] >> (bits - stack[-1][1])):
+            stack.pop()
+        data = networks[(value, length)]
+        if stack and networks[stack[-1]] == data:
+            changed = True
+            continue
+        stack.append((value, length))
+        result[(value, length)] = data
+    return result, changed
+
+
+def aggregate_records(records):
+    """Index a list of address records, collapsed into the smallest set of networks matching the same way.
+
+    Duplicates and the networks enclosed in a network with the same data are removed, and the adjacent networks with
+    the same data are merged. The networks with different data are never merged, so every address keeps its data.
+    """
+    families = dict()
+    for name, data in iter_records(records):
+        bits, route_domain, value, length = parse_network(str(name).strip())
+        networks = families.setdefault((bits, route_domain), dict())
+        if networks.get((value, length), data) != data:
+            raise AnsibleF5Error("Conflicting data for the address record '{0}'.".format(name))
+        networks[(value, length)] = data
+
+    index = dict()
+    for (bits, route_domain), networks in iteritems(families):
+        changed = True
+        while changed:
+            networks, merged = _merge_siblings(networks, bits)
+            networks, removed = _remove_covered(networks, bits)
+            changed = merged or removed
+        index.update((format_network(bits, route_domain, value, length), data)
+                     for (value, length), data in iteritems(networks))
+    return index
+
+
+def dump_records(index, separator=':='):
+    """Return an index of records as the content of a data-group file."""
+    lines = list()
+    for name, data in sorted(iteritems(index)):
+        name = '"{0}"'.format(name.replace('\\', '\\\\').replace('"', '\\"'))
+        if data:
+            lines.append('{0} {1} "{2}",\n'.format(name, separator, data.replace('\\', '\\\\').replace('"', '\\"')))
+        else:
+            lines.append(name + ',\n')
+    return ''.join(lines)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Long-running BIG-IP operations.
+
+The iControl REST task API (/mgmt/tm/task/...) runs a command in the background on the BIG-IP: the task is created,
+started, then polled until it completes, so that no request has to stay open while the command runs.
+"""
+
+import time
+
+from requests.exceptions import RequestException
+
+from ansible_common_f5.base import AnsibleF5Error
+
+TASK_FINAL_STATES = ['COMPLETED', 'FAILED']
+
+
+def poll(check, timeout, interval=1.0, max_interval=30.0, message='Timed out.'):
+    """Call check until it returns something else than None, waiting twice as long after each call.
+
+    Raise an AnsibleF5Error with the given message when the timeout, in seconds, expires.
+    """
+    deadline = time.time() + timeout
+    while True:
+        value = check()
+        if value is not None:
+            return value
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise AnsibleF5Error(message)
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+
+class F5BigIpTask(object):
+    """Task of the iControl REST task API, such as task/sys/ucs or task/sys/config, run by a F5BigIpRestObject."""
+
+    def __init__(self, rest_obj, path, task_id=None):
+        self._rest_obj = rest_obj
+        self._path = 'task/' + path.strip('/')
+        self.id = task_id
+        # States the task went through, as seen while polling
+        self.states = list()
+
+    @property
+    def _task_path(self):
+        return '{0}/{1}'.format(self._path, self.id)
+
+    def start(self, **payload):
+        """Create the task with the given command and attributes, then start it."""
+        task = self._rest_obj._request('POST', self._path, json=payload)
+        self.id = task['_taskId']
+        self._rest_obj._request('PUT', self._task_path, json=dict(_taskState='VALIDATING'))
+        return self.id
+
+    def status(self):
+        """Return the task as read from the BIG-IP, or None when it does not exist."""
+        return self._rest_obj._get(self._task_path)
+
+    def wait(self, timeout, interval=1.0, max_interval=30.0):
+        """Poll the task until it is over, return it once completed, raise an AnsibleF5Error when it failed."""
+        def check():
+            try:
+                task = self.status()
+            except (AnsibleF5Error, RequestException):
+                # restjavad may be too busy to answer while the command runs
+                return None
+            if task is None:
+                raise AnsibleF5Error("The task {0} does not exist.".format(self.id))
+            if task.get('_taskState') and task['_taskState'] not in self.states[-1:]:
+                self.states.append(task['_taskState'])
+            return task if task.get('_taskState') in TASK_FINAL_STATES else None
+
+        task = poll(check, timeout, interval, max_interval,
+                    message="The task {0} did not complete within {1} seconds; it is kept, see /mgmt/tm/{2}.".format(
+                        self.id, timeout, self._task_path))
+        if task['_taskState'] == 'FAILED':
+            raise AnsibleF5Error("The task {0} failed: {1}".format(
+                self.id, task.get('errorMessage') or task.get('_taskResultMessage') or task.get('message', '')))
+        return task
+
+    def run(self, timeout, interval=1.0, max_interval=30.0):
+        """Wait for the task, then delete it unless it timed out while still running."""
+        try:
+            return self.wait(timeout, interval, max_interval)
+        finally:
+            if self.states[-1:] and self.states[-1] in TASK_FINAL_STATES:
+                self.delete()
+
+    def delete(self):
+        """Delete the task, once over, ignoring the errors."""
+        try:
+            self._rest_obj._request('DELETE', self._task_path)
+        except (AnsibleF5Error, RequestException):
+            pass
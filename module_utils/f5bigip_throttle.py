@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bandwidth limit shared by the file transfers running on the controller.
+
+Every module process books its transfers in a schedule file: each block of bytes is given the time at which it may be
+transferred, right after the blocks booked before it by any process. Since the file is locked while it is updated, the
+transfers to all the BIG-IPs, run by as many forks as Ansible likes, never exceed the limit together.
+"""
+
+import fcntl
+import os
+import threading
+import time
+
+SCHEDULE_PATH = os.path.join(os.path.expanduser('~'), '.ansible', 'f5bigip', 'bandwidth')
+
+
+class F5BandwidthLimiter(object):
+    def __init__(self, rate, path=SCHEDULE_PATH):
+        """Limit the transfers to rate bytes per second, no limit when rate is None or 0."""
+        self._rate = float(rate or 0)
+        self._path = path
+        self._lock = threading.Lock()
+
+    def consume(self, size):
+        """Wait until size bytes may be transferred."""
+        if not self._rate:
+            return
+
+        with self._lock:
+            directory = os.path.dirname(self._path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory, 0o700)
+            fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    booked = float(os.read(fd, 64) or 0)
+                except ValueError:
+                    booked = 0.0
+                now = time.time()
+                start = max(now, booked)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, repr(start + size / self._rate).encode('ascii'))
+            finally:
+                os.close(fd)
+
+        if start > now:
+            time.sleep(start - now)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Token-based authentication against the iControl REST API.
+
+Tokens are obtained from /mgmt/shared/authn/login and cached on the controller, one file per BIG-IP and credentials,
+so that the (possibly remote) authentication only happens once for all the tasks of a playbook. A cached token is
+extended before it times out and replaced when the BIG-IP rejects it.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import time
+
+from requests.auth import AuthBase
+
+from ansible.module_utils.urls import open_url
+
+TOKEN_DIR = os.path.join(os.path.expanduser('~'), '.ansible', 'f5bigip', 'tokens')
+TOKEN_HEADER = 'X-F5-Auth-Token'
+
+# Lifetime, in seconds, requested for the tokens (the BIG-IP maximum is 36000)
+TOKEN_TIMEOUT = 3600
+
+# Refresh margin, in seconds, before the token expires on the BIG-IP
+TOKEN_REFRESH_MARGIN = 60
+
+# Timeout of the login requests, in seconds
+LOGIN_TIMEOUT = 30
+
+
+def _request(method, url, data=None, token=None, verify=False, session=None, timeout=LOGIN_TIMEOUT):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers[TOKEN_HEADER] = token
+    if session is not None:
+        resp = session.request(method, url, data=json.dumps(data), headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        return resp.json()
+    resp = open_url(url, data=json.dumps(data), headers=headers, method=method, validate_certs=verify, timeout=timeout)
+    return json.loads(resp.read())
+
+
+def login(base_url, username, password, provider=None, verify=False, session=None, request_timeout=LOGIN_TIMEOUT):
+    """Log in and return the new token with its expiration time."""
+    resp = _request('POST', base_url + '/mgmt/shared/authn/login',
+                    data=dict(username=username, password=password, loginProviderName=provider or 'tmos'),
+                    verify=verify, session=session, timeout=request_timeout)
+    return resp['token']['token'], time.time() + int(resp['token'].get('timeout', 1200))
+
+
+def extend(base_url, token, timeout=TOKEN_TIMEOUT, verify=False, session=None, request_timeout=LOGIN_TIMEOUT):
+    """Extend the lifetime of a token and return its new expiration time."""
+    resp = _request('PATCH', base_url + '/mgmt/shared/authz/tokens/' + token,
+                    data=dict(timeout=timeout), token=token, verify=verify, session=session, timeout=request_timeout)
+    return time.time() + int(resp.get('timeout', timeout))
+
+
+class F5TokenCache(object):
+    """On-disk token cache of a BIG-IP, keyed by its URL and the credentials."""
+
+    def __init__(self, base_url, username, password, provider=None, verify=False, timeout=None):
+        self._base_url = base_url
+        self._username = username
+        self._password = password
+        self._provider = provider
+        self._verify = verify
+        self._timeout = timeout or LOGIN_TIMEOUT
+        key = '\0'.join([base_url, username or '', password or '', provider or ''])
+        self._path = os.path.join(TOKEN_DIR, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _load(self):
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _save(self, token, expires):
+        tmp_path = '{0}.{1}'.format(self._path, os.getpid())
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(dict(token=token, expires=expires), f)
+        os.rename(tmp_path, self._path)
+
+    def get(self, renew=False):
+        """Return a valid token, extending or replacing the cached one when needed."""
+        if not os.path.isdir(TOKEN_DIR):
+            os.makedirs(TOKEN_DIR, 0o700)
+
+        # Serialize the refreshes of concurrent module invocations
+        with open(self._path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            cached = None if renew else self._load()
+            now = time.time()
+            if cached and cached['expires'] - TOKEN_REFRESH_MARGIN > now:
+                return cached['token']
+            if cached and cached['expires'] > now:
+                try:
+                    expires = extend(self._base_url, cached['token'], verify=self._verify,
+                                     request_timeout=self._timeout)
+                    self._save(cached['token'], expires)
+                    return cached['token']
+                except Exception:
+                    pass
+            token, expires = login(self._base_url, self._username, self._password, self._provider, self._verify,
+                                   request_timeout=self._timeout)
+            try:
+                expires = extend(self._base_url, token, verify=self._verify, request_timeout=self._timeout)
+            except Exception:
+                pass
+            self._save(token, expires)
+            return token
+
+    def invalidate(self):
+        try:
+            os.unlink(self._path)
+        except OSError:
+            pass
+
+
+class F5TokenAuth(AuthBase):
+    """requests authentication handler sending the cached token instead of the credentials."""
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def __call__(self, request):
+        request.headers[TOKEN_HEADER] = self._cache.get()
+        request.register_hook('response', self._handle_401)
+        return request
+
+    def _handle_401(self, response, **kwargs):
+        if response.status_code != 401 or getattr(response.request, '_f5_token_retry', False):
+            return response
+
+        # The token was revoked on the BIG-IP, get a new one and resend the request once
+        self._cache.invalidate()
+        response.content
+        response.close()
+        request = response.request.copy()
+        request.headers[TOKEN_HEADER] = self._cache.get(renew=True)
+        request._f5_token_retry = True
+        retry = response.connection.send(request, **kwargs)
+        retry.history.append(response)
+        retry.request = request
+        return retry
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""File downloads from the BIG-IP file-transfer workers (/mgmt/shared/file-transfer/...).
+
+The file is streamed to a temporary file next to the download path, one range at a time, then renamed once its
+checksum is verified. An interrupted download resumes from the end of the temporary file.
+"""
+
+import hashlib
+import os
+import time
+
+from requests.exceptions import RequestException
+
+from ansible.module_utils.f5bigip_throttle import F5BandwidthLimiter
+from ansible_common_f5.base import AnsibleF5Error
+
+CHUNK_SIZE = 1048576
+
+# Size of the blocks read from the responses and from the downloaded file
+BLOCK_SIZE = 65536
+
+
+def get_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class F5BigIpDownloadMixin(object):
+    """Downloads for the F5BigIpRestObject modules, tuned by their chunk_size, retries and bandwidth_limit params."""
+
+    def _fetch(self, f, url, start, end, size, limiter):
+        """Append the bytes from start to end to the file, retrying on connection errors and server errors."""
+        headers = {
+            'Range': 'bytes={0}-{1}'.format(start, end - 1),
+            # Header expected by the file-transfer workers
+            'Content-Range': '{0}-{1}/{2}'.format(start, end - 1, size)
+        }
+        retries = max(self._params.get('retries') or 0, 0)
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(min(2 ** attempt, 30))
+                f.seek(start)
+                f.truncate()
+            resp = None
+            try:
+                resp = self._session.get(url, headers=headers, stream=True, timeout=300)
+                if resp.status_code >= 400:
+                    error = '{0} {1}'.format(resp.status_code, resp.reason)
+                    if resp.status_code < 500:
+                        break
+                    continue
+                content_range = resp.headers.get('Content-Range', '')
+                if start and not content_range.replace('bytes ', '').startswith('{0}-'.format(start)):
+                    raise AnsibleF5Error("The BIG-IP did not send the requested range of '{0}'.".format(url))
+                for block in resp.iter_content(BLOCK_SIZE):
+                    limiter.consume(len(block))
+                    f.write(block)
+                if f.tell() != end:
+                    raise RequestException("received {0} bytes out of {1}".format(f.tell() - start, end - start))
+                return
+            except RequestException as exc:
+                error = str(exc)
+            finally:
+                # Release the connection before the next attempt
+                if resp is not None:
+                    resp.close()
+        raise AnsibleF5Error("Unable to download bytes {0} to {1} of {2}: {3}. The download resumes from byte {0} "
+                             "on the next run.".format(start, end, size, error))
+
+    def _fetch_all(self, url, path, offset, size, limiter):
+        chunk_size = max(self._params.get('chunk_size') or CHUNK_SIZE, 1)
+        with open(path, 'r+b' if offset else 'wb') as f:
+            f.seek(offset)
+            f.truncate()
+            for start in range(offset, size, chunk_size):
+                self._fetch(f, url, start, min(start + chunk_size, size), size, limiter)
+
+    def _download(self, uri, remote_path, download_path, checksum=None):
+        """Download the file at remote_path on the BIG-IP, served at uri, return its size, checksum and resume offset.
+
+        The checksum of the file is computed on the BIG-IP, unless it is given. Nothing is downloaded when the file at
+        download_path already has the same size and checksum, or in check mode.
+        """
+        size, remote_checksum = self._stat_file(remote_path)
+        if size is None:
+            raise AnsibleF5Error("The file '{0}' does not exist.".format(remote_path))
+        checksum = checksum or remote_checksum
+
+        if (os.path.isfile(download_path) and os.path.getsize(download_path) == size and
+                get_checksum(download_path) == checksum):
+            return dict(changed=False, size=size, checksum=checksum)
+        if self._check_mode:
+            return dict(changed=True, size=size, checksum=checksum)
+
+        url = self._url(uri)
+        part_path = download_path + '.part'
+        offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+        if offset > size:
+            offset = 0
+        limiter = F5BandwidthLimiter(self._params.get('bandwidth_limit'))
+
+        self._fetch_all(url, part_path, offset, size, limiter)
+        if offset and get_checksum(part_path) != checksum:
+            # The bytes downloaded before were not those of this file
+            offset = 0
+            self._fetch_all(url, part_path, offset, size, limiter)
+        if get_checksum(part_path) != checksum:
+            os.remove(part_path)
+            raise AnsibleF5Error("The checksum of the downloaded file '{0}' does not match.".format(remote_path))
+        os.rename(part_path, download_path)
+
+        return dict(changed=True, size=size, checksum=checksum, resumed_from=offset)
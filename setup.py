@@ -27,6 +27,7 @@ setup(
     author='Eric Jacob',
     author_email='erjac77@gmail.com',
     url='https://github.com/erjac77/ansible-module-f5bigip',
+    # module_utils is not a Python package: Ansible loads it from the role, see the README
     packages=['library'],
     keywords=['ansible', 'f5', 'bigip', 'big-ip', 'networking'],
     classifiers=[
@@ -0,0 +1,919 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2018, Eric Jacob <erjac77@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local stand-in for the iControl REST API of a BIG-IP, to run the test playbooks without a BIG-IP.
+
+The objects created through the API are kept in memory, so that the modules can create, read, modify and delete them
+as they would on a BIG-IP: collections and subcollections (with paging, $select, $filter and expandSubcollections),
+commands (exec_cmd), transactions, the task API, the file-transfer workers and the stats of the objects. Commands run
+with util/bash fail with a 501 unless --host-bash is given: they then run on this host, as the user of the server,
+from the sandbox directory given by --root, and are not confined to it.
+
+The latency of the responses, the rate of the errors and the number of objects created at startup can be set, so that
+the modules can be benchmarked on any Linux box:
+
+    python mock_bigip.py --port 21444 --latency 20 --virtuals 20000 --pools 20000 --members 2
+    ansible-playbook -i hosts_mock playbooks/site_ltm.yml
+
+The settings can be changed while the server runs (PATCH /mock/config with any of latency, jitter, error_rate,
+error_status, error_paths and task_duration), the number of requests served is returned by GET /mock/stats and
+POST /mock/reset drops all the objects and creates the initial ones again. These endpoints take the credentials of the
+API as well.
+
+Each collection of CATALOG, with its objects and their subcollections, has a lock of its own, so that the requests on
+other collections are served concurrently.
+"""
+
+import argparse
+import base64
+import copy
+import hashlib
+import json
+import os
+import random
+import re
+import shlex
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, quote, unquote, urlsplit
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import quote, unquote
+    from urlparse import parse_qs, urlsplit
+
+VERSION = '12.1.2'
+
+# Collections of named objects, under /mgmt
+CATALOG = set([
+    'tm/auth/partition', 'tm/auth/user', 'tm/cm/device', 'tm/cm/device-group', 'tm/cm/traffic-group',
+    'tm/gtm/datacenter', 'tm/gtm/listener', 'tm/gtm/monitor/bigip', 'tm/gtm/monitor/ftp', 'tm/gtm/monitor/gateway-icmp',
+    'tm/gtm/monitor/http', 'tm/gtm/monitor/https', 'tm/gtm/monitor/tcp', 'tm/gtm/monitor/udp', 'tm/gtm/pool/a',
+    'tm/gtm/region', 'tm/gtm/rule', 'tm/gtm/server', 'tm/gtm/topology', 'tm/gtm/wideip/a',
+    'tm/ltm/auth/crldp-server', 'tm/ltm/auth/ocsp-responder', 'tm/ltm/auth/ssl-cc-ldap', 'tm/ltm/auth/ssl-crldp',
+    'tm/ltm/auth/ssl-ocsp', 'tm/ltm/data-group/external', 'tm/ltm/data-group/internal', 'tm/ltm/ifile',
+    'tm/ltm/monitor/diameter', 'tm/ltm/monitor/dns', 'tm/ltm/monitor/external', 'tm/ltm/monitor/firepass',
+    'tm/ltm/monitor/ftp', 'tm/ltm/monitor/gateway-icmp', 'tm/ltm/monitor/http', 'tm/ltm/monitor/https',
+    'tm/ltm/monitor/imap', 'tm/ltm/monitor/inband', 'tm/ltm/monitor/ldap', 'tm/ltm/monitor/mssql',
+    'tm/ltm/monitor/mysql', 'tm/ltm/monitor/nntp', 'tm/ltm/monitor/oracle', 'tm/ltm/monitor/pop3',
+    'tm/ltm/monitor/postgresql', 'tm/ltm/monitor/radius', 'tm/ltm/monitor/radius-accounting',
+    'tm/ltm/monitor/real-server', 'tm/ltm/monitor/rpc', 'tm/ltm/monitor/sasp', 'tm/ltm/monitor/scripted',
+    'tm/ltm/monitor/sip', 'tm/ltm/monitor/smb', 'tm/ltm/monitor/smtp', 'tm/ltm/monitor/snmp-dca',
+    'tm/ltm/monitor/snmp-dca-base', 'tm/ltm/monitor/soap', 'tm/ltm/monitor/tcp', 'tm/ltm/monitor/tcp-echo',
+    'tm/ltm/monitor/tcp-half-open', 'tm/ltm/monitor/udp', 'tm/ltm/monitor/virtual-location', 'tm/ltm/monitor/wap',
+    'tm/ltm/monitor/wmi', 'tm/ltm/nat', 'tm/ltm/node', 'tm/ltm/persistence/cookie', 'tm/ltm/persistence/dest-addr',
+    'tm/ltm/persistence/hash', 'tm/ltm/persistence/msrdp', 'tm/ltm/persistence/sip', 'tm/ltm/persistence/source-addr',
+    'tm/ltm/persistence/ssl', 'tm/ltm/persistence/universal', 'tm/ltm/policy', 'tm/ltm/pool',
+    'tm/ltm/profile/certificate-authority', 'tm/ltm/profile/client-ldap', 'tm/ltm/profile/client-ssl',
+    'tm/ltm/profile/dhcpv4', 'tm/ltm/profile/dhcpv6', 'tm/ltm/profile/diameter', 'tm/ltm/profile/dns',
+    'tm/ltm/profile/fasthttp', 'tm/ltm/profile/fastl4', 'tm/ltm/profile/fix', 'tm/ltm/profile/ftp',
+    'tm/ltm/profile/gtp', 'tm/ltm/profile/html', 'tm/ltm/profile/http', 'tm/ltm/profile/http-compression',
+    'tm/ltm/profile/http2', 'tm/ltm/profile/icap', 'tm/ltm/profile/iiop', 'tm/ltm/profile/ipother',
+    'tm/ltm/profile/mblb', 'tm/ltm/profile/mssql', 'tm/ltm/profile/ntlm', 'tm/ltm/profile/ocsp-stapling-params',
+    'tm/ltm/profile/one-connect', 'tm/ltm/profile/pptp', 'tm/ltm/profile/qoe', 'tm/ltm/profile/radius',
+    'tm/ltm/profile/request-adapt', 'tm/ltm/profile/request-log', 'tm/ltm/profile/response-adapt',
+    'tm/ltm/profile/rewrite', 'tm/ltm/profile/rtsp', 'tm/ltm/profile/sctp', 'tm/ltm/profile/server-ldap',
+    'tm/ltm/profile/server-ssl', 'tm/ltm/profile/sip', 'tm/ltm/profile/smtps', 'tm/ltm/profile/spdy',
+    'tm/ltm/profile/statistics', 'tm/ltm/profile/stream', 'tm/ltm/profile/tcp', 'tm/ltm/profile/tftp',
+    'tm/ltm/profile/udp', 'tm/ltm/profile/web-acceleration', 'tm/ltm/profile/xml', 'tm/ltm/rule', 'tm/ltm/snat',
+    'tm/ltm/snat-translation', 'tm/ltm/snatpool', 'tm/ltm/traffic-class', 'tm/ltm/virtual', 'tm/ltm/virtual-address',
+    'tm/net/arp', 'tm/net/dns-resolver', 'tm/net/interface', 'tm/net/route', 'tm/net/route-domain', 'tm/net/self',
+    'tm/net/trunk', 'tm/net/tunnels/gre', 'tm/net/tunnels/vxlan', 'tm/net/vlan', 'tm/sys/application/service',
+    'tm/sys/crypto/cert', 'tm/sys/crypto/key', 'tm/sys/db', 'tm/sys/file/data-group', 'tm/sys/file/ifile',
+    'tm/sys/file/ssl-cert', 'tm/sys/file/ssl-key', 'tm/sys/folder', 'tm/sys/management-ip',
+    'tm/sys/management-route', 'tm/sys/provision', 'tm/sys/software/image', 'tm/vcmp/guest'
+])
+
+# Collections of CATALOG, the most specific first, to find the collection of a path
+CATALOG_BY_LENGTH = sorted(CATALOG, key=len, reverse=True)
+
+# Collections whose objects all exist, such as the sys db variables
+PRESET_COLLECTIONS = ['/mgmt/tm/sys/db']
+
+# Attributes holding the objects of a subcollection, when given as a list of dicts
+SUBCOLLECTION_KEYS = ['actions', 'conditions', 'members', 'profiles', 'rules']
+
+# Directories of the sandbox, by file-transfer worker
+TRANSFER_DIRS = {
+    'uploads': 'var/config/rest/downloads',
+    'madm': 'var/config/rest/madm',
+    'ucs-downloads': 'var/local/ucs'
+}
+
+SANDBOX_DIRS = ['config', 'shared/images', 'var/config/rest/downloads', 'var/config/rest/madm', 'var/local/scf',
+                'var/local/ucs', 'var/tmp']
+
+AUTHORIZATION_FAILED = "Authorization failed: no user authentication header or token detected."
+
+COUNTERS = ['bitsIn', 'bitsOut', 'curConns', 'maxConns', 'pktsIn', 'pktsOut', 'totConns']
+
+PERFORMANCE_REPORT = """
+Sys::Performance System
+-----------------------------------------------------------------------
+System CPU Usage(%)  Current  3 hrs  24 hrs  7 days  30 days
+-----------------------------------------------------------------------
+Utilization                3      3       2       2        2
+
+-----------------------------------------------------------------------
+Memory Used(%)       Current  3 hrs  24 hrs  7 days  30 days
+-----------------------------------------------------------------------
+TMM Memory Used           10     10      10      10       10
+Other Memory Used         61     61      61      60       60
+Swap Used                  0      0       0       0        0
+
+Sys::Performance Connections
+-----------------------------------------------------------------------
+Active Connections   Current  3 hrs  24 hrs  7 days  30 days
+-----------------------------------------------------------------------
+Connections             1.2K   1.1K    1.0K     980      950
+
+Sys::Performance Throughput
+-----------------------------------------------------------------------
+Throughput(bits)(bits/sec)  Current  3 hrs  24 hrs  7 days  30 days
+-----------------------------------------------------------------------
+Service                       18.0M  19.1M   18.6M   18.4M    17.9M
+In                             9.5M  10.1M    9.9M    9.8M     9.5M
+Out                            8.5M   9.0M    8.7M    8.6M     8.4M
+
+Sys::Performance Ramcache
+-----------------------------------------------------------------------
+RAM Cache Utilization(%)  Current  3 hrs  24 hrs  7 days  30 days
+-----------------------------------------------------------------------
+Hit Rate                        0      0       0       0        0
+"""
+
+
+class MockError(Exception):
+    def __init__(self, status, message):
+        super(MockError, self).__init__(message)
+        self.status = status
+
+
+def parent_of(path):
+    return path.rsplit('/', 1)[0]
+
+
+def object_id(body):
+    """Return the last segment of the path of an object created with the given attributes."""
+    if not body.get('name'):
+        raise MockError(400, "The name of the object is missing.")
+    name = str(body['name'])
+    if body.get('partition'):
+        if body.get('subPath'):
+            return '~{0}~{1}~{2}'.format(body['partition'], body['subPath'], name)
+        return '~{0}~{1}'.format(body['partition'], name)
+    # Names given with their full path, such as /Common/my_pool
+    return name.replace('/', '~') if name.startswith('/') else name
+
+
+def full_path(obj_id):
+    return obj_id.replace('~', '/') if obj_id.startswith('~') else obj_id
+
+
+def kind_of(path, suffix='state'):
+    """Return the kind of the objects of a collection, such as tm:ltm:pool:poolstate."""
+    segments = path.split('/')[2:]
+    # The names of the objects, such as ~Common~my_policy in ltm/policy/~Common~my_policy/rules, are left out
+    segments = [s for i, s in enumerate(segments)
+                if not s.startswith('~') and segments[i + 1:i + 2] not in [[key] for key in SUBCOLLECTION_KEYS]]
+    return ':'.join(segments) + ':' + segments[-1] + suffix
+
+
+def self_link(path, query=''):
+    return 'https://localhost{0}?{1}ver={2}'.format(quote(path), query + '&' if query else '', VERSION)
+
+
+def counters(name, elapsed):
+    """Return counters increasing at steady rates of their own, derived from the name of the object."""
+    seed = zlib.crc32(name.encode('utf-8')) & 0xffffffff
+    return [int(((seed * (i + 1) * 2654435761) % 1000 + 1) * elapsed) for i in range(len(COUNTERS) * 2)]
+
+
+class MockBigIp(object):
+    """State of the stand-in BIG-IP: its objects, transactions, tasks and tokens."""
+
+    def __init__(self, args):
+        self.args = args
+        self.config = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                           error_status=args.error_status, error_paths=args.error_paths,
+                           task_duration=args.task_duration)
+        # Lock of the transactions, tasks, tokens, counters and settings, taken after the locks of the collections
+        self.lock = threading.RLock()
+        # Locks of the collections, by lock_key
+        self.locks = dict()
+        self.started = time.time()
+        self.root = args.root
+        self.requests = dict()
+        self.reset()
+
+    # Locks
+
+    @staticmethod
+    def lock_key(path):
+        """Return the path of the collection of CATALOG holding a path, or the path itself."""
+        relative = path[len('/mgmt/'):]
+        for coll in CATALOG_BY_LENGTH:
+            if relative == coll or relative.startswith(coll + '/'):
+                return '/mgmt/' + coll
+        return path
+
+    @contextmanager
+    def locked(self, paths):
+        """Hold the locks of the collections of the paths, always taken in the same order."""
+        with self.lock:
+            locks = [self.locks.setdefault(key, threading.RLock())
+                     for key in sorted(set(self.lock_key(path) for path in paths))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def next_generation(self):
+        with self.lock:
+            self.generation += 1
+            return self.generation
+
+    # Objects
+
+    def reset(self):
+        with self.locked(list(self.locks)), self.lock:
+            # Objects by collection path, then by ID
+            self.collections = dict()
+            # Unnamed resources modified, such as sys/global-settings
+            self.resources = dict()
+            self.generation = 1
+            self.transactions = dict()
+            self.tasks = dict()
+            self.tokens = dict()
+            self._seed()
+
+    def _seed(self):
+        args = self.args
+        for i in range(args.nodes):
+            self.create('/mgmt/tm/ltm/node', dict(name='node{0}'.format(i), partition=args.partition,
+                                                  address='10.{0}.{1}.{2}'.format(i // 65536, i // 256 % 256, i % 256)))
+        for i in range(args.pools):
+            members = [dict(name='10.{0}.{1}.{2}:{3}'.format(i // 65536, i // 256 % 256, i % 256, 80 + j),
+                            partition=args.partition) for j in range(args.members)]
+            self.create('/mgmt/tm/ltm/pool', dict(name='pool{0}'.format(i), partition=args.partition,
+                                                  members=members, loadBalancingMode='round-robin'))
+        for i in range(args.virtuals):
+            virtual = dict(name='virtual{0}'.format(i), partition=args.partition,
+                           destination='/{0}/172.{1}.{2}.{3}:80'.format(args.partition, 16 + i // 65536,
+                                                                        i // 256 % 256, i % 256),
+                           profiles=[dict(name='http', partition='Common'), dict(name='tcp', partition='Common')])
+            if i < args.pools:
+                virtual['pool'] = '/{0}/pool{1}'.format(args.partition, i)
+            self.create('/mgmt/tm/ltm/virtual', virtual)
+
+    def is_collection(self, path):
+        return (path[len('/mgmt/'):] in CATALOG or path in self.collections or
+                self.find(path) is None and self.find(parent_of(path)) is not None)
+
+    def is_resource(self, path):
+        """Return whether the path is that of an unnamed resource, such as sys/global-settings or a sys/db variable.
+
+        The unnamed resources always exist.
+        """
+        parent = parent_of(path)
+        return parent in PRESET_COLLECTIONS or '~' not in path.rsplit('/', 1)[1] and not self.is_collection(parent)
+
+    def find(self, path):
+        coll, _, obj_id = path.rpartition('/')
+        return self.collections.get(coll, dict()).get(obj_id)
+
+    def _store(self, path, body):
+        """Store the attributes of an object, and the objects of its subcollections."""
+        obj = OrderedDict()
+        subs = list()
+        for key, value in body.items():
+            if key in SUBCOLLECTION_KEYS and isinstance(value, list) and all(isinstance(v, dict) for v in value):
+                subs.append(key)
+                self.collections[path + '/' + key] = OrderedDict()
+                for item in value:
+                    self.create(path + '/' + key, item)
+            elif key not in ['kind', 'selfLink', 'generation'] and not key.endswith('Reference'):
+                obj[key] = value
+        obj['_subs'] = subs
+        return obj
+
+    def _drop(self, path):
+        for coll in [c for c in list(self.collections) if c == path or c.startswith(path + '/')]:
+            self.collections.pop(coll, None)
+
+    def create(self, coll, body):
+        obj_id = object_id(body)
+        path = coll + '/' + obj_id
+        if self.find(path) is not None:
+            raise MockError(409, "01020066:3: The requested {0} ({1}) already exists.".format(
+                coll.rsplit('/', 1)[1], full_path(obj_id)))
+        generation = self.next_generation()
+        obj = self._store(path, body)
+        obj['fullPath'] = full_path(obj_id)
+        obj['generation'] = generation
+        self.collections.setdefault(coll, OrderedDict())[obj_id] = obj
+        return path
+
+    def update(self, path, body, replace=False):
+        current = self.find(path)
+        if current is None:
+            raise MockError(404, "01020036:3: The requested object ({0}) was not found.".format(path))
+        generation = self.next_generation()
+        if replace:
+            self._drop(path)
+            attributes = dict(body, name=current['name'])
+            if 'partition' in current:
+                attributes['partition'] = current['partition']
+            kept = list()
+        else:
+            for key in body:
+                if key in current['_subs']:
+                    self._drop(path + '/' + key)
+            attributes = dict((k, v) for k, v in current.items() if k not in ['_subs', 'fullPath', 'generation'])
+            attributes.update(body)
+            kept = [key for key in current['_subs'] if key not in body]
+        obj = self._store(path, attributes)
+        obj['_subs'] = sorted(set(obj['_subs'] + kept))
+        obj['fullPath'] = current['fullPath']
+        obj['generation'] = generation
+        self.collections[parent_of(path)][path.rsplit('/', 1)[1]] = obj
+        return path
+
+    def delete(self, path):
+        coll, _, obj_id = path.rpartition('/')
+        if self.find(path) is None:
+            raise MockError(404, "01020036:3: The requested object ({0}) was not found.".format(path))
+        self.next_generation()
+        del self.collections[coll][obj_id]
+        self._drop(path)
+
+    def render(self, path, obj, expand=False, select=None):
+        result = OrderedDict(kind=kind_of(parent_of(path)))
+        for key, value in obj.items():
+            if key != '_subs' and (not select or key in select):
+                result[key] = value
+        result['selfLink'] = self_link(path)
+        for key in obj['_subs']:
+            if select and key not in select:
+                continue
+            reference = dict(link=self_link(path + '/' + key), isSubcollection=True)
+            if expand:
+                reference['items'] = [self.render(path + '/' + key + '/' + i, o, expand)
+                                      for i, o in self.collections.get(path + '/' + key, dict()).items()]
+            result[key + 'Reference'] = reference
+        return result
+
+    def listing(self, path, query):
+        """Return a page of a collection."""
+        items = list(self.collections.get(path, dict()).items())
+        match = re.match(r'^partition\s+eq\s+(\S+)$', (query.get('$filter') or '').strip())
+        if match:
+            items = [(i, o) for i, o in items if o.get('partition') == match.group(1)]
+        expand = query.get('expandSubcollections') == 'true'
+        select = set(query['$select'].split(',')) if query.get('$select') else None
+        result = OrderedDict(kind=kind_of(path, 'collectionstate'), selfLink=self_link(path))
+        skip = int(query.get('$skip') or 0)
+        top = int(query['$top']) if query.get('$top') else None
+        if top is not None:
+            page = items[skip:skip + top]
+            result.update(currentItemCount=len(page), itemsPerPage=top, pageIndex=skip // max(top, 1) + 1,
+                          startIndex=skip + 1, totalItems=len(items), totalPages=(len(items) + top - 1) // max(top, 1))
+            if skip + top < len(items):
+                result['nextLink'] = self_link(path, '$top={0}&$skip={1}'.format(top, skip + top))
+        else:
+            page = items[skip:]
+        result['items'] = [self.render(path + '/' + i, o, expand, select) for i, o in page]
+        return result
+
+    # Stats
+
+    def _stats_entry(self, path, obj):
+        elapsed = time.time() - self.started
+        name = obj.get('fullPath') or obj.get('name')
+        entries = dict(tmName=dict(description=name))
+        keys = ['{0}.{1}'.format(side, key) for side in ['clientside', 'serverside'] for key in COUNTERS]
+        entries.update((key, dict(value=value)) for key, value in zip(keys, counters(path, elapsed)))
+        if '/members/' in path:
+            pool = full_path(path.split('/')[-3])
+            address, _, port = name.rpartition(':')
+            entries.update(poolName=dict(description=pool), nodeName=dict(description=address),
+                           port=dict(value=int(port) if port.isdigit() else 0),
+                           addr=dict(description=address.rsplit('/', 1)[-1]))
+        return dict(nestedStats=dict(entries=entries))
+
+    def stats(self, path):
+        base = path[:-len('/stats')]
+        if base == '/mgmt/tm/ltm/pool/members':
+            # Members of all the pools
+            objects = [(coll + '/' + i, o) for coll in list(self.collections)
+                       if coll.startswith('/mgmt/tm/ltm/pool/') and coll.endswith('/members')
+                       for i, o in list(self.collections.get(coll, dict()).items())]
+        elif self.find(base) is not None:
+            objects = [(base, self.find(base))]
+        else:
+            objects = [(base + '/' + i, o) for i, o in self.collections.get(base, dict()).items()]
+        entries = OrderedDict()
+        for obj_path, obj in objects:
+            entries[self_link(obj_path + '/stats').split('?')[0]] = self._stats_entry(obj_path, obj)
+        return dict(kind=kind_of(base, 'stats'), selfLink=self_link(path), entries=entries)
+
+    @staticmethod
+    def nested_stats(path, **descriptions):
+        entries = dict((k, dict(description=v)) for k, v in descriptions.items())
+        return dict(kind=kind_of(path, 'stats'), selfLink=self_link(path),
+                    entries={'https://localhost{0}/0'.format(path): dict(nestedStats=dict(entries=entries))})
+
+    # Commands
+
+    def sandbox(self, path):
+        """Return the path of a BIG-IP file in the sandbox."""
+        path = os.path.normpath('/' + path.lstrip('/'))
+        return os.path.join(self.root, path.lstrip('/'))
+
+    def command(self, path, body):
+        """Run a command (exec_cmd) and return its result."""
+        command = body.get('command')
+        result = dict(body, kind=kind_of(path, 'runstate') if command == 'run' else kind_of(path))
+        if path == '/mgmt/tm/util/bash' and command == 'run':
+            output = self.bash(body.get('utilCmdArgs') or '')
+            if output:
+                result['commandResult'] = output
+        elif path == '/mgmt/tm/util/unix-mv':
+            source, dest = (body.get('utilCmdArgs') or '').split()[-2:]
+            shutil.move(self.sandbox(source), self.sandbox(dest))
+        elif path == '/mgmt/tm/util/unix-rm':
+            target = self.sandbox((body.get('utilCmdArgs') or '').split()[-1])
+            if os.path.isfile(target):
+                os.remove(target)
+        elif path == '/mgmt/tm/sys/ucs' and command == 'save':
+            name = body['name'] if body['name'].endswith('.ucs') else body['name'] + '.ucs'
+            with open(self.sandbox('/var/local/ucs/' + name), 'wb') as f:
+                f.write(os.urandom(self.args.ucs_size))
+        elif path == '/mgmt/tm/sys/config' and command == 'load':
+            self.next_generation()
+        elif path == '/mgmt/tm/ltm/policy' and command == 'publish':
+            name = body.get('name', '').strip('/').split('/')
+            draft = '/mgmt/tm/ltm/policy/~' + '~'.join(name)
+            published = '/mgmt/tm/ltm/policy/~{0}~{1}'.format(name[0], name[-1])
+            obj = self.find(draft)
+            if obj is None:
+                raise MockError(404, "The draft policy {0} was not found.".format(body.get('name')))
+            if self.find(published) is not None:
+                self.delete(published)
+            attributes = self.render(draft, obj, expand=True)
+            attributes.pop('subPath', None)
+            self.create('/mgmt/tm/ltm/policy', self._unexpand(attributes))
+            self.delete(draft)
+        return result
+
+    def _unexpand(self, attributes):
+        """Turn the expanded subcollections of a rendered object back into lists."""
+        result = dict()
+        for key, value in attributes.items():
+            if key.endswith('Reference') and isinstance(value, dict) and 'items' in value:
+                result[key[:-len('Reference')]] = [self._unexpand(item) for item in value['items']]
+            elif not key.endswith('Reference'):
+                result[key] = value
+        return result
+
+    def bash(self, cmd_args):
+        if not self.args.host_bash:
+            raise MockError(501, "util/bash disabled, start with --host-bash.")
+        # The absolute paths of the BIG-IP are moved into the sandbox
+        cmd_args = re.sub(r'(?<![\w./-])/(var|config|shared)/', lambda m: self.root + '/' + m.group(1) + '/', cmd_args)
+        args = cmd_args.split(None, 1)
+        if len(args) != 2 or args[0] != '-c':
+            raise MockError(400, "Unsupported arguments '{0}'.".format(cmd_args))
+        command = shlex.split(args[1])[0] if args[1][:1] in '\'"' else args[1]
+        proc = subprocess.Popen(['bash', '-c', command], cwd=self.root, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        return proc.communicate()[0].decode('utf-8', 'replace')
+
+    # Transactions
+
+    def commit(self, trans_id):
+        """Apply the commands of a transaction, all or none of them: the objects changed are restored on failure.
+
+        The locks of the collections of the commands are held by the caller.
+        """
+        with self.lock:
+            commands = self.transactions.pop(trans_id, None)
+        if commands is None:
+            raise MockError(404, "Transaction {0} not found.".format(trans_id))
+        undo = list()
+        try:
+            for method, path, body in commands:
+                if method == 'POST' and 'command' not in body and body.get('name'):
+                    undo.append(self._capture(path + '/' + object_id(body)))
+                elif method in ['PATCH', 'PUT', 'DELETE']:
+                    undo.append(self._capture(path))
+                self.apply(method, path, body, dict())
+        except MockError as exc:
+            for snapshot in reversed(undo):
+                self._restore(snapshot)
+            return dict(transId=int(trans_id), state='FAILED', failureReason=str(exc))
+        return dict(transId=int(trans_id), state='COMPLETED')
+
+    def _capture(self, path):
+        """Return a copy of an object and of its subcollections, to restore them."""
+        subcollections = dict((c, copy.deepcopy(v)) for c, v in list(self.collections.items())
+                              if c.startswith(path + '/'))
+        return path, copy.deepcopy(self.find(path)), copy.deepcopy(self.resources.get(path)), subcollections
+
+    def _restore(self, snapshot):
+        path, obj, resource, subcollections = snapshot
+        coll, _, obj_id = path.rpartition('/')
+        self._drop(path)
+        self.collections.update(subcollections)
+        if obj is not None:
+            self.collections.setdefault(coll, OrderedDict())[obj_id] = obj
+        elif obj_id in self.collections.get(coll, dict()):
+            del self.collections[coll][obj_id]
+        if resource is not None:
+            self.resources[path] = resource
+        else:
+            self.resources.pop(path, None)
+
+    # Tasks
+
+    def task(self, path, task):
+        if task.get('_taskState') == 'STARTED' and time.time() - task['_started'] >= self.config['task_duration']:
+            try:
+                self.command('/mgmt/tm/' + path[len('/mgmt/tm/task/'):].rsplit('/', 1)[0], task['_payload'])
+                task['_taskState'] = 'COMPLETED'
+            except (MockError, EnvironmentError) as exc:
+                task.update(_taskState='FAILED', errorMessage=str(exc))
+        result = dict(task['_payload'])
+        result.update((k, v) for k, v in task.items() if k in ['_taskId', '_taskState', 'errorMessage'])
+        return result
+
+    # Dispatch
+
+    def lock_paths(self, method, path, body):
+        """Return the paths whose collections are locked while a request is served."""
+        if path.startswith('/mgmt/tm/transaction/') and method == 'PATCH' and body.get('state') == 'VALIDATING':
+            with self.lock:
+                return [command[1] for command in self.transactions.get(path.rsplit('/', 1)[1], list())]
+        return [path]
+
+    def apply(self, method, path, body, query):
+        """Serve an iControl REST request, return its status and response."""
+        if path.startswith('/mgmt/tm/transaction'):
+            if method == 'POST':
+                trans_id = str(int(time.time() * 1000000))
+                self.transactions[trans_id] = list()
+                return 200, dict(transId=int(trans_id), state='STARTED', selfLink=self_link(path + '/' + trans_id))
+            trans_id = path.rsplit('/', 1)[1]
+            if method == 'PATCH' and body.get('state') == 'VALIDATING':
+                return 200, self.commit(trans_id)
+            if method == 'DELETE':
+                self.transactions.pop(trans_id, None)
+                return 200, dict()
+            return 200, dict(transId=int(trans_id), state='STARTED')
+
+        if path.startswith('/mgmt/tm/task/'):
+            if method == 'POST':
+                task_id = str(int(time.time() * 1000000))
+                self.tasks[path + '/' + task_id] = dict(_taskId=task_id, _taskState='CREATED', _payload=body)
+                return 200, dict(body, _taskId=task_id, _taskState='CREATED')
+            task = self.tasks.get(path)
+            if task is None:
+                raise MockError(404, "Task {0} not found.".format(path))
+            if method == 'PUT' and body.get('_taskState') == 'VALIDATING':
+                task.update(_taskState='STARTED', _started=time.time())
+            elif method == 'DELETE':
+                del self.tasks[path]
+                return 200, dict()
+            return 200, self.task(path, task)
+
+        if method == 'GET':
+            return 200, self.read(path, query)
+        if method == 'POST':
+            if 'command' in body:
+                return 200, self.command(path, body)
+            if not self.is_collection(path):
+                raise MockError(404, "01020036:3: The requested object ({0}) was not found.".format(parent_of(path)))
+            new_path = self.create(path, body)
+            return 200, self.render(new_path, self.find(new_path))
+        if method in ['PATCH', 'PUT']:
+            if self.find(path) is None and self.is_resource(path):
+                resource = self.resources.setdefault(path, OrderedDict(_subs=list(), name=path.rsplit('/', 1)[1]))
+                resource.update(body)
+                return 200, self.render(path, resource)
+            self.update(path, body, replace=method == 'PUT')
+            return 200, self.render(path, self.find(path))
+        if method == 'DELETE':
+            self.delete(path)
+            return 200, dict()
+        raise MockError(405, "Method {0} not allowed.".format(method))
+
+    def read(self, path, query):
+        if path == '/mgmt/tm/sys':
+            return dict(kind='tm:sys:syscollectionstate', selfLink=self_link(path),
+                        items=[dict(reference=dict(link=self_link(path + '/application')))])
+        if path == '/mgmt/tm/sys/config':
+            return dict(kind='tm:sys:config:configstate', selfLink=self_link(path), generation=self.generation,
+                        lastUpdateMicros=int(self.started * 1000000) + self.generation)
+        if path == '/mgmt/tm/sys/version':
+            return self.nested_stats(path, Version=VERSION, Product='BIG-IP', Build='0.0.1', Edition='Final')
+        if path == '/mgmt/tm/cm/sync-status':
+            return self.nested_stats(path, color='green', mode='standalone', status='Standalone', summary=' ')
+        if path == '/mgmt/tm/cm/failover-status':
+            return self.nested_stats(path, color='green', status='ACTIVE', summary='1/1 active')
+        if path == '/mgmt/shared/bigip-failover-state':
+            return dict(failoverState='active', isEnabled=True, lastUpdateMicros=int(time.time() * 1000000),
+                        nextPollTime=0, pollCyclePeriodMillis=500)
+        if path.startswith('/mgmt/tm/sys/performance/'):
+            return dict(kind=kind_of(path, 'stats'), selfLink=self_link(path),
+                        apiRawValues=dict(apiAnonymous=PERFORMANCE_REPORT))
+        if path.endswith('/stats'):
+            return self.stats(path)
+
+        obj = self.find(path)
+        if obj is not None:
+            return self.render(path, obj, query.get('expandSubcollections') == 'true')
+        if self.is_collection(path):
+            return self.listing(path, query)
+        if not self.is_resource(path):
+            raise MockError(404, "01020036:3: The requested object ({0}) was not found.".format(path))
+        return self.render(path, self.resources.get(path) or dict(_subs=list(), name=path.rsplit('/', 1)[1]))
+
+    # Files
+
+    def upload(self, worker, name, content_range, data):
+        target = self.sandbox(os.path.join(TRANSFER_DIRS[worker], os.path.basename(name)))
+        match = re.match(r'^(\d+)-(\d+)/(\d+)$', content_range or '')
+        start, total = (int(match.group(1)), int(match.group(3))) if match else (0, len(data))
+        with open(target, 'r+b' if start and os.path.exists(target) else 'wb') as f:
+            f.seek(start)
+            f.write(data)
+            f.truncate()
+        return dict(remainingByteCount=max(total - start - len(data), 0), totalByteCount=total,
+                    localFilePath='/' + TRANSFER_DIRS[worker] + '/' + os.path.basename(name),
+                    temporaryFilePath='/' + TRANSFER_DIRS[worker] + '/' + os.path.basename(name), generation=0)
+
+    def download(self, worker, name, range_header):
+        """Return the bytes of a file served by a file-transfer worker, with their Content-Range."""
+        source = self.sandbox(os.path.join(TRANSFER_DIRS[worker], os.path.basename(name)))
+        if not os.path.isfile(source):
+            raise MockError(404, "File {0} not found.".format(name))
+        size = os.path.getsize(source)
+        match = re.match(r'^bytes=(\d+)-(\d*)$', range_header or '')
+        start = int(match.group(1)) if match else 0
+        end = min(int(match.group(2)) if match and match.group(2) else size - 1, size - 1)
+        with open(source, 'rb') as f:
+            f.seek(start)
+            data = f.read(max(end - start + 1, 0))
+        return data, 'bytes {0}-{1}/{2}'.format(start, end, size)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockBigIp/' + VERSION
+
+    @property
+    def bigip(self):
+        return self.server.bigip
+
+    def log_message(self, fmt, *args):
+        if self.bigip.args.verbose:
+            BaseHTTPRequestHandler.log_message(self, fmt, *args)
+
+    def _send(self, status, body=None, headers=None, raw=None):
+        data = raw if raw is not None else json.dumps(body if body is not None else dict()).encode('utf-8')
+        headers = dict(headers or dict())
+        etag = '"{0}"'.format(hashlib.md5(data).hexdigest())
+        if status == 200 and self.command == 'GET' and raw is None:
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                status, data = 304, b''
+        self.send_response(status)
+        headers.setdefault('Content-Type', 'application/json; charset=UTF-8')
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def _error(self, status, message):
+        self._send(status, dict(code=status, message=message, errorStack=list(), apiError=3))
+
+    def _authenticated(self):
+        args = self.bigip.args
+        token = self.headers.get('X-F5-Auth-Token')
+        if token:
+            expires = self.bigip.tokens.get(token)
+            return expires is not None and expires > time.time()
+        auth = self.headers.get('Authorization') or ''
+        if not auth.startswith('Basic '):
+            return False
+        credentials = base64.b64decode(auth[6:].encode('ascii')).decode('utf-8')
+        return credentials == '{0}:{1}'.format(args.username, args.password)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _handle(self):
+        bigip = self.bigip
+        url = urlsplit(self.path)
+        path = unquote(url.path).rstrip('/') or '/'
+        query = dict((k, v[-1]) for k, v in parse_qs(url.query).items())
+        raw = self._body()
+        with bigip.lock:
+            bigip.requests[self.command] = bigip.requests.get(self.command, 0) + 1
+            config = dict(bigip.config)
+
+        # The settings are neither delayed nor failed on purpose
+        if path.startswith('/mock/'):
+            if not self._authenticated():
+                return self._error(401, AUTHORIZATION_FAILED)
+            return self._mock(path, raw)
+
+        delay = config['latency'] + random.uniform(0, config['jitter'])
+        if delay:
+            time.sleep(delay / 1000.0)
+        if config['error_rate'] and random.random() < config['error_rate'] and \
+                (not config['error_paths'] or re.search(config['error_paths'], path)):
+            return self._error(config['error_status'], "Injected error.")
+
+        if path == '/mgmt/shared/authn/login' and self.command == 'POST':
+            body = json.loads(raw.decode('utf-8') or '{}')
+            if body.get('username') != bigip.args.username or body.get('password') != bigip.args.password:
+                return self._error(401, "Authentication failed.")
+            token = uuid.uuid4().hex.upper()[:26]
+            with bigip.lock:
+                bigip.tokens[token] = time.time() + 1200
+            return self._send(200, dict(username=body['username'], token=dict(token=token, timeout=1200)))
+        if not self._authenticated():
+            return self._error(401, AUTHORIZATION_FAILED)
+
+        try:
+            if path.startswith('/mgmt/shared/authz/tokens/'):
+                token = path.rsplit('/', 1)[1]
+                timeout = int(json.loads(raw.decode('utf-8') or '{}').get('timeout', 1200))
+                with bigip.lock:
+                    if self.command == 'PATCH':
+                        bigip.tokens[token] = time.time() + timeout
+                    elif self.command == 'DELETE':
+                        bigip.tokens.pop(token, None)
+                return self._send(200, dict(token=token, timeout=timeout))
+
+            match = re.match(r'^/mgmt/shared/file-transfer/([\w-]+)/(.+)$', path)
+            if match and match.group(1) in TRANSFER_DIRS:
+                if self.command == 'POST':
+                    with bigip.locked([path]):
+                        return self._send(200, bigip.upload(match.group(1), match.group(2),
+                                                            self.headers.get('Content-Range'), raw))
+                data, content_range = bigip.download(match.group(1), match.group(2), self.headers.get('Range'))
+                return self._send(206 if self.headers.get('Range') else 200, raw=data,
+                                  headers={'Content-Range': content_range,
+                                           'Content-Type': 'application/octet-stream'})
+
+            body = json.loads(raw.decode('utf-8')) if raw else dict()
+            trans_id = self.headers.get('X-F5-REST-Coordination-Id')
+            if trans_id and self.command != 'GET':
+                with bigip.lock:
+                    if trans_id not in bigip.transactions:
+                        raise MockError(404, "Transaction {0} not found.".format(trans_id))
+                    bigip.transactions[trans_id].append((self.command, path, body))
+                return self._send(200, dict(body, selfLink=self_link(path)))
+            with bigip.locked(bigip.lock_paths(self.command, path, body)):
+                status, result = bigip.apply(self.command, path, body, query)
+            return self._send(status, result)
+        except MockError as exc:
+            return self._error(exc.status, str(exc))
+        except (ValueError, EnvironmentError) as exc:
+            return self._error(400, str(exc))
+
+    def _mock(self, path, raw):
+        bigip = self.bigip
+        if path == '/mock/reset' and self.command == 'POST':
+            bigip.reset()
+            with bigip.lock:
+                bigip.requests.clear()
+            return self._send(200, dict())
+        with bigip.lock:
+            if path == '/mock/config':
+                if self.command in ['PATCH', 'PUT', 'POST']:
+                    bigip.config.update((k, v) for k, v in json.loads(raw.decode('utf-8')).items()
+                                        if k in bigip.config)
+                return self._send(200, bigip.config)
+            if path == '/mock/stats':
+                return self._send(200, dict(requests=bigip.requests, generation=bigip.generation,
+                                            objects=sum(len(c) for c in list(bigip.collections.values()))))
+        return self._error(404, "Unknown mock endpoint {0}.".format(path))
+
+    do_DELETE = do_GET = do_PATCH = do_POST = do_PUT = _handle
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_certificate(directory):
+    """Create a self-signed certificate with openssl, return the paths of the certificate and key."""
+    cert, key = os.path.join(directory, 'mock.crt'), os.path.join(directory, 'mock.key')
+    subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '365',
+                           '-subj', '/CN=localhost', '-keyout', key, '-out', cert],
+                          stdout=open(os.devnull, 'w'), stderr=subprocess.STDOUT)
+    return cert, key
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Local stand-in for the iControl REST API of a BIG-IP.')
+    parser.add_argument('--address', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=21444, help='port to listen on')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--cert', help='certificate of the server, a self-signed one is created by default')
+    parser.add_argument('--key', help='private key of the certificate')
+    parser.add_argument('--no-tls', action='store_true', help='serve plain HTTP')
+    parser.add_argument('--root', help='sandbox directory holding the files of the BIG-IP (temporary by default)')
+    parser.add_argument('--host-bash', action='store_true',
+                        help='run the util/bash commands on this host, from the sandbox directory, without confinement')
+    parser.add_argument('--latency', type=float, default=0, help='delay of each response, in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0, help='random delay added to the latency, in milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='ratio of the requests failing, from 0 to 1')
+    parser.add_argument('--error-status', type=int, default=503, help='HTTP status of the injected errors')
+    parser.add_argument('--error-paths', help='regular expression of the paths that may fail')
+    parser.add_argument('--task-duration', type=float, default=2, help='seconds taken by the tasks to complete')
+    parser.add_argument('--partition', default='Common', help='partition of the objects created at startup')
+    parser.add_argument('--nodes', type=int, default=0, help='number of nodes created at startup')
+    parser.add_argument('--pools', type=int, default=0, help='number of pools created at startup')
+    parser.add_argument('--members', type=int, default=0, help='number of members of each pool created at startup')
+    parser.add_argument('--virtuals', type=int, default=0, help='number of virtual servers created at startup')
+    parser.add_argument('--ucs-size', type=int, default=1048576, help='size of the UCS archives saved, in bytes')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    return parser.parse_args(argv)
+
+
+def serve(args):
+    """Start the server in a background thread, return it."""
+    if not args.root:
+        args.root = tempfile.mkdtemp(prefix='mock_bigip_')
+    for directory in SANDBOX_DIRS:
+        if not os.path.isdir(os.path.join(args.root, directory)):
+            os.makedirs(os.path.join(args.root, directory))
+
+    server = ThreadingServer((args.address, args.port), Handler)
+    server.bigip = MockBigIp(args)
+    if not args.no_tls:
+        cert, key = args.cert, args.key
+        if not cert:
+            cert, key = make_certificate(args.root)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER) if hasattr(ssl, 'PROTOCOL_TLS_SERVER') else \
+            ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def main():
+    args = parse_args()
+    server = serve(args)
+    print('Mock BIG-IP {0} listening on {1}://{2}:{3} (sandbox {4})'.format(
+        VERSION, 'http' if args.no_tls else 'https', args.address, server.server_address[1], args.root))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()